@@ -65,6 +65,40 @@ try:
 except ImportError:
     logger.warning("⚠️ Authentication blueprint not found")
 
+# Warm the film index so ingestion resolves known films without querying
+try:
+    from config.config import Config
+    from services.database_service import get_db
+    from utils.film_index import get_film_index
+    if Config.FILM_INDEX_WARM_ON_START:
+        get_film_index().warm(get_db())
+except Exception as e:
+    logger.warning(f"⚠️ Film index not warmed: {e}")
+
+# Start background ingestion workers (search results are queued, not written inline)
+try:
+    from services.ingestion_queue import get_ingestion_workers
+    if Config.INGESTION_ASYNC:
+        get_ingestion_workers().start()
+except Exception as e:
+    logger.warning(f"⚠️ Ingestion workers not started: {e}")
+
+# Keep the rolling windows of film_price_stats current as sales age out
+try:
+    from services.price_stats_service import get_price_stats_service
+    if Config.PRICE_STATS_ENABLED:
+        get_price_stats_service().start_window_refresh()
+except Exception as e:
+    logger.warning(f"⚠️ Price stats window refresh not started: {e}")
+
+# Roll price history up into market_insights for the dashboard and trending endpoints
+try:
+    from services.market_insights_service import get_market_insights_service
+    if Config.MARKET_INSIGHTS_ENABLED:
+        get_market_insights_service().start()
+except Exception as e:
+    logger.warning(f"⚠️ Market insights rollup not started: {e}")
+
 # ================================
 # FRONTEND ROUTES
 # ================================
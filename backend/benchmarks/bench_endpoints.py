@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+End-to-end endpoint benchmark
+Drives the real Flask blueprints against the fake upstream server and reports
+throughput and p50/p95/p99 latency for search, film detail, ingestion and
+enrichment. Needs the configured MySQL database (DATABASE_URL) for the
+database-backed scenarios.
+
+Usage:
+    python backend/benchmarks/bench_endpoints.py [--requests 200] [--concurrency 8]
+        [--scenarios search,film,ingest,enrich] [--latency-ms 80 --jitter-ms 40]
+        [--error-rate 0.01] [--throttle-rate 0.02] [--json results.json]
+        [--baseline baseline.json --max-regression 0.2]
+
+Exits non-zero when --baseline is given and a scenario's p99 or throughput
+regressed by more than --max-regression.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_upstream import FakeUpstream
+
+SCENARIOS = ['search', 'film', 'ingest', 'enrich']
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def run_scenario(name: str, call, count: int, concurrency: int):
+    """
+    Run call(i) count times on concurrency threads
+    
+    call returns True on success; exceptions count as errors
+    """
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            ok = call(i)
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, range(count)))
+    elapsed = time.perf_counter() - start
+    
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    return {
+        'scenario': name,
+        'requests': count,
+        'errors': sum(1 for _, ok in results if not ok),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(count / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2)
+    }
+
+def configure_environment(fake: FakeUpstream, args):
+    """Point Config at the fake upstream; must run before any app module is imported"""
+    os.environ.update(fake.env())
+    os.environ.setdefault('EBAY_APP_ID', 'bench-app-id')
+    os.environ.setdefault('EBAY_CERT_ID', 'bench-cert-id')
+    os.environ.setdefault('EBAY_DEV_ID', 'bench-dev-id')
+    os.environ.setdefault('OMDB_API_KEY', 'bench-omdb-key')
+    os.environ.setdefault('TMDB_API_KEY', 'bench-tmdb-key')
+    os.environ.setdefault('GOCOLLECT_API_TOKEN', 'bench-gocollect-token')
+    os.environ['SHARED_STATE_DIR'] = tempfile.mkdtemp(prefix='bench_state_')
+    if not args.keep_rate_limits:
+        os.environ['ENABLE_RATE_LIMITING'] = 'False'
+    if args.no_cache:
+        os.environ['EBAY_CACHE_TTL'] = '0'
+
+def build_app():
+    """Flask app with the real API blueprints"""
+    from flask import Flask
+    from endpoints import ebay_core
+    from endpoints.search_api import search_bp
+    
+    class UnlimitedClients:
+        """The per-IP API limit would reject a load test after 100 requests"""
+        def is_allowed(self, client_ip):
+            return True
+    
+    ebay_core.rate_limiter = UnlimitedClients()
+    
+    app = Flask(__name__)
+    for key in ('EBAY_APP_ID', 'OMDB_API_KEY', 'TMDB_API_KEY'):
+        app.config[key] = os.environ.get(key)
+    app.register_blueprint(ebay_core.ebay_bp)
+    app.register_blueprint(search_bp)
+    return app
+
+def wait_for_ingestion(timeout: float):
+    """Wait for the ingestion queue to drain, returning (items written, seconds)"""
+    from services.ingestion_queue import get_ingestion_queue
+    
+    queue = get_ingestion_queue()
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        stats = queue.get_stats()
+        if stats['depth_items'] == 0:
+            break
+        time.sleep(0.2)
+    
+    stats = queue.get_stats()
+    return stats['counters']['enqueued_items'] - stats['depth_items'], time.perf_counter() - start
+
+def compare(results, baseline, max_regression: float):
+    """List scenarios whose p99 or throughput regressed past the threshold"""
+    previous = {entry['scenario']: entry for entry in baseline.get('results', [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result['scenario'])
+        if not before:
+            continue
+        if before['p99_ms'] and result['p99_ms'] > before['p99_ms'] * (1 + max_regression):
+            regressions.append(f"{result['scenario']}: p99 {before['p99_ms']} -> {result['p99_ms']} ms")
+        if before['throughput_rps'] and result['throughput_rps'] < before['throughput_rps'] * (1 - max_regression):
+            regressions.append(f"{result['scenario']}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--film-ids', type=int, default=100, help='Film detail requests cycle through ids 1..N')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=25)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--throttle-rate', type=float, default=0)
+    parser.add_argument('--ebay-total', type=int, default=400)
+    parser.add_argument('--no-cache', action='store_true', help='Disable the eBay response cache')
+    parser.add_argument('--keep-rate-limits', action='store_true', help='Keep the upstream token buckets enabled')
+    parser.add_argument('--drain-timeout', type=float, default=120)
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--baseline', help='Compare against a previous --json file')
+    parser.add_argument('--max-regression', type=float, default=0.2)
+    args = parser.parse_args()
+    
+    fake = FakeUpstream(port=0, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                        error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                        ebay_total=args.ebay_total)
+    fake.start()
+    configure_environment(fake, args)
+    
+    app = build_app()
+    titles = [movie['title'] for movie in fake.catalog] or ['Jurassic Park']
+    years = {movie['title']: movie['year'] for movie in fake.catalog}
+    
+    def client_get(path, **params):
+        with app.test_client() as client:
+            return client.get(path, query_string=params).status_code < 500
+    
+    scenarios = {
+        'search': lambda i: client_get('/api/search/', q=titles[i % len(titles)], source='all'),
+        'film': lambda i: client_get(f"/api/search/films/{i % args.film_ids + 1}"),
+        'ingest': lambda i: client_get('/api/ebay/search', q=titles[i % len(titles)],
+                                       limit=200, offset=200 * (i // len(titles))),
+    }
+    
+    def enrich(i):
+        # No HTTP endpoint does enrichment yet; drive the services the same way a job would
+        from services.omdb_service import OmdbService
+        from services.tmdb_service import TmdbService
+        title = titles[i % len(titles)]
+        omdb = OmdbService().enrich_film_data(title, years.get(title))
+        tmdb = TmdbService().enrich_film_data(title, years.get(title))
+        return omdb.get('success', False) and tmdb.get('success', False)
+    
+    scenarios['enrich'] = enrich
+    
+    print(f"Fake upstream on {fake.base_url} (latency {args.latency_ms}+{args.jitter_ms}ms, "
+          f"errors {args.error_rate:.0%}, 429s {args.throttle_rate:.0%})\n")
+    print(f"{'scenario':<10} {'requests':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    
+    results = []
+    for name in [s.strip() for s in args.scenarios.split(',') if s.strip()]:
+        if name not in scenarios:
+            parser.error(f"unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        
+        result = run_scenario(name, scenarios[name], args.requests, args.concurrency)
+        if name == 'ingest':
+            written, seconds = wait_for_ingestion(args.drain_timeout)
+            result['drain_items'] = written
+            result['drain_seconds'] = round(seconds, 3)
+        results.append(result)
+        
+        print(f"{name:<10} {result['requests']:>8} {result['errors']:>7} {result['throughput_rps']:>9.1f} "
+              f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}")
+        if 'drain_items' in result:
+            print(f"{'':<10} queue drained {result['drain_items']} items in {result['drain_seconds']}s")
+    
+    print(f"\nUpstream calls: {json.dumps(fake.stats, sort_keys=True)}")
+    fake.stop()
+    
+    report = {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'args': vars(args), 'results': results,
+              'upstream_calls': fake.stats}
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(report, fh, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.max_regression)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.max_regression:.0%} against {args.baseline}")
+
+if __name__ == '__main__':
+    main()
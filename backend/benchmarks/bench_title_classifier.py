@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Title classifier microbenchmark
+Compares the single-pass classifier with the previous per-attribute scans
+
+Usage: python backend/benchmarks/bench_title_classifier.py [--titles N] [--repeat R]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.title_classifier import classify_title, classify_titles
+
+WORDS = ['Jurassic', 'Park', 'Alien', 'Star', 'Wars', 'Empire', 'Strikes', 'Back', 'Ghostbusters',
+         'Goonies', 'Terminator', 'Gremlins', 'Labyrinth', 'Predator', 'Rocky', 'Jaws']
+EXTRAS = ['VHS', 'DVD', 'Blu-ray', '4K UHD', 'Laserdisc', 'Universal', 'Disney', '20th Century Fox',
+          'Warner Bros', 'SEALED', 'Factory Sealed', 'Graded VGA 85', "Collector's Edition",
+          'Special Edition', 'Steelbook', 'Widescreen', 'Clamshell', 'Rare', 'Vintage', 'Tested']
+
+def make_titles(count: int, seed: int = 42):
+    """Build realistic-looking listing titles"""
+    rng = random.Random(seed)
+    titles = []
+    for _ in range(count):
+        words = rng.sample(WORDS, 3) + rng.sample(EXTRAS, rng.randint(1, 4))
+        if rng.random() < 0.7:
+            words.append(f"({rng.randint(1977, 2023)})" if rng.random() < 0.5 else str(rng.randint(1977, 2023)))
+        rng.shuffle(words)
+        titles.append(' '.join(words))
+    return titles
+
+def legacy_classify(title: str):
+    """The scans this module replaced: format, year and studio each walk the title"""
+    title_upper = title.upper()
+    if 'VHS' in title_upper:
+        format_type = 'VHS'
+    elif 'DVD' in title_upper:
+        format_type = 'DVD'
+    elif 'BLU-RAY' in title_upper or 'BLURAY' in title_upper:
+        format_type = 'Blu-ray'
+    elif '4K' in title_upper or 'UHD' in title_upper:
+        format_type = '4K UHD'
+    elif 'LASERDISC' in title_upper:
+        format_type = 'LaserDisc'
+    else:
+        format_type = 'Unknown'
+    
+    year_match = re.search(r'\((\d{4})\)|\b(19\d{2}|20\d{2})\b', title)
+    year = int(year_match.group(1) or year_match.group(2)) if year_match else None
+    
+    studio = None
+    for name in ['Universal', 'Disney', 'Warner', 'Paramount', 'Sony',
+                 'MGM', 'Fox', '20th Century', 'Columbia', 'Lionsgate']:
+        if name.upper() in title.upper():
+            studio = name
+            break
+    
+    return format_type, year, studio
+
+def bench(label: str, func, titles, repeat: int):
+    """Run func over titles repeat times and report the best run"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(titles)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    
+    per_title_us = best / len(titles) * 1e6
+    print(f"{label:<32} {best * 1000:9.2f} ms  {per_title_us:7.2f} us/title  {len(titles) / best:12,.0f} titles/sec")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--titles', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    titles = make_titles(args.titles)
+    
+    # Sanity check: the classifier agrees with the old scans on format and year
+    mismatches = sum(
+        1 for title in titles
+        if legacy_classify(title)[:2] != (classify_title(title)['format'], classify_title(title)['year'])
+    )
+    print(f"{len(titles)} titles, {mismatches} format/year disagreements with the previous scans\n")
+    
+    legacy = bench('previous scans (format+year+studio)', lambda ts: [legacy_classify(t) for t in ts], titles, args.repeat)
+    # Previously each ingested listing was scanned by _enhance_item_data and again by store_price_history
+    pipeline = bench('previous ingestion path (2 scans)', lambda ts: [(legacy_classify(t), legacy_classify(t)) for t in ts], titles, args.repeat)
+    single = bench('classify_title (all attributes)', lambda ts: [classify_title(t) for t in ts], titles, args.repeat)
+    bench('classify_titles (batch)', classify_titles, titles, args.repeat)
+    
+    print(f"\nper call vs previous scans: {legacy / single:.2f}x (six attributes instead of three)")
+    print(f"per ingested listing vs previous path: {pipeline / single:.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Fake upstream server for load tests
+Stands in for eBay, TMDb, OMDb and GoCollect on one local port. Responses are
+replayed from recorded fixtures when one matches, otherwise generated
+deterministically from the fixture catalog. Latency, 5xx errors and 429s can
+be injected.
+
+Point the app at it with:
+    EBAY_BASE_URL=http://127.0.0.1:8765/ebay
+    TMDB_BASE_URL=http://127.0.0.1:8765/tmdb/3/
+    OMDB_BASE_URL=http://127.0.0.1:8765/omdb/
+    GOCOLLECT_BASE_URL=http://127.0.0.1:8765/gocollect
+
+Usage:
+    python backend/benchmarks/fake_upstream.py [--port 8765] [--latency-ms 80] [--jitter-ms 40]
+        [--error-rate 0.01] [--throttle-rate 0.02] [--ebay-total 500]
+    python backend/benchmarks/fake_upstream.py --record --upstream ebay=https://api.sandbox.ebay.com --upstream tmdb=https://api.themoviedb.org
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Query parameters that never affect the response (kept out of fixture keys)
+IGNORED_PARAMS = {'apikey', 'api_key', 'r', 'language'}
+
+FORMATS = ['VHS', 'DVD', 'Blu-ray', '4K UHD', 'LaserDisc']
+CONDITIONS = [('New', '1000'), ('Like New', '2750'), ('Very Good', '4000'), ('Good', '5000')]
+
+def load_json(path: str, default: Any) -> Any:
+    if not os.path.exists(path):
+        return default
+    with open(path) as fh:
+        return json.load(fh)
+
+class FakeUpstream:
+    """
+    The stand-in server and its settings
+    
+    start() serves from a background thread (for benchmarks that run it
+    in-process); serve_forever() blocks (CLI).
+    """
+    
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, latency_ms: float = 0,
+                 jitter_ms: float = 0, error_rate: float = 0, throttle_rate: float = 0,
+                 ebay_total: int = 500, fixtures_dir: str = FIXTURES_DIR,
+                 record_upstreams: Optional[Dict[str, str]] = None, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.ebay_total = ebay_total
+        self.fixtures_dir = fixtures_dir
+        self.record_upstreams = record_upstreams or {}
+        self.rng = random.Random(seed)
+        
+        self.catalog = load_json(os.path.join(fixtures_dir, 'catalog.json'), {'movies': []})['movies']
+        self.recorded_path = os.path.join(fixtures_dir, 'recorded.json')
+        self.recorded: Dict[str, Dict[str, Any]] = load_json(self.recorded_path, {})
+        
+        self.stats: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        
+        handler = type('Handler', (FakeUpstreamHandler,), {'upstream': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+    
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def env(self) -> Dict[str, str]:
+        """Environment variables that point the app at this server"""
+        return {
+            'EBAY_BASE_URL': f"{self.base_url}/ebay",
+            'TMDB_BASE_URL': f"{self.base_url}/tmdb/3/",
+            'OMDB_BASE_URL': f"{self.base_url}/omdb/",
+            'GOCOLLECT_BASE_URL': f"{self.base_url}/gocollect"
+        }
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='fake-upstream', daemon=True)
+        self.thread.start()
+    
+    def serve_forever(self):
+        self.server.serve_forever()
+    
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def count(self, name: str):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+    
+    def random(self) -> float:
+        with self.lock:
+            return self.rng.random()
+    
+    def save_recording(self, key: str, status: int, body: Any):
+        with self.lock:
+            self.recorded[key] = {'status': status, 'body': body}
+            os.makedirs(self.fixtures_dir, exist_ok=True)
+            with open(self.recorded_path, 'w') as fh:
+                json.dump(self.recorded, fh, indent=1, sort_keys=True)
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    upstream: FakeUpstream = None
+    
+    # (method, path regex, upstream name, handler method)
+    ROUTES = [
+        ('POST', r'^/ebay/identity/v1/oauth2/token$', 'ebay', 'ebay_token'),
+        ('GET', r'^/ebay/buy/marketplace_insights/v1_beta/item_sales/search$', 'ebay', 'ebay_item_sales'),
+        ('GET', r'^/tmdb/3/search/movie$', 'tmdb', 'tmdb_search'),
+        ('GET', r'^/tmdb/3/movie/(?P<movie_id>\d+)$', 'tmdb', 'tmdb_movie'),
+        ('GET', r'^/tmdb/3/configuration$', 'tmdb', 'tmdb_configuration'),
+        ('GET', r'^/omdb/?$', 'omdb', 'omdb'),
+        ('GET', r'^/gocollect/api/collectibles/v1/item/search$', 'gocollect', 'gocollect_search'),
+        ('GET', r'^/gocollect/api/insights/v1/item/(?P<item_id>\d+)$', 'gocollect', 'gocollect_insights'),
+    ]
+    COMPILED_ROUTES = [(method, re.compile(pattern), name, handler) for method, pattern, name, handler in ROUTES]
+    
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+    
+    def do_GET(self):
+        self.dispatch('GET')
+    
+    def do_POST(self):
+        self.dispatch('POST')
+    
+    def dispatch(self, method: str):
+        parts = urlsplit(self.path)
+        params = dict(parse_qsl(parts.query))
+        
+        if parts.path == '/__stats':
+            return self.send_json(200, dict(self.upstream.stats))
+        
+        for route_method, pattern, name, handler in self.COMPILED_ROUTES:
+            match = pattern.match(parts.path)
+            if route_method != method or not match:
+                continue
+            
+            self.upstream.count(f"{name}_requests")
+            is_token_call = handler == 'ebay_token'
+            
+            fault = None if is_token_call else self.inject_faults(name)
+            if fault:
+                return self.send_json(*fault)
+            
+            key = self.fixture_key(method, parts.path, params)
+            if self.upstream.record_upstreams.get(name) and not is_token_call:
+                return self.record(name, key, parts, method)
+            
+            recorded = self.upstream.recorded.get(key)
+            if recorded:
+                self.upstream.count(f"{name}_replayed")
+                return self.send_json(recorded['status'], recorded['body'])
+            
+            status, body = getattr(self, handler)(params, **match.groupdict())
+            return self.send_json(status, body)
+        
+        self.send_json(404, {'error': f"No fake route for {method} {parts.path}"})
+    
+    def inject_faults(self, name: str) -> Optional[Tuple[int, Any, Dict[str, str]]]:
+        """Sleep for the configured latency, then maybe answer 429 or 500"""
+        upstream = self.upstream
+        delay = upstream.latency_ms + upstream.jitter_ms * upstream.random()
+        if delay > 0:
+            time.sleep(delay / 1000)
+        
+        roll = upstream.random()
+        if roll < upstream.throttle_rate:
+            upstream.count(f"{name}_throttled")
+            return 429, {'error': 'Too Many Requests'}, {'Retry-After': '1'}
+        if roll < upstream.throttle_rate + upstream.error_rate:
+            upstream.count(f"{name}_errors")
+            return 500, {'error': 'Injected upstream failure'}, {}
+        return None
+    
+    @staticmethod
+    def fixture_key(method: str, path: str, params: Dict[str, str]) -> str:
+        kept = sorted((k, v) for k, v in params.items() if k not in IGNORED_PARAMS)
+        return f"{method} {path}?{urlencode(kept)}"
+    
+    def record(self, name: str, key: str, parts, method: str):
+        """Forward to the real upstream and store its response as a fixture"""
+        import requests
+        
+        prefix = f"/{name}"
+        url = self.upstream.record_upstreams[name].rstrip('/') + parts.path[len(prefix):]
+        headers = {k: v for k, v in self.headers.items() if k.lower() in ('authorization', 'accept', 'x-ebay-c-marketplace-id')}
+        response = requests.request(method, url, params=parts.query, headers=headers, timeout=30)
+        
+        try:
+            body = response.json()
+        except ValueError:
+            body = {'raw': response.text}
+        
+        self.upstream.save_recording(key, response.status_code, body)
+        self.upstream.count(f"{name}_recorded")
+        self.send_json(response.status_code, body)
+    
+    def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        encoded = json.dumps(body).encode() if status != 204 else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(encoded)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(encoded)
+    
+    # ---- generated responses ----
+    
+    @staticmethod
+    def seeded(*parts: Any) -> random.Random:
+        digest = hashlib.sha256('|'.join(str(p) for p in parts).encode()).hexdigest()
+        return random.Random(int(digest[:16], 16))
+    
+    def find_movies(self, query: str):
+        query = (query or '').lower()
+        return [movie for movie in self.upstream.catalog if query and query in movie['title'].lower()]
+    
+    def ebay_token(self, params):
+        return 200, {'access_token': 'fake-upstream-token', 'expires_in': 7200, 'token_type': 'Application Access Token'}
+    
+    def ebay_item_sales(self, params):
+        query = params.get('q', '')
+        limit = min(int(params.get('limit', 50)), 200)
+        offset = int(params.get('offset', 0))
+        total = self.upstream.ebay_total
+        
+        sales = []
+        now = datetime(2024, 6, 1)
+        for position in range(offset, min(offset + limit, total)):
+            rng = self.seeded('ebay', query, position)
+            format_type = rng.choice(FORMATS)
+            condition, condition_id = rng.choice(CONDITIONS)
+            item_id = f"v1|{int(hashlib.md5(f'{query}|{position}'.encode()).hexdigest()[:12], 16)}|0"
+            sales.append({
+                'itemId': item_id,
+                'title': f"{query.title()} ({rng.randint(1977, 2015)}) {format_type} {rng.choice(['', 'SEALED', 'Rare', 'Collectors Edition'])}".strip(),
+                'lastSoldPrice': {'value': f"{rng.uniform(3, 250):.2f}", 'currency': 'USD'},
+                'lastSoldDate': (now - timedelta(hours=position * 3)).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+                'condition': condition,
+                'conditionId': condition_id,
+                'totalSoldQuantity': rng.randint(1, 3),
+                'itemWebUrl': f"https://www.ebay.com/itm/{item_id}",
+                'seller': {'username': f"seller{rng.randint(1, 500)}", 'feedbackScore': rng.randint(0, 20000)}
+            })
+        
+        body = {'total': total, 'limit': limit, 'offset': offset, 'itemSales': sales}
+        if offset + limit < total:
+            body['next'] = f"/buy/marketplace_insights/v1_beta/item_sales/search?q={query}&limit={limit}&offset={offset + limit}"
+        return 200, body
+    
+    def tmdb_search(self, params):
+        results = [{
+            'id': movie['tmdb_id'],
+            'title': movie['title'],
+            'original_title': movie['title'],
+            'release_date': f"{movie['year']}-06-01",
+            'overview': movie.get('plot', ''),
+            'poster_path': f"/{movie['tmdb_id']}.jpg",
+            'backdrop_path': f"/{movie['tmdb_id']}_bg.jpg",
+            'vote_average': movie.get('rating', 7.0),
+            'vote_count': 1000,
+            'popularity': 50.0,
+            'genre_ids': [28]
+        } for movie in self.find_movies(params.get('query'))]
+        return 200, {'page': 1, 'total_pages': 1, 'total_results': len(results), 'results': results}
+    
+    def tmdb_movie(self, params, movie_id):
+        movie = next((m for m in self.upstream.catalog if str(m['tmdb_id']) == movie_id), None)
+        if not movie:
+            return 404, {'status_code': 34, 'status_message': 'The resource you requested could not be found.'}
+        return 200, {
+            'id': movie['tmdb_id'],
+            'imdb_id': movie['imdb_id'],
+            'title': movie['title'],
+            'release_date': f"{movie['year']}-06-01",
+            'runtime': movie.get('runtime', 110),
+            'overview': movie.get('plot', ''),
+            'genres': [{'id': 28, 'name': genre} for genre in movie.get('genres', [])],
+            'poster_path': f"/{movie['tmdb_id']}.jpg",
+            'vote_average': movie.get('rating', 7.0),
+            'production_companies': [{'name': movie.get('studio', '')}]
+        }
+    
+    def tmdb_configuration(self, params):
+        return 200, {'images': {
+            'base_url': 'http://image.tmdb.org/t/p/',
+            'secure_base_url': 'https://image.tmdb.org/t/p/',
+            'poster_sizes': ['w92', 'w185', 'w500', 'original'],
+            'backdrop_sizes': ['w300', 'w780', 'original']
+        }}
+    
+    def omdb(self, params):
+        def detail(movie):
+            return {
+                'Title': movie['title'], 'Year': str(movie['year']), 'Rated': movie.get('rated', 'PG'),
+                'Runtime': f"{movie.get('runtime', 110)} min", 'Genre': ', '.join(movie.get('genres', [])),
+                'Director': movie.get('director', ''), 'Plot': movie.get('plot', ''),
+                'Poster': f"https://m.media-amazon.com/images/{movie['imdb_id']}.jpg",
+                'imdbID': movie['imdb_id'], 'imdbRating': str(movie.get('rating', 7.0)),
+                'Type': 'movie', 'Response': 'True'
+            }
+        
+        if params.get('i'):
+            movie = next((m for m in self.upstream.catalog if m['imdb_id'] == params['i']), None)
+            return 200, detail(movie) if movie else {'Response': 'False', 'Error': 'Incorrect IMDb ID.'}
+        
+        if params.get('t'):
+            movies = [m for m in self.find_movies(params['t']) if m['title'].lower() == params['t'].lower()]
+            return 200, detail(movies[0]) if movies else {'Response': 'False', 'Error': 'Movie not found!'}
+        
+        if params.get('s'):
+            movies = self.find_movies(params['s'])
+            if not movies:
+                return 200, {'Response': 'False', 'Error': 'Movie not found!'}
+            return 200, {
+                'Search': [{'Title': m['title'], 'Year': str(m['year']), 'imdbID': m['imdb_id'], 'Type': 'movie',
+                            'Poster': f"https://m.media-amazon.com/images/{m['imdb_id']}.jpg"} for m in movies],
+                'totalResults': str(len(movies)),
+                'Response': 'True'
+            }
+        
+        return 200, {'Response': 'False', 'Error': 'Incorrect IMDb ID.'}
+    
+    def gocollect_search(self, params):
+        movies = self.find_movies(params.get('query'))
+        if not movies:
+            return 204, []
+        return 200, [{
+            'item_id': movie['tmdb_id'],
+            'title': movie['title'],
+            'cam': params.get('cam', 'comics'),
+            'issue_number': '1',
+            'year': movie['year']
+        } for movie in movies[:int(params.get('limit', 20))]]
+    
+    def gocollect_insights(self, params, item_id):
+        rng = self.seeded('gocollect', item_id, params.get('grade'))
+        fmv = round(rng.uniform(20, 2000), 2)
+        return 200, {
+            'item_id': int(item_id),
+            'title': next((m['title'] for m in self.upstream.catalog if str(m['tmdb_id']) == item_id), 'Unknown'),
+            'grade': params.get('grade', '9.8'),
+            'company': params.get('company', 'CGC'),
+            'metrics': {
+                '30_day': {'fmv': fmv, 'sales': rng.randint(0, 20)},
+                '90_day': {'fmv': round(fmv * 0.95, 2), 'sales': rng.randint(5, 60)},
+                '365_day': {'fmv': round(fmv * 0.9, 2), 'sales': rng.randint(20, 200)}
+            }
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Base latency added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Extra random latency, 0..jitter')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 500')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='Fraction of requests answered with 429')
+    parser.add_argument('--ebay-total', type=int, default=500, help='Sales available per eBay query')
+    parser.add_argument('--fixtures', default=FIXTURES_DIR)
+    parser.add_argument('--record', action='store_true', help='Proxy to real upstreams and save responses')
+    parser.add_argument('--upstream', action='append', default=[],
+                        help='name=url for recording, e.g. tmdb=https://api.themoviedb.org (path prefix is stripped)')
+    args = parser.parse_args()
+    
+    upstreams = dict(item.split('=', 1) for item in args.upstream) if args.record else {}
+    fake = FakeUpstream(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                        args.throttle_rate, args.ebay_total, args.fixtures, upstreams)
+    
+    print(f"Fake upstream listening on {fake.base_url}")
+    for name, value in fake.env().items():
+        print(f"  export {name}={value}")
+    if upstreams:
+        print(f"Recording {', '.join(upstreams)} to {fake.recorded_path}")
+    
+    try:
+        fake.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
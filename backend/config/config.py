@@ -33,6 +33,24 @@ class Config:
         'pool_timeout': 20,
         'max_overflow': 10
     }
+    DATABASE_REPLICA_URLS = os.getenv('DATABASE_REPLICA_URLS', '')  # Comma-separated mysql:// URLs for read-only queries
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', '30'))  # Reads stay on the primary this long after a session writes
+    DB_REPLICA_MAX_LAG = int(os.getenv('DB_REPLICA_MAX_LAG', '30'))  # Skip replicas further behind than this (0 disables the check)
+    DB_REPLICA_HEALTH_INTERVAL = int(os.getenv('DB_REPLICA_HEALTH_INTERVAL', '10'))  # Seconds between replica lag checks
+    DB_REPLICA_RETRY_INTERVAL = int(os.getenv('DB_REPLICA_RETRY_INTERVAL', '30'))  # Seconds a failed replica is skipped
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))  # Connections kept open by DatabaseService
+    DB_POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', '10'))  # Extra connections allowed under bursts
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))  # Reopen connections older than this (below wait_timeout)
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'  # Ping idle connections before use
+    QUERY_STATS_ENABLED = os.getenv('QUERY_STATS_ENABLED', 'True').lower() == 'true'  # Per-fingerprint timing in DatabaseService
+    QUERY_STATS_MAX_FINGERPRINTS = int(os.getenv('QUERY_STATS_MAX_FINGERPRINTS', '1000'))  # Further statements count as "(other)"
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '500'))  # Log statements at least this slow
+    SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE_RATE', '0.1'))  # Share of slow statements EXPLAINed
+    SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', '100'))  # Recent slow statements kept for the admin API
+    DB_STREAM_FETCH_SIZE = int(os.getenv('DB_STREAM_FETCH_SIZE', '1000'))  # Rows per fetch in DatabaseService.iter_query
+    DB_STREAM_NET_WRITE_TIMEOUT = int(os.getenv('DB_STREAM_NET_WRITE_TIMEOUT', '600'))  # Seconds MySQL waits on a slow reader
+    DB_BULK_CHUNK_SIZE = int(os.getenv('DB_BULK_CHUNK_SIZE', '500'))  # Rows per multi-row statement in bulk_write
     
     # eBay API Configuration
     EBAY_APP_ID = os.getenv('EBAY_APP_ID')
@@ -40,13 +58,42 @@ class Config:
     EBAY_DEV_ID = os.getenv('EBAY_DEV_ID')
     EBAY_USER_TOKEN = os.getenv('EBAY_USER_TOKEN')
     EBAY_ENVIRONMENT = os.getenv('EBAY_ENVIRONMENT', 'sandbox')
-    EBAY_BASE_URL = 'https://api.ebay.com' if EBAY_ENVIRONMENT == 'production' else 'https://api.sandbox.ebay.com'
+    EBAY_BASE_URL = os.getenv('EBAY_BASE_URL') or (
+        'https://api.ebay.com' if EBAY_ENVIRONMENT == 'production' else 'https://api.sandbox.ebay.com'
+    )  # Override to point at a local stand-in (benchmarks/fake_upstream.py)
     
     # eBay Feature Flags
     ENABLE_PRICE_UPDATES = os.getenv('ENABLE_PRICE_UPDATES', 'True').lower() == 'true'
     ENABLE_RATE_LIMITING = os.getenv('ENABLE_RATE_LIMITING', 'True').lower() == 'true'
     UPDATE_FREQUENCY = os.getenv('UPDATE_FREQUENCY', 'daily')
     MAX_ITEMS_PER_SEARCH = int(os.getenv('MAX_ITEMS_PER_SEARCH', '100'))
+    EBAY_PAGE_SIZE = 200  # Marketplace Insights maximum
+    EBAY_MAX_OFFSET = 10000  # Marketplace Insights will not page past this
+    EBAY_PAGE_FETCH_WORKERS = int(os.getenv('EBAY_PAGE_FETCH_WORKERS', '4'))
+    INGESTION_BATCH_SIZE = int(os.getenv('INGESTION_BATCH_SIZE', '500'))  # Rows per multi-row INSERT
+    INGESTION_UPSERT = os.getenv('INGESTION_UPSERT', 'True').lower() == 'true'  # Update already-stored listings
+    EBAY_CACHE_TTL = int(os.getenv('EBAY_CACHE_TTL', '900'))  # Seconds a sold-items search stays cached
+    EBAY_CACHE_MAX_ENTRIES = int(os.getenv('EBAY_CACHE_MAX_ENTRIES', '1000'))
+    EBAY_CACHE_MAX_BYTES = int(os.getenv('EBAY_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))  # 64MB in memory
+    EBAY_CACHE_DISK = os.getenv('EBAY_CACHE_DISK', 'False').lower() == 'true'  # Persist across restarts
+    FILM_INDEX_MAX_ENTRIES = int(os.getenv('FILM_INDEX_MAX_ENTRIES', '100000'))  # (title, format) -> film id
+    FILM_INDEX_WARM_ON_START = os.getenv('FILM_INDEX_WARM_ON_START', 'True').lower() == 'true'
+    INGESTION_ASYNC = os.getenv('INGESTION_ASYNC', 'True').lower() == 'true'  # Queue search results for background writes
+    INGESTION_QUEUE_WORKERS = int(os.getenv('INGESTION_QUEUE_WORKERS', '2'))  # Consumer threads per process
+    INGESTION_QUEUE_MAX_ITEMS = int(os.getenv('INGESTION_QUEUE_MAX_ITEMS', '50000'))  # Backlog before enqueue sheds load
+    INGESTION_QUEUE_MAX_ATTEMPTS = int(os.getenv('INGESTION_QUEUE_MAX_ATTEMPTS', '5'))  # Then dead-lettered
+    INGESTION_QUEUE_RETRY_DELAY = float(os.getenv('INGESTION_QUEUE_RETRY_DELAY', '5'))  # Seconds, doubled per attempt
+    INGESTION_QUEUE_VISIBILITY_TIMEOUT = int(os.getenv('INGESTION_QUEUE_VISIBILITY_TIMEOUT', '300'))  # Reclaim stuck jobs
+    INGESTION_QUEUE_POLL_INTERVAL = float(os.getenv('INGESTION_QUEUE_POLL_INTERVAL', '2'))
+    PRICE_STATS_ENABLED = os.getenv('PRICE_STATS_ENABLED', 'True').lower() == 'true'  # Off only for bulk loads followed by a rebuild
+    PRICE_STATS_CHUNK_SIZE = int(os.getenv('PRICE_STATS_CHUNK_SIZE', '5000'))  # Films per rebuild/refresh transaction
+    PRICE_STATS_WINDOW_REFRESH_INTERVAL = float(os.getenv('PRICE_STATS_WINDOW_REFRESH_INTERVAL', '3600'))  # Seconds
+    MARKET_INSIGHTS_ENABLED = os.getenv('MARKET_INSIGHTS_ENABLED', 'True').lower() == 'true'  # Background rollup
+    MARKET_INSIGHTS_INTERVAL = float(os.getenv('MARKET_INSIGHTS_INTERVAL', '900'))  # Seconds between rollup runs
+    MARKET_INSIGHTS_LAG_SECONDS = int(os.getenv('MARKET_INSIGHTS_LAG_SECONDS', '300'))  # Re-read changes this far behind the mark
+    MARKET_INSIGHTS_BATCH_DAYS = int(os.getenv('MARKET_INSIGHTS_BATCH_DAYS', '31'))  # Days of sales per read (at least one period)
+    MARKET_TREND_THRESHOLD = float(os.getenv('MARKET_TREND_THRESHOLD', '5'))  # Percent change that counts as a trend
+    MARKET_VOLATILITY_THRESHOLD = float(os.getenv('MARKET_VOLATILITY_THRESHOLD', '0.5'))  # Price std dev / mean
     
     # eBay Deletion Notifications
     EBAY_VERIFICATION_TOKEN = os.getenv('EBAY_VERIFICATION_TOKEN')
@@ -78,6 +125,44 @@ class Config:
     ENABLE_TMDB_VIDEOS = os.getenv('ENABLE_TMDB_VIDEOS', 'False').lower() == 'true'
     ENABLE_TMDB_CREDITS = os.getenv('ENABLE_TMDB_CREDITS', 'True').lower() == 'true'
     
+    # GoCollect API Configuration
+    GOCOLLECT_BASE_URL = os.getenv('GOCOLLECT_BASE_URL', 'https://gocollect.com')
+    
+    # Outbound HTTP Configuration (shared by all upstream API clients)
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '20'))  # Keep-alive connections per host
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '0.5'))  # Seconds, doubled per retry
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '10'))
+    HTTP_HEDGE_DELAY = float(os.getenv('HTTP_HEDGE_DELAY', '0'))  # Seconds before a duplicate GET is sent; 0 disables
+    HTTP_HEDGE_HOSTS = [h.strip() for h in os.getenv('HTTP_HEDGE_HOSTS', '').split(',') if h.strip()]  # Empty means all hosts
+    
+    # Circuit Breakers (one per upstream host)
+    CIRCUIT_BREAKER_ENABLED = os.getenv('CIRCUIT_BREAKER_ENABLED', 'True').lower() == 'true'
+    CIRCUIT_WINDOW_SECONDS = float(os.getenv('CIRCUIT_WINDOW_SECONDS', '60'))
+    CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', '10'))  # Calls in the window before the breaker can trip
+    CIRCUIT_ERROR_THRESHOLD = float(os.getenv('CIRCUIT_ERROR_THRESHOLD', '0.5'))
+    CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv('CIRCUIT_SLOW_CALL_SECONDS', '5'))
+    CIRCUIT_SLOW_CALL_THRESHOLD = float(os.getenv('CIRCUIT_SLOW_CALL_THRESHOLD', '0.8'))
+    CIRCUIT_OPEN_SECONDS = float(os.getenv('CIRCUIT_OPEN_SECONDS', '30'))  # Fail fast this long before probing
+    CIRCUIT_HALF_OPEN_PROBES = int(os.getenv('CIRCUIT_HALF_OPEN_PROBES', '2'))
+    
+    # Multi-source Search
+    SEARCH_DEADLINE_MS = int(os.getenv('SEARCH_DEADLINE_MS', '2000'))  # Sources still running after this are dropped
+    SEARCH_MAX_DEADLINE_MS = int(os.getenv('SEARCH_MAX_DEADLINE_MS', '10000'))  # Cap for the timeout_ms parameter
+    SEARCH_FANOUT_WORKERS = int(os.getenv('SEARCH_FANOUT_WORKERS', '16'))  # Shared by all search requests in the process
+    SEARCH_FETCH_LIMIT = int(os.getenv('SEARCH_FETCH_LIMIT', '100'))  # Results per source merged and ranked before paging
+    SEARCH_MODE = os.getenv('SEARCH_MODE', 'boolean')  # FULLTEXT mode for film search: 'boolean' or 'natural'
+    FULLTEXT_MIN_TOKEN_SIZE = int(os.getenv('FULLTEXT_MIN_TOKEN_SIZE', '3'))  # Must match innodb_ft_min_token_size
+    
+    # Cross-process shared state (SQLite files shared by every worker on the host)
+    # The default is backend/shared_state wherever a worker is started from
+    SHARED_STATE_DIR = os.getenv('SHARED_STATE_DIR',
+                                 os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'shared_state')))
+    OAUTH_TOKEN_REFRESH_AHEAD = int(os.getenv('OAUTH_TOKEN_REFRESH_AHEAD', '600'))  # Seconds before expiry
+    RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'sqlite')  # 'sqlite' (shared) or 'memory' (per process)
+    RATE_LIMIT_MAX_WAIT = float(os.getenv('RATE_LIMIT_MAX_WAIT', '30'))  # Longest a background worker waits for a token (requests never wait)
+    
     # General Feature Flags
     ENABLE_EMAIL_ALERTS = os.getenv('ENABLE_EMAIL_ALERTS', 'True').lower() == 'true'
     
@@ -4,10 +4,11 @@ Film Price Guide - Admin API
 Admin panel endpoints for configuration and management
 """
 
-from flask import Blueprint, request, jsonify, session, current_app
+from flask import Blueprint, Response, request, jsonify, session, current_app, stream_with_context
 import os
 import json
 import logging
+import threading
 from datetime import datetime
 
 # Import database service and auth decorators
@@ -23,8 +24,61 @@ except ImportError:
     def get_db():
         return None
 
+try:
+    from utils.http_client import get_http_client
+except ImportError:
+    get_http_client = None
+
+try:
+    from utils.circuit_breaker import get_circuit_breaker_stats
+except ImportError:
+    get_circuit_breaker_stats = None
+
+try:
+    from utils.response_cache import get_cache_stats, clear_all_caches
+except ImportError:
+    get_cache_stats = None
+    clear_all_caches = None
+
+try:
+    from utils.film_index import get_film_index
+except ImportError:
+    get_film_index = None
+
+try:
+    from services.ingestion_queue import get_ingestion_queue, get_ingestion_queue_stats
+except ImportError:
+    get_ingestion_queue = None
+    get_ingestion_queue_stats = None
+
+try:
+    from services.price_stats_service import get_price_stats_service
+except ImportError:
+    get_price_stats_service = None
+
+try:
+    from services.market_insights_service import get_market_insights_service
+except ImportError:
+    get_market_insights_service = None
+
+try:
+    from utils.query_stats import get_query_stats
+except ImportError:
+    get_query_stats = None
+
+from utils.streaming import csv_stream, started
+
 logger = logging.getLogger(__name__)
 
+# Fields every imported price entry must have
+IMPORT_REQUIRED_FIELDS = ('film_id', 'price', 'sale_date')
+
+# Columns of the price history CSV export, in order
+PRICE_HISTORY_EXPORT_COLUMNS = (
+    'id', 'film_id', 'price', 'currency', 'shipping_cost', 'condition_name', 'sale_date',
+    'platform', 'listing_type', 'total_sold_quantity', 'external_listing_id', 'listing_title'
+)
+
 # Create blueprint
 admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 
@@ -72,9 +126,19 @@ def system_status():
             'timestamp': datetime.utcnow().isoformat(),
             'database': {
                 'status': db_status,
-                'error': db_error
+                'error': db_error,
+                'pool': db.get_pool_stats() if db else {},
+                'read_replicas': db.get_replica_stats() if db else {}
             },
             'api_keys': api_status,
+            'http_pools': get_http_client().get_stats() if get_http_client else {},
+            'circuit_breakers': get_circuit_breaker_stats() if get_circuit_breaker_stats else {},
+            'response_caches': get_cache_stats() if get_cache_stats else {},
+            'film_index': get_film_index().get_stats() if get_film_index else {},
+            'ingestion_queue': get_ingestion_queue_stats() if get_ingestion_queue_stats else {},
+            'price_stats': get_price_stats_service().get_stats() if get_price_stats_service else {},
+            'market_insights': get_market_insights_service().get_stats() if get_market_insights_service else {},
+            'query_stats': get_query_stats().get_stats() if get_query_stats else {},
             'environment': env_info,
             'blueprints': list(current_app.blueprints.keys())
         }), 200
@@ -167,13 +231,13 @@ def update_api_keys():
             current_app.config['TMDB_API_KEY'] = data['tmdb']['api_key']
             updated_keys.append('TMDB_API_KEY')
         
-        # Optionally save to database for persistence
+        # Optionally save to database for persistence (one statement for all keys)
         db = get_db()
         if db:
-            for key_name in updated_keys:
-                key_value = os.environ.get(key_name)
-                if key_value:
-                    db.save_api_key(key_name, key_value)
+            api_keys = [(key_name, os.environ[key_name], None)
+                        for key_name in updated_keys if os.environ.get(key_name)]
+            if api_keys:
+                db.save_api_keys(api_keys)
         
         return jsonify({
             'message': 'API keys updated successfully',
@@ -254,6 +318,52 @@ def database_stats():
         logger.error(f"Database stats error: {e}")
         return jsonify({'error': 'Failed to get database stats'}), 500
 
+@admin_bp.route('/database/queries', methods=['GET'])
+@admin_required
+def query_stats():
+    """
+    Top statement fingerprints by total time (or ?sort=calls|avg_ms|max_ms|rows|pool_wait_ms|errors)
+    plus the most recent slow queries, with EXPLAIN plans where sampled
+    """
+    try:
+        if not get_query_stats:
+            return jsonify({'error': 'Query stats not available'}), 503
+        
+        stats = get_query_stats()
+        limit = min(int(request.args.get('limit', 20)), 200)
+        slow_limit = min(int(request.args.get('slow', 20)), 200)
+        
+        return jsonify({
+            'summary': stats.get_stats(),
+            'top': stats.top(limit, request.args.get('sort', 'total_ms')),
+            'slow_queries': stats.slow_log(slow_limit),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Query stats error: {e}")
+        return jsonify({'error': 'Failed to get query stats'}), 500
+
+@admin_bp.route('/database/queries/reset', methods=['POST'])
+@admin_required
+def reset_query_stats():
+    """Start query stats and the slow-query log over"""
+    try:
+        if not get_query_stats:
+            return jsonify({'error': 'Query stats not available'}), 503
+        
+        get_query_stats().reset()
+        return jsonify({
+            'message': 'Query stats reset',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Reset query stats error: {e}")
+        return jsonify({'error': 'Failed to reset query stats'}), 500
+
 # ================================
 # APPLICATION SETTINGS
 # ================================
@@ -349,11 +459,12 @@ def get_logs():
 def clear_cache():
     """Clear application cache"""
     try:
-        # Placeholder for cache clearing logic
-        # You would implement actual cache clearing here
+        # Drop cached upstream API responses (memory and disk tiers)
+        entries_cleared = clear_all_caches() if clear_all_caches else 0
         
         return jsonify({
             'message': 'Cache cleared successfully',
+            'entries_cleared': entries_cleared,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -361,6 +472,195 @@ def clear_cache():
         logger.error(f"Clear cache error: {e}")
         return jsonify({'error': 'Failed to clear cache'}), 500
 
+@admin_bp.route('/ingestion/dead-letters', methods=['GET'])
+@admin_required
+def get_dead_letters():
+    """List ingestion jobs that exhausted their retries"""
+    try:
+        if not get_ingestion_queue:
+            return jsonify({'error': 'Ingestion queue not available'}), 503
+        
+        limit = min(int(request.args.get('limit', 50)), 500)
+        return jsonify({
+            'dead_letters': get_ingestion_queue().get_dead_letters(limit),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Get dead letters error: {e}")
+        return jsonify({'error': 'Failed to get dead letters'}), 500
+
+@admin_bp.route('/ingestion/dead-letters/requeue', methods=['POST'])
+@admin_required
+def requeue_dead_letters():
+    """Retry every dead-lettered ingestion job"""
+    try:
+        if not get_ingestion_queue:
+            return jsonify({'error': 'Ingestion queue not available'}), 503
+        
+        return jsonify({
+            'message': 'Dead letters requeued',
+            'jobs_requeued': get_ingestion_queue().requeue_dead_letters(),
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Requeue dead letters error: {e}")
+        return jsonify({'error': 'Failed to requeue dead letters'}), 500
+
+@admin_bp.route('/price-stats/rebuild', methods=['POST'])
+@admin_required
+def rebuild_price_stats():
+    """Recompute film_price_stats from price_history in the background"""
+    try:
+        if not get_price_stats_service:
+            return jsonify({'error': 'Price stats not available'}), 503
+        
+        service = get_price_stats_service()
+        
+        def run_rebuild():
+            try:
+                service.rebuild()
+            except Exception as e:
+                logger.error(f"Price stats rebuild error: {e}")
+        
+        threading.Thread(target=run_rebuild, name='price-stats-rebuild', daemon=True).start()
+        
+        return jsonify({
+            'message': 'Price stats rebuild started',
+            'timestamp': datetime.utcnow().isoformat()
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Start price stats rebuild error: {e}")
+        return jsonify({'error': 'Failed to start price stats rebuild'}), 500
+
+@admin_bp.route('/price-stats/refresh-windows', methods=['POST'])
+@admin_required
+def refresh_price_stats_windows():
+    """Recompute the 30/90/365-day price windows now"""
+    try:
+        if not get_price_stats_service:
+            return jsonify({'error': 'Price stats not available'}), 503
+        
+        result = get_price_stats_service().refresh_windows_once()
+        if result is None:
+            return jsonify({'error': 'A window refresh is already running'}), 409
+        
+        return jsonify({
+            'message': 'Price windows refreshed',
+            'result': result,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Refresh price windows error: {e}")
+        return jsonify({'error': 'Failed to refresh price windows'}), 500
+
+@admin_bp.route('/market-insights/run', methods=['POST'])
+@admin_required
+def run_market_insights():
+    """Run the market insights rollup in the background (full=true recomputes every period)"""
+    try:
+        if not get_market_insights_service:
+            return jsonify({'error': 'Market insights not available'}), 503
+        
+        data = request.get_json(silent=True) or {}
+        full = bool(data.get('full', False))
+        service = get_market_insights_service()
+        
+        def run_rollup():
+            try:
+                if service.run_once(full=full) is None:
+                    logger.info("Market insights rollup already running elsewhere")
+            except Exception as e:
+                logger.error(f"Market insights rollup error: {e}")
+        
+        threading.Thread(target=run_rollup, name='market-insights-run', daemon=True).start()
+        
+        return jsonify({
+            'message': 'Market insights rollup started',
+            'full': full,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 202
+    
+    except Exception as e:
+        logger.error(f"Start market insights rollup error: {e}")
+        return jsonify({'error': 'Failed to start market insights rollup'}), 500
+
+@admin_bp.route('/import/price-history', methods=['POST'])
+@admin_required
+def import_price_history():
+    """
+    Import price entries in bulk (same fields as DatabaseService.add_price_entry)
+    Written as multi-row upserts in one transaction; responds with per-chunk timing
+    """
+    try:
+        db = get_db()
+        if not db:
+            return jsonify({'error': 'Database service unavailable'}), 503
+        
+        data = request.get_json(silent=True) or {}
+        entries = data.get('entries')
+        if not isinstance(entries, list) or not entries:
+            return jsonify({'error': 'entries must be a non-empty list'}), 400
+        
+        missing = [index for index, entry in enumerate(entries)
+                   if not isinstance(entry, dict) or not all(entry.get(key) is not None for key in IMPORT_REQUIRED_FIELDS)]
+        if missing:
+            return jsonify({
+                'error': f"Each entry needs {', '.join(IMPORT_REQUIRED_FIELDS)}",
+                'invalid_entries': missing[:20]
+            }), 400
+        
+        chunk_size = min(int(data['chunk_size']), 5000) if data.get('chunk_size') else None
+        result = db.add_price_entries(entries, chunk_size=chunk_size)
+        
+        return jsonify({
+            'message': 'Price history imported',
+            'result': result,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+    
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Import price history error: {e}")
+        return jsonify({'error': 'Failed to import price history'}), 500
+
+@admin_bp.route('/export/price-history', methods=['GET'])
+@admin_required
+def export_price_history():
+    """Stream price history as CSV (all films, or ?film_id=), oldest sale first"""
+    try:
+        db = get_db()
+        if not db:
+            return jsonify({'error': 'Database service unavailable'}), 503
+        
+        query = f"SELECT {', '.join(PRICE_HISTORY_EXPORT_COLUMNS)} FROM price_history"
+        params = []
+        if request.args.get('film_id'):
+            query += " WHERE film_id = %s"
+            params.append(int(request.args['film_id']))
+        query += " ORDER BY sale_date, id"
+        
+        # Read and written a batch at a time, so the export size is not bounded by worker memory
+        rows = started(db.iter_query(query, params, as_tuples=True))
+        filename = f"price_history_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.csv"
+        
+        return Response(
+            stream_with_context(csv_stream(PRICE_HISTORY_EXPORT_COLUMNS, rows)),
+            status=200,
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    except ValueError:
+        return jsonify({'error': 'film_id must be an integer'}), 400
+    except Exception as e:
+        logger.error(f"Export price history error: {e}")
+        return jsonify({'error': 'Failed to export price history'}), 500
+
 @admin_bp.route('/backup/create', methods=['POST'])
 @admin_required
 def create_backup():
@@ -19,6 +19,8 @@ except ImportError:
     def get_db():
         return None
 
+from utils.pagination import InvalidCursorError, decode_cursor, keyset_page, seek_condition
+
 logger = logging.getLogger(__name__)
 
 # Create blueprint
@@ -381,21 +383,31 @@ def list_users():
         if not db:
             return jsonify({'error': 'Database service unavailable'}), 503
         
-        page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
-        offset = (page - 1) * per_page
+        cursor = request.args.get('cursor')
+        
+        # Newest first, seeking on (created_at, id) instead of skipping rows with OFFSET
+        where, params = "", []
+        if cursor:
+            seek, params = seek_condition(
+                [('created_at', [], True), ('id', [], True)], decode_cursor(cursor, 'users')
+            )
+            where = f"WHERE {seek}"
         
-        query = """
+        query = f"""
         SELECT id, username, email, first_name, last_name, 
                is_active, is_verified, created_at, last_login
         FROM users 
-        ORDER BY created_at DESC 
-        LIMIT %s OFFSET %s
+        {where}
+        ORDER BY created_at DESC, id DESC 
+        LIMIT %s
         """
         
-        success, users = db.execute_query(query, (per_page, offset), fetch=True)
+        success, users = db.execute_query(query, params + [per_page + 1], fetch=True)
         
         if success:
+            users, next_cursor = keyset_page(users, per_page, 'users', lambda user: (user['created_at'], user['id']))
+            
             # Convert datetime objects to strings
             for user in users:
                 if user.get('created_at'):
@@ -405,12 +417,15 @@ def list_users():
             
             return jsonify({
                 'users': users,
-                'page': page,
-                'per_page': per_page
+                'per_page': per_page,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None
             }), 200
         else:
             return jsonify({'error': 'Failed to fetch users'}), 500
             
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"List users error: {e}")
         return jsonify({'error': 'Failed to fetch users'}), 500
@@ -8,7 +8,6 @@ flask==2.3.3
 requests==2.31.0
 python-dotenv==1.0.0
 sqlite3
-schedule==1.2.0
 flask-cors==4.0.0
 """
 
@@ -32,13 +31,27 @@ DATABASE_URL=sqlite:///retroprice.db
 
 import requests
 import json
+import math
 import time
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+from utils.title_classifier import classify_title
+
+# Share the eBay request budget with the main app's services when its utils are importable
+try:
+    from utils.token_bucket import RateLimitExceeded, get_rate_limiter
+    ebay_rate_limiter = get_rate_limiter('ebay', rate=1.0, capacity=1)
+except ImportError:
+    ebay_rate_limiter = None
+    
+    class RateLimitExceeded(Exception):
+        """Never raised standalone: the local throttle below only waits up to a second"""
+
 class EbayAPIClient:
     def __init__(self):
         self.app_id = os.getenv('EBAY_APP_ID')
@@ -52,6 +65,24 @@ class EbayAPIClient:
             self.base_url = "https://api.sandbox.ebay.com"
         else:
             self.base_url = "https://api.ebay.com"
+        
+        self._last_request = 0
+        self._request_lock = threading.Lock()
+    
+    def _wait_for_rate_budget(self):
+        """
+        Take a token from the shared eBay budget (1 request/second when running standalone)
+        Raises RateLimitExceeded at once on a request thread; the refresh scheduler waits
+        """
+        if ebay_rate_limiter:
+            ebay_rate_limiter.acquire_or_raise()
+            return
+        
+        with self._request_lock:
+            wait = self._last_request + 1.0 - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request = time.time()
     
     def get_oauth_token(self):
         """Get OAuth 2.0 token for API access"""
@@ -73,7 +104,7 @@ class EbayAPIClient:
         else:
             raise Exception(f"OAuth failed: {response.text}")
     
-    def search_completed_listings(self, keywords, category_id=None, limit=100):
+    def search_completed_listings(self, keywords, category_id=None, limit=100, offset=0):
         """Search for completed/sold listings"""
         token = self.get_oauth_token()
         
@@ -90,13 +121,14 @@ class EbayAPIClient:
             'filter': 'buyingOptions:{AUCTION},buyingOptions:{FIXED_PRICE},conditionIds:{1000|1500|2000|2500|3000}',
             'sort': 'endTimeSoonest',
             'limit': min(limit, 200),  # eBay max is 200
-            'offset': 0
+            'offset': offset
         }
         
         # Add category filter for VHS/DVD
         if category_id:
             params['category_ids'] = category_id
         
+        self._wait_for_rate_budget()
         response = requests.get(url, headers=headers, params=params)
         
         if response.status_code == 200:
@@ -138,13 +170,18 @@ import sqlite3
 from contextlib import contextmanager
 
 class Database:
+    # SQLite allows one writer at a time; refresh workers take this around
+    # their writes instead of failing with "database is locked"
+    write_lock = threading.RLock()
+    BUSY_TIMEOUT = 30  # Seconds to wait on another process's write
+    
     def __init__(self, db_path='retroprice.db'):
         self.db_path = db_path
         self.init_database()
     
     @contextmanager
     def get_connection(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=self.BUSY_TIMEOUT)
         conn.row_factory = sqlite3.Row
         try:
             yield conn
@@ -174,6 +211,7 @@ class Database:
                 CREATE TABLE IF NOT EXISTS price_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     item_id INTEGER,
+                    ebay_id TEXT, -- The sold listing; one row per listing
                     price DECIMAL(10,2),
                     shipping_cost DECIMAL(10,2),
                     condition_name TEXT,
@@ -203,20 +241,66 @@ class Database:
                     FOREIGN KEY (watchlist_id) REFERENCES watchlist (id)
                 );
 
+                -- Newest sale already ingested per (query, format), for incremental crawls
+                CREATE TABLE IF NOT EXISTS crawl_watermarks (
+                    query TEXT NOT NULL,
+                    format TEXT NOT NULL DEFAULT '',
+                    last_sold_date TIMESTAMP NOT NULL,
+                    boundary_item_ids TEXT, -- JSON list of items sold exactly at last_sold_date
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (query, format)
+                );
+
+                -- Scheduler state: leader lease, refresh runs and per-query progress
+                CREATE TABLE IF NOT EXISTS scheduler_leases (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+
+                CREATE TABLE IF NOT EXISTS refresh_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    planned INTEGER NOT NULL DEFAULT 0,
+                    completed INTEGER NOT NULL DEFAULT 0,
+                    started_at REAL NOT NULL,
+                    finished_at REAL
+                );
+
+                CREATE TABLE IF NOT EXISTS refresh_state (
+                    title TEXT NOT NULL,
+                    format TEXT NOT NULL DEFAULT '',
+                    last_refreshed_at REAL,
+                    last_run_id INTEGER,
+                    last_new_sales INTEGER DEFAULT 0,
+                    last_error TEXT,
+                    PRIMARY KEY (title, format)
+                );
+
                 CREATE INDEX IF NOT EXISTS idx_items_title ON items(title);
                 CREATE INDEX IF NOT EXISTS idx_price_history_item_date ON price_history(item_id, sale_date);
                 CREATE INDEX IF NOT EXISTS idx_price_history_date ON price_history(sale_date);
             ''')
+            
+            # Databases created before price_history.ebay_id; their old rows keep NULL, which never collides
+            columns = {row['name'] for row in conn.execute('PRAGMA table_info(price_history)')}
+            if 'ebay_id' not in columns:
+                conn.execute('ALTER TABLE price_history ADD COLUMN ebay_id TEXT')
+            conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_price_history_ebay_id ON price_history(ebay_id)')
             conn.commit()
     
     def save_item(self, item_data):
-        """Save or update an item"""
+        """Save or update an item, keeping its id (price_history rows point at it)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO items 
+                INSERT INTO items 
                 (ebay_id, title, subtitle, format, year, studio, category_id, condition_id, image_url, updated_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (ebay_id) DO UPDATE SET
+                    title = excluded.title, subtitle = excluded.subtitle, format = excluded.format,
+                    year = excluded.year, studio = excluded.studio, category_id = excluded.category_id,
+                    condition_id = excluded.condition_id, image_url = excluded.image_url,
+                    updated_at = CURRENT_TIMESTAMP
             ''', (
                 item_data.get('ebay_id'),
                 item_data.get('title'),
@@ -229,18 +313,24 @@ class Database:
                 item_data.get('image_url')
             ))
             conn.commit()
+            
+            # lastrowid is not the item's id when the upsert updated an existing row
+            if item_data.get('ebay_id'):
+                cursor.execute('SELECT id FROM items WHERE ebay_id = ?', (item_data['ebay_id'],))
+                return cursor.fetchone()['id']
             return cursor.lastrowid
     
     def save_price_data(self, item_id, price_data):
-        """Save price history data"""
+        """Save price history data (a sale that is already stored is left as is)"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO price_history 
-                (item_id, price, shipping_cost, condition_name, sale_date, platform, listing_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
+                INSERT OR IGNORE INTO price_history 
+                (item_id, ebay_id, price, shipping_cost, condition_name, sale_date, platform, listing_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 item_id,
+                price_data.get('ebay_id'),
                 price_data.get('price'),
                 price_data.get('shipping_cost', 0),
                 price_data.get('condition'),
@@ -250,6 +340,136 @@ class Database:
             ))
             conn.commit()
     
+    def get_watermark(self, query, format_type=None):
+        """Get the newest ingested sale date (and the items sold at it) for a query"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT last_sold_date, boundary_item_ids
+                FROM crawl_watermarks
+                WHERE query = ? AND format = ?
+            ''', (query, format_type or ''))
+            row = cursor.fetchone()
+            
+            if not row:
+                return None
+            return {
+                'last_sold_date': row['last_sold_date'],
+                'boundary_item_ids': set(json.loads(row['boundary_item_ids'] or '[]'))
+            }
+    
+    def save_watermark(self, query, format_type, last_sold_date, boundary_item_ids):
+        """Advance the watermark for a query after a successful crawl"""
+        with self.get_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO crawl_watermarks
+                (query, format, last_sold_date, boundary_item_ids, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (query, format_type or '', last_sold_date, json.dumps(sorted(boundary_item_ids))))
+            conn.commit()
+    
+    def acquire_lease(self, name, holder, ttl):
+        """Take or renew a named lease; False while another holder's lease is unexpired"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            now = time.time()
+            row = conn.execute(
+                'SELECT holder, expires_at FROM scheduler_leases WHERE name = ?', (name,)
+            ).fetchone()
+            
+            if row and row[0] != holder and row[1] > now:
+                conn.execute('COMMIT')
+                return False
+            
+            conn.execute('''
+                INSERT OR REPLACE INTO scheduler_leases (name, holder, expires_at)
+                VALUES (?, ?, ?)
+            ''', (name, holder, now + ttl))
+            conn.execute('COMMIT')
+            return True
+        finally:
+            conn.close()
+    
+    def release_lease(self, name, holder):
+        """Give up a lease so another worker can take over immediately"""
+        with self.get_connection() as conn:
+            conn.execute('DELETE FROM scheduler_leases WHERE name = ? AND holder = ?', (name, holder))
+            conn.commit()
+    
+    def get_refresh_candidates(self, volatility_days=30):
+        """
+        Watched (title, format) pairs with the inputs for refresh priority:
+        watcher count, recent price mean/mean-square and last refresh time
+        """
+        cutoff = (datetime.utcnow() - timedelta(days=volatility_days)).isoformat()
+        
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT w.title, w.format, w.watchers,
+                       p.avg_price, p.avg_price_sq, COALESCE(p.sales, 0) AS sales,
+                       r.last_refreshed_at, r.last_run_id
+                FROM (
+                    SELECT i.title, COALESCE(i.format, '') AS format,
+                           COUNT(DISTINCT wl.user_id) AS watchers
+                    FROM items i
+                    JOIN watchlist wl ON i.id = wl.item_id
+                    WHERE wl.alert_enabled = 1
+                    GROUP BY i.title, COALESCE(i.format, '')
+                ) w
+                LEFT JOIN (
+                    SELECT i.title, COALESCE(i.format, '') AS format,
+                           AVG(ph.price) AS avg_price, AVG(ph.price * ph.price) AS avg_price_sq,
+                           COUNT(*) AS sales
+                    FROM price_history ph
+                    JOIN items i ON i.id = ph.item_id
+                    WHERE ph.sale_date >= ?
+                    GROUP BY i.title, COALESCE(i.format, '')
+                ) p ON p.title = w.title AND p.format = w.format
+                LEFT JOIN refresh_state r ON r.title = w.title AND r.format = w.format
+            ''', (cutoff,))
+            
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_unfinished_run(self):
+        """Get the refresh run interrupted by a restart, if any"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM refresh_runs WHERE finished_at IS NULL ORDER BY id DESC LIMIT 1')
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def get_last_finished_run(self):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM refresh_runs WHERE finished_at IS NOT NULL ORDER BY id DESC LIMIT 1')
+            row = cursor.fetchone()
+            return dict(row) if row else None
+    
+    def start_run(self, planned):
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('INSERT INTO refresh_runs (planned, started_at) VALUES (?, ?)', (planned, time.time()))
+            conn.commit()
+            return cursor.lastrowid
+    
+    def finish_run(self, run_id):
+        with self.get_connection() as conn:
+            conn.execute('UPDATE refresh_runs SET finished_at = ? WHERE id = ?', (time.time(), run_id))
+            conn.commit()
+    
+    def mark_refreshed(self, title, format_type, run_id, new_sales=0, error=None):
+        """Record one title's refresh so a restarted run skips it"""
+        with self.write_lock, self.get_connection() as conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO refresh_state
+                (title, format, last_refreshed_at, last_run_id, last_new_sales, last_error)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (title, format_type or '', time.time(), run_id, new_sales, error))
+            conn.execute('UPDATE refresh_runs SET completed = completed + 1 WHERE id = ?', (run_id,))
+            conn.commit()
+    
     def search_items(self, query, format_filter=None, limit=50):
         """Search items in database"""
         with self.get_connection() as conn:
@@ -281,6 +501,9 @@ class Database:
 # ================================
 
 class PriceDataProcessor:
+    PAGE_SIZE = 100
+    MAX_INCREMENTAL_PAGES = 10  # Safety cap on pages read per crawl
+    
     def __init__(self):
         self.ebay_client = EbayAPIClient()
         self.db = Database()
@@ -289,27 +512,148 @@ class PriceDataProcessor:
         """Process eBay search results and save to database"""
         print(f"Searching eBay for: {search_term}")
         
-        # Category IDs for VHS/DVD
-        category_map = {
-            'VHS': '309',  # VHS movies
-            'DVD': '617'   # DVD movies
-        }
-        
-        category_id = category_map.get(format_type.upper()) if format_type else None
-        
         results = self.ebay_client.search_completed_listings(
             keywords=search_term,
-            category_id=category_id,
-            limit=100
+            category_id=self._category_for(format_type),
+            limit=self.PAGE_SIZE
         )
         
         if not results or 'itemSummaries' not in results:
             print("No results found")
             return []
         
+        processed_items = self._save_items(results['itemSummaries'])
+        
+        print(f"Processed {len(processed_items)} items")
+        return processed_items
+    
+    def process_new_sales(self, search_term, format_type=None):
+        """
+        Incrementally crawl a query: only sales newer than its watermark are processed
+        
+        Completed listings come back most recently ended first, so paging stops
+        at the first sale at or below the watermark; everything after it was
+        ingested by an earlier crawl.
+        """
+        watermark = self.db.get_watermark(search_term, format_type)
+        last_seen = self._parse_sale_date(watermark['last_sold_date']) if watermark else None
+        seen_at_boundary = watermark['boundary_item_ids'] if watermark else set()
+        
+        new_items = []
+        pages = 0
+        exhausted = False
+        reached_watermark = False
+        
+        while pages < self.MAX_INCREMENTAL_PAGES:
+            results = self.ebay_client.search_completed_listings(
+                keywords=search_term,
+                category_id=self._category_for(format_type),
+                limit=self.PAGE_SIZE,
+                offset=pages * self.PAGE_SIZE
+            )
+            pages += 1
+            
+            if results is None:
+                break  # Search failed; keep the old watermark so nothing is skipped
+            if not results.get('itemSummaries'):
+                exhausted = True
+                break
+            
+            for item in results['itemSummaries']:
+                sold_at = self._parse_sale_date(item.get('itemEndDate'))
+                if last_seen and sold_at:
+                    if sold_at < last_seen:
+                        reached_watermark = True
+                        break
+                    # Sales at the watermark's own timestamp are new unless already ingested
+                    if sold_at == last_seen and item.get('itemId') in seen_at_boundary:
+                        continue
+                new_items.append(item)
+            
+            if reached_watermark:
+                break
+            if not results.get('next'):
+                exhausted = True
+                break
+        
+        processed_items = self._save_items(new_items)
+        saved_ids = {item['ebay_id'] for item in processed_items}
+        
+        # The watermark may only cover sales that were all read: stopping at the
+        # page cap would leave unread ones between the last page and the old mark
+        if exhausted or reached_watermark or not last_seen:
+            self._advance_watermark(search_term, format_type, new_items, saved_ids, last_seen, seen_at_boundary)
+        else:
+            print(f"Crawl of '{search_term}' stopped at the page cap before its watermark; watermark unchanged")
+        
+        print(f"Processed {len(processed_items)} new sales for '{search_term}' in {pages} page(s)")
+        return processed_items
+    
+    def _advance_watermark(self, search_term, format_type, new_items, saved_ids, last_seen, seen_at_boundary):
+        """
+        Move the query's watermark up over the sales just ingested
+        
+        It stops below the oldest sale that failed to save, so the next crawl
+        reads that sale again; everything newer is skipped by the unique
+        ebay_id when it is saved a second time.
+        """
+        dated = [
+            (self._parse_sale_date(item.get('itemEndDate')), item.get('itemId'))
+            for item in new_items
+        ]
+        dated = sorted((sold_at, item_id or '') for sold_at, item_id in dated if sold_at)
+        
+        saved_run = []
+        for sold_at, item_id in dated:
+            if item_id not in saved_ids:
+                print(f"Sale {item_id} of '{search_term}' failed to save; watermark held below it")
+                break
+            saved_run.append((sold_at, item_id))
+        if not saved_run:
+            return
+        
+        newest = saved_run[-1][0]
+        boundary = {item_id for sold_at, item_id in saved_run if sold_at == newest}
+        if newest == last_seen:
+            boundary |= seen_at_boundary
+        elif last_seen and newest < last_seen:
+            return
+        
+        self.db.save_watermark(search_term, format_type, newest.isoformat(), boundary)
+    
+    @staticmethod
+    def _parse_sale_date(date_string):
+        """Parse an eBay ISO timestamp, returning None if missing or invalid"""
+        if not date_string:
+            return None
+        try:
+            parsed = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    
+    @staticmethod
+    def _category_for(format_type):
+        """Get the eBay category for a format"""
+        # Category IDs for VHS/DVD
+        category_map = {
+            'VHS': '309',  # VHS movies
+            'DVD': '617'   # DVD movies
+        }
+        
+        return category_map.get(format_type.upper()) if format_type else None
+    
+    def _save_items(self, items):
+        """Save eBay items and their prices (one writer at a time, see Database.write_lock)"""
+        with self.db.write_lock:
+            return self._save_items_locked(items)
+    
+    def _save_items_locked(self, items):
         processed_items = []
         
-        for item in results['itemSummaries']:
+        for item in items:
             try:
                 # Extract item data
                 item_data = self._extract_item_data(item)
@@ -331,34 +675,22 @@ class PriceDataProcessor:
                 print(f"Error processing item {item.get('itemId')}: {e}")
                 continue
         
-        print(f"Processed {len(processed_items)} items")
         return processed_items
     
     def _extract_item_data(self, ebay_item):
         """Extract item information from eBay API response"""
         title = ebay_item.get('title', '')
         
-        # Determine format from title
-        format_type = 'Unknown'
-        if 'VHS' in title.upper():
-            format_type = 'VHS'
-        elif 'DVD' in title.upper():
-            format_type = 'DVD'
-        elif 'BLU-RAY' in title.upper() or 'BLURAY' in title.upper():
-            format_type = 'Blu-ray'
-        
-        # Extract year (simple regex)
-        import re
-        year_match = re.search(r'\((\d{4})\)|\b(19\d{2}|20\d{2})\b', title)
-        year = int(year_match.group(1) or year_match.group(2)) if year_match else None
+        # Format, year and studio from one scan of the title
+        title_attributes = classify_title(title)
         
         return {
             'ebay_id': ebay_item.get('itemId'),
             'title': title,
             'subtitle': ebay_item.get('subtitle'),
-            'format': format_type,
-            'year': year,
-            'studio': self._extract_studio(title),
+            'format': title_attributes['format'],
+            'year': title_attributes['year'],
+            'studio': title_attributes['studio'],
             'category_id': ebay_item.get('categories', [{}])[0].get('categoryId'),
             'condition_id': ebay_item.get('condition', {}).get('conditionId'),
             'image_url': ebay_item.get('image', {}).get('imageUrl')
@@ -378,25 +710,13 @@ class PriceDataProcessor:
             shipping_cost = float(shipping_info['shippingCost'].get('value', 0))
         
         return {
+            'ebay_id': ebay_item.get('itemId'),
             'price': price,
             'shipping_cost': shipping_cost,
             'condition': ebay_item.get('condition', {}).get('conditionDisplayName'),
             'sale_date': ebay_item.get('itemEndDate', datetime.now().isoformat()),
             'listing_type': ebay_item.get('buyingOptions', [None])[0]
         }
-    
-    def _extract_studio(self, title):
-        """Extract movie studio from title (basic implementation)"""
-        studios = [
-            'Universal', 'Disney', 'Warner', 'Paramount', 'Sony', 
-            'MGM', 'Fox', '20th Century', 'Columbia', 'Lionsgate'
-        ]
-        
-        title_upper = title.upper()
-        for studio in studios:
-            if studio.upper() in title_upper:
-                return studio
-        return None
 
 # ================================
 # 5. Flask API Endpoints
@@ -436,6 +756,8 @@ def search_items():
             'count': len(results)
         })
     
+    except RateLimitExceeded as e:
+        return jsonify({'error': str(e), 'retry_after': math.ceil(e.retry_after)}), 429
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -538,48 +860,171 @@ def get_watchlist(user_id):
 # 6. Background Job Scheduler
 # ================================
 
-import schedule
-import threading
-import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import atexit
+import uuid
 
-def update_prices():
-    """Background job to update prices for watched items"""
-    print("Running price update job...")
+class RefreshScheduler:
+    """
+    Single-leader scheduler for watched-title price refreshes
     
-    try:
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT DISTINCT i.title, i.format 
-                FROM items i
-                JOIN watchlist w ON i.id = w.item_id
-                WHERE w.alert_enabled = 1
-            ''')
+    Every worker process runs this loop, but only the holder of the
+    'price_refresh' lease in the database runs refreshes. The lease is held
+    for the length of a run and released when it ends (or the worker stops),
+    so the next run starts on whichever worker takes it first. Each run ranks watched titles by
+    staleness x watchers x price volatility and refreshes them on a bounded
+    thread pool (eBay calls still go through the shared rate budget).
+    Progress is stored per query, so a run interrupted by a restart resumes
+    with the titles it had not reached yet.
+    """
+    
+    LEASE_NAME = 'price_refresh'
+    
+    def __init__(self, processor, db):
+        self.processor = processor
+        self.db = db
+        self.holder = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        
+        self.interval = int(os.getenv('SCHEDULER_INTERVAL', '3600'))  # Seconds between runs
+        self.workers = int(os.getenv('SCHEDULER_WORKERS', '4'))
+        self.max_per_run = int(os.getenv('SCHEDULER_MAX_PER_RUN', '200'))
+        self.lease_ttl = int(os.getenv('SCHEDULER_LEASE_TTL', '120'))
+        self.never_refreshed_hours = 24 * 7  # Staleness assumed for titles never refreshed
+        self._run_lock = threading.Lock()  # One run at a time within this worker
+        self._stopping = threading.Event()
+    
+    def run_forever(self):
+        """Scheduler loop: take the lease and start runs when due, until stop() is called"""
+        while not self._stopping.is_set():
+            try:
+                if self.db.acquire_lease(self.LEASE_NAME, self.holder, self.lease_ttl):
+                    if self._run_due():
+                        self.run_now()
+                    else:
+                        self.db.release_lease(self.LEASE_NAME, self.holder)
+            except Exception as e:
+                print(f"Scheduler error: {e}")
             
-            items_to_update = cursor.fetchall()
+            self._stopping.wait(self.lease_ttl / 3)
+    
+    def stop(self):
+        """Stop scheduling and hand the lease over now instead of when it expires"""
+        self._stopping.set()
+        try:
+            self.db.release_lease(self.LEASE_NAME, self.holder)
+        except Exception as e:
+            print(f"Scheduler error releasing lease: {e}")
+    
+    def _run_due(self):
+        if self.db.get_unfinished_run():
+            return True
+        last_run = self.db.get_last_finished_run()
+        return not last_run or time.time() - last_run['finished_at'] >= self.interval
+    
+    def rank(self, candidates):
+        """Order candidates by staleness (hours) x watchers x (1 + coefficient of variation)"""
+        now = time.time()
         
-        for item in items_to_update:
-            search_term = f"{item['title']} {item['format']}"
-            processor.process_search_results(search_term, item['format'])
-            time.sleep(2)  # Rate limiting
+        def priority(candidate):
+            if candidate['last_refreshed_at']:
+                staleness = max(now - candidate['last_refreshed_at'], 0) / 3600
+            else:
+                staleness = self.never_refreshed_hours
+            
+            volatility = 0
+            mean = candidate['avg_price']
+            if mean and candidate['sales'] > 1:
+                variance = max(candidate['avg_price_sq'] - mean * mean, 0)
+                volatility = variance ** 0.5 / mean
+            
+            return staleness * candidate['watchers'] * (1 + volatility)
         
-        print(f"Updated prices for {len(items_to_update)} items")
+        return sorted(candidates, key=priority, reverse=True)
     
-    except Exception as e:
-        print(f"Error updating prices: {e}")
-
-def run_scheduler():
-    """Run the background scheduler"""
-    schedule.every(1).hours.do(update_prices)
-    schedule.every().day.at("09:00").do(update_prices)
+    def run_now(self):
+        """
+        Run a refresh now if this worker can take the lease and no run is in progress
+        Returns the number of new sales, or None when another run holds the lease
+        """
+        if not self.db.acquire_lease(self.LEASE_NAME, self.holder, self.lease_ttl):
+            print("Price refresh already running on another worker; skipped")
+            return None
+        if not self._run_lock.acquire(blocking=False):
+            print("Price refresh already running; skipped")
+            return None
+        try:
+            return self.run_once()
+        finally:
+            # The next due run can start on whichever worker takes the lease first
+            self.db.release_lease(self.LEASE_NAME, self.holder)
+            self._run_lock.release()
+    
+    def run_once(self):
+        """Refresh the highest-priority titles, resuming an interrupted run if there is one"""
+        candidates = self.db.get_refresh_candidates()
+        run = self.db.get_unfinished_run()
+        
+        if run:
+            run_id = run['id']
+            candidates = [c for c in candidates if c['last_run_id'] != run_id]
+            planned = max(run['planned'] - run['completed'], 0)
+            print(f"Resuming refresh run {run_id} ({run['completed']}/{run['planned']} done)")
+        else:
+            planned = min(len(candidates), self.max_per_run)
+            run_id = self.db.start_run(planned)
+        
+        queue = self.rank(candidates)[:planned]
+        new_sales = 0
+        lost_lease = False
+        
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='price-refresh') as pool:
+            pending = set()
+            for candidate in queue:
+                pending.add(pool.submit(self._refresh, candidate, run_id))
+            
+            while pending:
+                done, pending = wait(pending, timeout=self.lease_ttl / 3, return_when=FIRST_COMPLETED)
+                new_sales += sum(future.result() for future in done)
+                
+                # Keep the lease while the run is in progress; stop early if another worker took over
+                if self._stopping.is_set() or not self.db.acquire_lease(self.LEASE_NAME, self.holder, self.lease_ttl):
+                    lost_lease = True
+                    for future in pending:
+                        future.cancel()
+                    break
+        
+        if lost_lease:
+            print(f"Stopped or lost the scheduler lease during run {run_id}; the next leader will resume it")
+            return new_sales
+        
+        self.db.finish_run(run_id)
+        print(f"Refresh run {run_id}: updated {len(queue)} titles ({new_sales} new sales)")
+        return new_sales
     
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+    def _refresh(self, candidate, run_id):
+        """Refresh one title and record its progress"""
+        format_type = candidate['format'] or None
+        search_term = f"{candidate['title']} {candidate['format']}".strip()
+        
+        try:
+            new_sales = len(self.processor.process_new_sales(search_term, format_type))
+            self.db.mark_refreshed(candidate['title'], format_type, run_id, new_sales)
+            return new_sales
+        except Exception as e:
+            print(f"Error refreshing '{search_term}': {e}")
+            self.db.mark_refreshed(candidate['title'], format_type, run_id, error=str(e))
+            return 0
+
+def update_prices():
+    """Run one price refresh now (for manual use); skipped while a scheduled run holds the lease"""
+    return scheduler.run_now()
 
-# Start background scheduler
-scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-scheduler_thread.start()
+# Start background scheduler (every worker starts it; only the lease holder runs refreshes)
+scheduler = RefreshScheduler(processor, db)
+if os.getenv('SCHEDULER_ENABLED', 'True').lower() == 'true':
+    scheduler_thread = threading.Thread(target=scheduler.run_forever, name='price-refresh-scheduler', daemon=True)
+    scheduler_thread.start()
+    atexit.register(scheduler.stop)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
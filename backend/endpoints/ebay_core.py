@@ -7,23 +7,28 @@ Handles eBay Marketplace Insights API calls for movie price data
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
 import requests
+import math
 import os
 import time
 from functools import wraps
 import logging
 
 # Import custom modules
-from services.ebay_service import EbayService
+from services.ebay_service import get_ebay_service
 from utils.rate_limiter import RateLimiter
 from utils.auth import require_api_key
 from models.price_history import PriceHistory
-from models.film import Film
+from services.ingestion_service import get_ingestion_service
+from services.ingestion_queue import get_ingestion_queue, get_ingestion_workers
+from config.config import Config
+from utils.title_classifier import classify_title
+from utils.token_bucket import RateLimitExceeded
 
 # Create Blueprint
 ebay_bp = Blueprint('ebay_api', __name__, url_prefix='/api/ebay')
 
 # Initialize services
-ebay_service = EbayService()
+ebay_service = get_ebay_service()
 rate_limiter = RateLimiter(max_requests=100, window_seconds=3600)  # 100 requests per hour
 
 # Configure logging
@@ -60,6 +65,8 @@ def search_sold_items():
     - limit: Number of results (default: 50, max: 200)
     - offset: Pagination offset (default: 0)
     - sort: Sort order (price, -price, or best_match)
+    - all_pages: Fetch every result page concurrently (default: false)
+    - max_items: Maximum sales to fetch when all_pages is set (default: 10000)
     """
     try:
         # Get query parameters
@@ -72,6 +79,8 @@ def search_sold_items():
         limit = min(int(request.args.get('limit', 50)), 200)
         offset = int(request.args.get('offset', 0))
         sort_order = request.args.get('sort', '')
+        all_pages = request.args.get('all_pages', 'false').lower() == 'true'
+        max_items = int(request.args.get('max_items', 0)) or None
         
         # Validate required parameters
         if not query and not category_ids:
@@ -120,17 +129,29 @@ def search_sold_items():
         
         # Make eBay API call
         logger.info(f"eBay search request: {search_params}")
-        response_data = ebay_service.search_sold_items(search_params)
+        if all_pages:
+            response_data = ebay_service.search_all_sold_items(search_params, max_items=max_items)
+        else:
+            response_data = ebay_service.search_sold_items(search_params)
         
         # Process and enhance results
         processed_results = process_ebay_results(response_data, query)
         
-        # Store price history in database
-        if 'itemSales' in response_data:
+        # Store price history in database (cached responses were stored when first fetched)
+        if 'itemSales' in response_data and not response_data.get('fromCache'):
             store_price_history(response_data['itemSales'], query)
         
         return jsonify(processed_results), 200
         
+    except RateLimitExceeded as e:
+        # Answer now rather than hold the request thread until eBay has a free slot
+        logger.warning(f"eBay search rejected: {str(e)}")
+        return jsonify({
+            'error': 'Rate limit exceeded',
+            'message': 'eBay request budget is used up. Please try again shortly.',
+            'retry_after': math.ceil(e.retry_after)
+        }), 429
+        
     except requests.exceptions.RequestException as e:
         logger.error(f"eBay API request failed: {str(e)}")
         return jsonify({
@@ -323,12 +344,12 @@ def process_ebay_results(ebay_response, search_query):
         if 'prev' in ebay_response:
             processed['prev_page'] = ebay_response['prev']
         
-        # Process each item
+        # Process each item; EbayService already classified the titles it enhanced
         for item in ebay_response.get('itemSales', []):
             processed_item = {
                 'item_id': item.get('itemId'),
                 'title': item.get('title'),
-                'format': detect_format(item.get('title', '')),
+                'format': item.get('detectedFormat') or detect_format(item.get('title', '')),
                 'condition': item.get('condition'),
                 'condition_id': item.get('conditionId'),
                 'price': {
@@ -366,49 +387,24 @@ def detect_format(title):
     """
     Detect movie format from title
     """
-    title_upper = title.upper()
-    if 'VHS' in title_upper:
-        return 'VHS'
-    elif 'DVD' in title_upper:
-        return 'DVD'
-    elif 'BLU-RAY' in title_upper or 'BLURAY' in title_upper:
-        return 'Blu-ray'
-    elif '4K' in title_upper or 'UHD' in title_upper:
-        return '4K UHD'
-    else:
-        return 'Unknown'
+    return classify_title(title)['format']
 
 def store_price_history(items, search_query):
     """
     Store price history data in database
+    Queued for the background ingestion workers so the search response doesn't
+    wait on database writes; written inline when INGESTION_ASYNC is off
     """
     try:
-        for item in items:
-            # Find or create film record
-            film = Film.find_or_create_by_title_format(
-                title=item.get('title'),
-                format=detect_format(item.get('title', ''))
-            )
-            
-            # Create price history record
-            price_data = {
-                'film_id': film.id,
-                'price': float(item.get('lastSoldPrice', {}).get('value', 0)),
-                'currency': item.get('lastSoldPrice', {}).get('currency', 'USD'),
-                'condition_name': item.get('condition'),
-                'condition_id': item.get('conditionId'),
-                'sale_date': item.get('lastSoldDate'),
-                'platform': 'eBay',
-                'listing_type': 'Unknown',  # eBay doesn't always provide this
-                'seller_rating': item.get('seller', {}).get('feedbackScore'),
-                'total_sold_quantity': item.get('totalSoldQuantity', 1),
-                'external_listing_id': item.get('itemId'),
-                'external_listing_url': item.get('itemWebUrl'),
-                'listing_title': item.get('title')
-            }
-            
-            PriceHistory.create(price_data)
-            
+        if Config.INGESTION_ASYNC:
+            get_ingestion_workers().start()
+            return get_ingestion_queue().enqueue(items, source=search_query)
+        
+        stats = get_ingestion_service().ingest_item_sales(items)
+        logger.info(f"Stored price history for '{search_query}': "
+                    f"{stats['rows_inserted']} rows at {stats['rows_per_sec']} rows/sec")
+        return stats
+        
     except Exception as e:
         logger.error(f"Error storing price history: {str(e)}")
 
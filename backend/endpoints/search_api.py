@@ -4,8 +4,12 @@ Film Price Guide - Search API
 Multi-source search endpoints for films and price data
 """
 
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 
 # Import services
@@ -18,11 +22,37 @@ except ImportError:
     def login_required(f):
         return f
 
+try:
+    from config.config import Config
+except ImportError:
+    Config = None
+
+try:
+    from utils.http_client import get_http_client
+except ImportError:
+    get_http_client = None
+
+from utils.search_merge import merge_results, paginate
+from utils.token_bucket import RateLimitExceeded, without_waiting
+from utils.streaming import json_stream, started
+from utils.pagination import (InvalidCursorError, decode_cursor, keyset_page, listing_scope,
+                              seek_condition)
+from utils.fulltext import (FILM_TITLE_COLUMNS, FILM_DIRECTOR_COLUMNS, searchable_words,
+                            match_clause, prefix_pattern)
+
 logger = logging.getLogger(__name__)
 
 # Create blueprint
 search_bp = Blueprint('search', __name__, url_prefix='/api/search')
 
+# ?period= values of the market insights endpoints -> market_insights.period_type
+MARKET_PERIODS = {
+    'daily': 'Daily',
+    'weekly': 'Weekly',
+    'monthly': 'Monthly',
+    'quarterly': 'Quarterly'
+}
+
 # ================================
 # SEARCH ENDPOINTS
 # ================================
@@ -35,45 +65,92 @@ def search_films():
         query = request.args.get('q', '').strip()
         format_filter = request.args.get('format')  # VHS, DVD, Blu-ray, etc.
         source = request.args.get('source', 'database')  # database, ebay, omdb, tmdb
+        mode = request.args.get('mode')  # boolean or natural FULLTEXT matching for the database
         limit = min(int(request.args.get('limit', 50)), 200)
         page = int(request.args.get('page', 1))
         
         if not query:
             return jsonify({'error': 'Search query is required'}), 400
         
-        results = []
-        total_count = 0
-        
+        cursor = request.args.get('cursor')
+        if cursor or request.args.get('paging') == 'cursor':
+            # Keyset paging: database results only, in index order, for deep crawls
+            if source != 'database':
+                return jsonify({'error': 'Cursor paging is only available for source=database'}), 400
+            db = get_db()
+            if not db:
+                return jsonify({'error': 'Database service unavailable'}), 503
+            
+            results, next_cursor = db.search_films_page(query, format_filter, limit, mode, cursor)
+            return jsonify({
+                'query': query,
+                'results': results,
+                'source': source,
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'has_next': next_cursor is not None,
+                'timestamp': datetime.utcnow().isoformat()
+            }), 200
+        
+        deadline_ms = Config.SEARCH_DEADLINE_MS if Config else 2000
+        if request.args.get('timeout_ms'):
+            try:
+                timeout_ms = int(request.args['timeout_ms'])
+            except ValueError:
+                return jsonify({'error': 'timeout_ms must be an integer number of milliseconds'}), 400
+            max_deadline_ms = Config.SEARCH_MAX_DEADLINE_MS if Config else 10000
+            deadline_ms = max(1, min(timeout_ms, max_deadline_ms))
+        
+        # Every page is cut from the same ranked window, so the fetch size must not depend on page
+        fetch_limit = min(max(limit, Config.SEARCH_FETCH_LIMIT if Config else 100), 200)
+        
+        sources = {}
         if source == 'database' or source == 'all':
             # Search local database
-            db = get_db()
-            if db:
-                db_results = db.search_films(query, format_filter, limit)
-                results.extend(db_results)
-                total_count += len(db_results)
+            sources['database'] = lambda: search_database(query, format_filter, fetch_limit, mode)
         
         if source == 'ebay' or source == 'all':
             # Search eBay (if API configured)
-            ebay_results = search_ebay(query, format_filter, limit)
-            results.extend(ebay_results)
-            total_count += len(ebay_results)
+            sources['ebay'] = lambda: search_ebay(query, format_filter, fetch_limit)
         
         if source == 'omdb' or source == 'all':
             # Search OMDb (if API configured)
-            omdb_results = search_omdb(query, limit)
-            results.extend(omdb_results)
-            total_count += len(omdb_results)
+            sources['omdb'] = lambda: search_omdb(query, fetch_limit)
+        
+        if source == 'tmdb' or source == 'all':
+            # Search TMDb (if API configured)
+            sources['tmdb'] = lambda: search_tmdb(query, fetch_limit)
+        
+        results_by_source, source_status = fan_out(sources, deadline_ms)
+        
+        if source_status and all(status['status'] == 'rate_limited' for status in source_status.values()):
+            return jsonify({
+                'error': 'Rate limit exceeded',
+                'message': 'Upstream request budget is used up. Please try again shortly.',
+                'retry_after': max(status['retry_after'] for status in source_status.values())
+            }), 429
+        
+        if request.args.get('merge', 'true').lower() in ('false', '0', 'no'):
+            # Raw per-source results, concatenated in source order
+            ranked = [item for items in results_by_source.values() for item in items]
+        else:
+            ranked = merge_results(query, results_by_source)
+        
+        results, pagination = paginate(ranked, page, limit)
         
         return jsonify({
             'query': query,
             'results': results,
-            'total_count': total_count,
-            'page': page,
-            'limit': limit,
             'source': source,
-            'timestamp': datetime.utcnow().isoformat()
+            'sources': source_status,
+            'partial': any(status['status'] != 'ok' for status in source_status.values()),
+            'deadline_ms': deadline_ms,
+            'timestamp': datetime.utcnow().isoformat(),
+            **pagination
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Search error: {e}")
         return jsonify({'error': 'Search failed'}), 500
@@ -91,8 +168,8 @@ def get_film_details(film_id):
         if not film:
             return jsonify({'error': 'Film not found'}), 404
         
-        # Get price history
-        price_history = db.get_price_history(film_id, limit=100)
+        # Get price history (the rest is paged through /films/<id>/price-history)
+        price_history, price_history_cursor = db.get_price_history_page(film_id, limit=100)
         
         # Calculate price statistics
         if price_history:
@@ -111,6 +188,7 @@ def get_film_details(film_id):
             'film': film,
             'price_history': price_history,
             'price_statistics': price_stats,
+            'price_history_next_cursor': price_history_cursor,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
@@ -118,6 +196,32 @@ def get_film_details(film_id):
         logger.error(f"Get film details error: {e}")
         return jsonify({'error': 'Failed to get film details'}), 500
 
+@search_bp.route('/films/<int:film_id>/price-history', methods=['GET'])
+def get_film_price_history(film_id):
+    """Page through a film's sales, newest first (cursor from the previous page's next_cursor)"""
+    try:
+        db = get_db()
+        if not db:
+            return jsonify({'error': 'Database service unavailable'}), 503
+        
+        limit = min(int(request.args.get('limit', 100)), 1000)
+        price_history, next_cursor = db.get_price_history_page(film_id, limit, request.args.get('cursor'))
+        
+        return jsonify({
+            'film_id': film_id,
+            'price_history': price_history,
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Get price history error: {e}")
+        return jsonify({'error': 'Failed to get price history'}), 500
+
 @search_bp.route('/autocomplete', methods=['GET'])
 def autocomplete():
     """Get autocomplete suggestions"""
@@ -183,13 +287,12 @@ def get_watchlist():
             return jsonify({'error': 'Database service unavailable'}), 503
         
         user_id = session['user_id']
-        watchlist = db.get_user_watchlist(user_id)
         
-        return jsonify({
-            'watchlist': watchlist,
-            'count': len(watchlist),
-            'timestamp': datetime.utcnow().isoformat()
-        }), 200
+        # Streamed straight from the cursor: long watchlists never sit in memory whole
+        watchlist = started(db.iter_user_watchlist(user_id))
+        body = json_stream('watchlist', watchlist, timestamp=datetime.utcnow().isoformat())
+        
+        return Response(stream_with_context(body), status=200, mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Get watchlist error: {e}")
@@ -259,6 +362,90 @@ def remove_from_watchlist(film_id):
         logger.error(f"Remove from watchlist error: {e}")
         return jsonify({'error': 'Failed to remove from watchlist'}), 500
 
+# ================================
+# MULTI-SOURCE FAN-OUT
+# ================================
+
+# Shared by every search request so a slow upstream cannot spawn unbounded threads
+search_executor = None
+_search_executor_lock = threading.Lock()
+
+def get_search_executor():
+    """Get the shared fan-out thread pool"""
+    global search_executor
+    if not search_executor:
+        with _search_executor_lock:
+            if not search_executor:
+                workers = Config.SEARCH_FANOUT_WORKERS if Config else 16
+                search_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search-fanout')
+    return search_executor
+
+def fan_out(sources, deadline_ms):
+    """
+    Run search sources concurrently and collect what finishes before the deadline
+    
+    Args:
+        sources: Ordered mapping of source name to a no-argument callable returning a list
+        deadline_ms: Time budget for the whole request
+        
+    Returns:
+        ({source: results}, {source: {status, count, elapsed_ms}}) where status
+        is ok, timeout, rate_limited (with retry_after seconds) or error; sources
+        without results map to an empty list
+    """
+    app = current_app._get_current_object()
+    executor = get_search_executor()
+    started = time.monotonic()
+    finished_at = {}
+    
+    def run(name, search):
+        # Sources read current_app config, so each thread needs the app context;
+        # they work for a request, so upstream rate limits fail fast instead of waiting
+        with app.app_context(), without_waiting():
+            try:
+                return search()
+            finally:
+                finished_at[name] = time.monotonic()
+    
+    futures = {name: executor.submit(run, name, search) for name, search in sources.items()}
+    wait(futures.values(), timeout=deadline_ms / 1000)
+    
+    results_by_source = {}
+    source_status = {}
+    for name, future in futures.items():
+        results_by_source[name] = []
+        if not future.done():
+            # Not started yet means the pool is saturated; don't let it run for nobody
+            future.cancel()
+            source_status[name] = {'status': 'timeout', 'count': 0, 'elapsed_ms': deadline_ms}
+            logger.warning(f"Search source {name} missed the {deadline_ms}ms deadline")
+            continue
+        
+        elapsed_ms = round((finished_at.get(name, time.monotonic()) - started) * 1000, 1)
+        try:
+            source_results = future.result() or []
+        except RateLimitExceeded as e:
+            logger.warning(f"Search source {name} skipped: {e}")
+            source_status[name] = {'status': 'rate_limited', 'count': 0, 'elapsed_ms': elapsed_ms,
+                                   'retry_after': math.ceil(e.retry_after)}
+            continue
+        except Exception as e:
+            logger.error(f"Search source {name} error: {e}")
+            source_status[name] = {'status': 'error', 'count': 0, 'elapsed_ms': elapsed_ms}
+            continue
+        
+        results_by_source[name] = source_results
+        source_status[name] = {'status': 'ok', 'count': len(source_results), 'elapsed_ms': elapsed_ms}
+    
+    return results_by_source, source_status
+
+def search_database(query, format_filter=None, limit=50, mode=None):
+    """Search the local film database"""
+    db = get_db()
+    if not db:
+        return []
+    return db.search_films(query, format_filter, limit, mode)
+
 # ================================
 # EXTERNAL API SEARCH FUNCTIONS
 # ================================
@@ -272,13 +459,26 @@ def search_ebay(query, format_filter=None, limit=20):
         
         # Import eBay service (if available)
         try:
-            from services.ebay_service import EbayService
-            ebay = EbayService()
-            return ebay.search_completed_listings(query, format_filter, limit)
+            from services.ebay_service import get_ebay_service
+            ebay = get_ebay_service()
+            
+            # Narrow to the format's category when one is given
+            categories = ebay.get_categories()
+            format_key = (format_filter or '').lower().replace('-', '')
+            category_ids = categories[format_key]['id'] if format_key in categories else '309,617,2649'
+            
+            response = ebay.search_sold_items({
+                'q': query,
+                'category_ids': category_ids,
+                'limit': limit
+            })
+            return response.get('itemSales', [])
         except ImportError:
             logger.warning("eBay service not available")
             return []
         
+    except RateLimitExceeded:
+        raise  # Reported per source by fan_out
     except Exception as e:
         logger.error(f"eBay search error: {e}")
         return []
@@ -290,12 +490,16 @@ def search_omdb(query, limit=10):
         if not current_app.config.get('OMDB_API_KEY'):
             return []
         
-        import requests
-        
         api_key = current_app.config['OMDB_API_KEY']
-        url = f"http://www.omdbapi.com/?apikey={api_key}&s={query}&type=movie"
+        url = Config.OMDB_BASE_URL if Config else 'http://www.omdbapi.com/'
+        params = {'apikey': api_key, 's': query, 'type': 'movie'}
         
-        response = requests.get(url, timeout=10)
+        # The shared client adds pooling, short connect timeouts and the circuit breaker
+        if get_http_client:
+            response = get_http_client().get(url, params=params)
+        else:
+            import requests
+            response = requests.get(url, params=params, timeout=10)
         data = response.json()
         
         if data.get('Response') == 'True' and data.get('Search'):
@@ -325,10 +529,9 @@ def search_tmdb(query, limit=10):
         if not current_app.config.get('TMDB_API_KEY'):
             return []
         
-        import requests
-        
         api_key = current_app.config['TMDB_API_KEY']
-        url = f"https://api.themoviedb.org/3/search/movie"
+        base_url = Config.TMDB_BASE_URL if Config else 'https://api.themoviedb.org/3/'
+        url = f"{base_url.rstrip('/')}/search/movie"
         
         params = {
             'api_key': api_key,
@@ -336,7 +539,11 @@ def search_tmdb(query, limit=10):
             'page': 1
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        if get_http_client:
+            response = get_http_client().get(url, params=params)
+        else:
+            import requests
+            response = requests.get(url, params=params, timeout=10)
         data = response.json()
         
         if data.get('results'):
@@ -401,6 +608,7 @@ def advanced_search():
         price_max = data.get('price_max')
         condition = data.get('condition')
         limit = min(int(data.get('limit', 50)), 200)
+        cursor = data.get('cursor')
         
         db = get_db()
         if not db:
@@ -410,13 +618,23 @@ def advanced_search():
         where_clauses = []
         params = []
         
-        if title:
-            where_clauses.append("f.title LIKE %s")
-            params.append(f"%{title}%")
-        
-        if director:
-            where_clauses.append("f.director LIKE %s")
-            params.append(f"%{director}%")
+        # Title and director use their FULLTEXT indexes; their scores rank the results
+        relevance_terms = []
+        relevance_params = []
+        for column, columns, text in (('title', FILM_TITLE_COLUMNS, title),
+                                      ('director', FILM_DIRECTOR_COLUMNS, director)):
+            if not text:
+                continue
+            if searchable_words(text):
+                match, against = match_clause(columns, text, alias='f')
+                where_clauses.append(match)
+                params.append(against)
+                relevance_terms.append(match)
+                relevance_params.append(against)
+            else:
+                # Too short for the index: prefix match on the column instead
+                where_clauses.append(f"f.{column} LIKE %s")
+                params.append(prefix_pattern(text))
         
         if year_min:
             where_clauses.append("f.year >= %s")
@@ -430,70 +648,192 @@ def advanced_search():
             where_clauses.append("f.format = %s")
             params.append(format_filter)
         
+        relevance = " + ".join(relevance_terms) or "0"
+        if relevance_terms:
+            # Fixed precision so the score round-trips exactly through a cursor
+            relevance = f"CAST({relevance} AS DECIMAL(20,6))"
+        
+        # A cursor only continues the search whose filters it was issued for
+        scope = listing_scope('films.advanced', title=title, director=director, year_min=year_min,
+                              year_max=year_max, format=format_filter)
+        if cursor:
+            seek, seek_params = seek_condition(
+                [(relevance, relevance_params, True), ('f.title', [], False), ('f.id', [], False)],
+                decode_cursor(cursor, scope)
+            )
+            where_clauses.append(seek)
+            params.extend(seek_params)
+        
         # Build the query
-        query = """
+        query = f"""
         SELECT f.*, 
-               COUNT(ph.id) as price_count,
-               MIN(ph.price) as min_price,
-               MAX(ph.price) as max_price,
-               AVG(ph.price) as avg_price
+               {relevance} as relevance,
+               COALESCE(s.sale_count, 0) as price_count,
+               s.min_price,
+               s.max_price,
+               s.avg_price
         FROM films f
-        LEFT JOIN price_history ph ON f.id = ph.film_id
+        LEFT JOIN film_price_stats s ON s.film_id = f.id
         """
         
         if where_clauses:
             query += " WHERE " + " AND ".join(where_clauses)
         
-        query += " GROUP BY f.id ORDER BY f.title LIMIT %s"
-        params.append(limit)
+        query += " ORDER BY relevance DESC, f.title, f.id LIMIT %s"
+        params = relevance_params + params + [limit + 1]
         
         success, results = db.execute_query(query, params, fetch=True)
+        results, next_cursor = [], None
+        if success:
+            results, next_cursor = keyset_page(results, limit, scope,
+                                               lambda row: (row['relevance'], row['title'], row['id']))
         
         return jsonify({
-            'results': results if success else [],
-            'count': len(results) if success else 0,
+            'results': results,
+            'count': len(results),
             'filters': data,
+            'next_cursor': next_cursor,
+            'has_next': next_cursor is not None,
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
+    except InvalidCursorError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"Advanced search error: {e}")
         return jsonify({'error': 'Advanced search failed'}), 500
 
 @search_bp.route('/trending', methods=['GET'])
 def get_trending():
-    """Get trending films based on recent activity"""
+    """Get trending films from the latest market insights period"""
     try:
         db = get_db()
         if not db:
             return jsonify({'error': 'Database service unavailable'}), 503
         
-        # Get films with recent price activity
+        period_type = MARKET_PERIODS.get(request.args.get('period', 'monthly').lower())
+        if not period_type:
+            return jsonify({'error': f"period must be one of: {', '.join(MARKET_PERIODS)}"}), 400
+        
+        format_filter = request.args.get('format', '').strip()
+        min_sales = max(int(request.args.get('min_sales', 3)), 1)
+        limit = min(int(request.args.get('limit', 20)), 100)
+        
+        # The market-wide row exists for every period with sales, so it marks the latest one rolled up
+        success, latest = db.execute_query("""
+        SELECT period_start, period_end
+        FROM market_insights
+        WHERE period_type = %s AND film_scope = 0 AND category_scope = 0 AND format = 'All'
+        ORDER BY period_start DESC
+        LIMIT 1
+        """, (period_type,), fetch=True)
+        
+        if not success or not latest:
+            return jsonify({
+                'trending': [],
+                'period': {'type': period_type, 'start': None, 'end': None},
+                'timestamp': datetime.utcnow().isoformat()
+            }), 200
+        
+        period = latest[0]
         query = """
         SELECT f.*, 
-               COUNT(ph.id) as recent_sales,
-               AVG(ph.price) as avg_recent_price
-        FROM films f
-        JOIN price_history ph ON f.id = ph.film_id
-        WHERE ph.sale_date >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-        GROUP BY f.id
-        HAVING recent_sales >= 3
-        ORDER BY recent_sales DESC, avg_recent_price DESC
-        LIMIT 20
+               mi.total_sales as recent_sales,
+               mi.avg_price as avg_recent_price,
+               mi.median_price,
+               mi.price_trend,
+               mi.trend_percentage,
+               mi.volume_trend
+        FROM market_insights mi
+        JOIN films f ON f.id = mi.film_id
+        WHERE mi.period_type = %s AND mi.period_start = %s
+          AND mi.film_scope > 0 AND mi.total_sales >= %s
         """
+        params = [period_type, period['period_start'], min_sales]
+        
+        if format_filter:
+            query += " AND mi.format = %s"
+            params.append(format_filter)
+        
+        query += " ORDER BY mi.total_sales DESC, mi.trend_percentage DESC LIMIT %s"
+        params.append(limit)
         
-        success, results = db.execute_query(query, fetch=True)
+        success, results = db.execute_query(query, params, fetch=True)
         
         return jsonify({
             'trending': results if success else [],
-            'period': '30 days',
+            'period': {
+                'type': period_type,
+                'start': period['period_start'].isoformat(),
+                'end': period['period_end'].isoformat()
+            },
             'timestamp': datetime.utcnow().isoformat()
         }), 200
         
+    except ValueError:
+        return jsonify({'error': 'min_sales and limit must be integers'}), 400
     except Exception as e:
         logger.error(f"Get trending error: {e}")
         return jsonify({'error': 'Failed to get trending films'}), 500
 
+@search_bp.route('/insights', methods=['GET'])
+def get_market_insights():
+    """
+    Get precomputed market insights for one scope, most recent period first
+    Scope is the whole market unless film_id, category_id or format is given
+    """
+    try:
+        db = get_db()
+        if not db:
+            return jsonify({'error': 'Database service unavailable'}), 503
+        
+        period_type = MARKET_PERIODS.get(request.args.get('period', 'monthly').lower())
+        if not period_type:
+            return jsonify({'error': f"period must be one of: {', '.join(MARKET_PERIODS)}"}), 400
+        
+        film_id = int(request.args.get('film_id', 0))
+        category_id = int(request.args.get('category_id', 0))
+        format_filter = request.args.get('format', '').strip()
+        periods = min(max(int(request.args.get('periods', 12)), 1), 120)
+        
+        query = """
+        SELECT period_start, period_end, period_type, film_id, category_id, format,
+               total_sales, avg_price, median_price, min_price, max_price,
+               price_trend, trend_percentage, volume_trend, calculated_at
+        FROM market_insights
+        WHERE period_type = %s AND film_scope = %s AND category_scope = %s
+        """
+        params = [period_type, film_id, category_id]
+        
+        # A film's rows carry its own format; every other scope defaults to all formats
+        if format_filter or not film_id:
+            query += " AND format = %s"
+            params.append(format_filter or 'All')
+        
+        query += " ORDER BY period_start DESC LIMIT %s"
+        params.append(periods)
+        
+        success, results = db.execute_query(query, params, fetch=True)
+        if not success:
+            return jsonify({'error': 'Failed to get market insights'}), 500
+        
+        return jsonify({
+            'insights': results,
+            'scope': {
+                'period': period_type,
+                'film_id': film_id or None,
+                'category_id': category_id or None,
+                'format': format_filter or (None if film_id else 'All')
+            },
+            'timestamp': datetime.utcnow().isoformat()
+        }), 200
+        
+    except ValueError:
+        return jsonify({'error': 'film_id, category_id and periods must be integers'}), 400
+    except Exception as e:
+        logger.error(f"Get market insights error: {e}")
+        return jsonify({'error': 'Failed to get market insights'}), 500
+
 # ================================
 # ERROR HANDLERS
 # ================================
@@ -4,14 +4,21 @@ Film Database Model
 Handles movie/film data storage and retrieval for Film Price Guide
 """
 
+import re
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy import Column, Integer, String, Text, DateTime, Decimal, Boolean, Index
 from sqlalchemy.orm import relationship
 from flask_sqlalchemy import SQLAlchemy
 
 # Import db from app (will be initialized in app.py)
 from app import db
+from utils.film_index import get_film_index
+from utils.fulltext import boolean_query, searchable_words, prefix_pattern
+
+# Title normalization, compiled once: trailing format indicators and a trailing "(1984)"
+FORMAT_SUFFIXES = (' VHS', ' DVD', ' BLU-RAY', ' BLURAY', ' 4K', ' UHD')
+TRAILING_YEAR_PATTERN = re.compile(r'\s*\(\d{4}\)$')
 
 class Film(db.Model):
     """
@@ -100,6 +107,8 @@ class Film(db.Model):
         Index('idx_film_updated', 'updated_at'),
         Index('idx_film_pricing', 'current_avg_price', 'format'),
         Index('idx_film_external_ids', 'imdb_id', 'tmdb_id'),
+        Index('ft_films_title', 'title', mysql_prefix='FULLTEXT'),
+        Index('ft_films_director', 'director', mysql_prefix='FULLTEXT'),
     )
     
     def __repr__(self):
@@ -120,8 +129,16 @@ class Film(db.Model):
         """
         try:
             # Clean and normalize title
-            normalized_title = cls._normalize_title(title)
-            normalized_format = format.strip().title()
+            normalized_title, normalized_format = cls.normalize_key(title, format)
+            film_index = get_film_index()
+            
+            # Known films resolve in memory (get() uses the session identity map first)
+            film_id = film_index.get(normalized_title, normalized_format)
+            if film_id is not None:
+                indexed_film = cls.query.get(film_id)
+                if indexed_film:
+                    return indexed_film
+                film_index.invalidate(normalized_title, normalized_format)
             
             # Try to find existing film
             existing_film = cls.query.filter_by(
@@ -130,6 +147,7 @@ class Film(db.Model):
             ).first()
             
             if existing_film:
+                film_index.put(normalized_title, normalized_format, existing_film.id)
                 return existing_film
             
             # Create new film
@@ -141,6 +159,7 @@ class Film(db.Model):
             
             db.session.add(new_film)
             db.session.commit()
+            film_index.put(normalized_title, normalized_format, new_film.id)
             
             return new_film
             
@@ -148,6 +167,14 @@ class Film(db.Model):
             db.session.rollback()
             raise e
     
+    @classmethod
+    def normalize_key(cls, title: str, format: str) -> Tuple[str, str]:
+        """
+        Normalize a (title, format) pair the way films are stored
+        Shared with the batch ingestion path so both resolve the same rows
+        """
+        return cls._normalize_title(title), (format or '').strip().title()
+    
     @classmethod
     def _normalize_title(cls, title: str) -> str:
         """Normalize movie title for consistent storage"""
@@ -158,14 +185,14 @@ class Film(db.Model):
         cleaned = title.strip()
         
         # Remove format indicators from title if present
-        format_indicators = [' VHS', ' DVD', ' Blu-ray', ' BluRay', ' 4K', ' UHD']
-        for indicator in format_indicators:
-            if cleaned.upper().endswith(indicator.upper()):
+        upper = cleaned.upper()
+        for indicator in FORMAT_SUFFIXES:
+            if upper.endswith(indicator):
                 cleaned = cleaned[:-len(indicator)].strip()
+                upper = cleaned.upper()
         
         # Remove year from title if present at the end
-        import re
-        cleaned = re.sub(r'\s*\(\d{4}\)$', '', cleaned)
+        cleaned = TRAILING_YEAR_PATTERN.sub('', cleaned)
         
         return cleaned
     
@@ -179,14 +206,22 @@ class Film(db.Model):
             format: Optional format filter
         
         Returns:
-            List of matching Film instances
+            List of matching Film instances, best matches first
         """
-        query = cls.query.filter(cls.title.ilike(f'%{title}%'))
+        if searchable_words(title):
+            # MATCH(title) AGAINST (... IN BOOLEAN MODE) on the ft_films_title index
+            relevance = cls.title.match(boolean_query(title))
+            query = cls.query.filter(relevance)
+            order = [relevance.desc(), cls.title, cls.year]
+        else:
+            # Too short for FULLTEXT: indexed title prefix match
+            query = cls.query.filter(cls.title.like(prefix_pattern(title)))
+            order = [cls.title, cls.year]
         
         if format:
             query = query.filter(cls.format == format)
         
-        return query.order_by(cls.title, cls.year).all()
+        return query.order_by(*order).all()
     
     @classmethod
     def get_by_external_id(cls, imdb_id: str = None, tmdb_id: int = None) -> Optional['Film']:
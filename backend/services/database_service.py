@@ -5,20 +5,75 @@ Handles MySQL database connections and operations
 """
 
 import mysql.connector
-from mysql.connector import Error, pooling
+from mysql.connector import Error
+from mysql.connector.errors import InterfaceError, OperationalError, PoolError
 import logging
 import os
+import re
+import threading
+import time
 from contextlib import contextmanager
+from datetime import datetime
 from urllib.parse import urlparse
 
+from config.config import Config
+from utils.db_pool import ConnectionPool, PoolTimeoutError
+from utils.read_replicas import Replica, ReplicaSet, mark_write
+from utils.query_stats import get_query_stats
+from utils.fulltext import (SEARCH_MODES, FILM_SEARCH_COLUMNS, is_year, searchable_words,
+                            match_clause, prefix_pattern)
+from utils.pagination import decode_cursor, keyset_page, listing_scope, seek_condition
+
 logger = logging.getLogger(__name__)
 
+# Table and column names bulk_write will interpolate into SQL
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+# create_user's columns, for create_users
+USER_COLUMNS = ('username', 'email', 'password_hash', 'first_name', 'last_name', 'created_at')
+
+# add_price_entry's columns, the entry keys they are read from, and what an upsert refreshes
+PRICE_ENTRY_COLUMNS = (
+    'film_id', 'price', 'shipping_cost', 'condition_name', 'sale_date',
+    'platform', 'external_listing_url', 'external_listing_id'
+)
+PRICE_ENTRY_KEYS = (
+    'film_id', 'price', 'shipping_cost', 'condition_name', 'sale_date',
+    'platform', 'listing_url', 'ebay_item_id'
+)
+PRICE_ENTRY_UPDATE_COLUMNS = ('price', 'shipping_cost', 'condition_name', 'sale_date', 'external_listing_url')
+PRICE_ENTRY_DEFAULTS = {'shipping_cost': 0, 'platform': 'eBay'}
+
+# Statement prefixes execute_query may send to a read replica
+_READ_PREFIXES = ('SELECT', 'WITH', '(SELECT')
+# ...unless they lock rows or take a named lock, which must happen on the primary
+_PRIMARY_ONLY = re.compile(r'\bFOR\s+UPDATE\b|\bLOCK\s+IN\s+SHARE\s+MODE\b|\bFOR\s+SHARE\b|\b(?:GET|RELEASE)_LOCK\s*\(',
+                           re.IGNORECASE)
+
+def is_read_query(query):
+    """Whether a statement only reads, so a replica can serve it"""
+    return query.lstrip().upper().startswith(_READ_PREFIXES) and not _PRIMARY_ONLY.search(query)
+
+# Shared by get_user_watchlist and its streaming variant
+USER_WATCHLIST_QUERY = """
+SELECT w.*, f.title, f.year, f.format, f.poster_url
+FROM watchlist w
+JOIN films f ON w.film_id = f.id
+WHERE w.user_id = %s AND w.status = 'Active'
+ORDER BY w.created_at DESC
+"""
+
 class DatabaseService:
     """Database service for MySQL operations"""
     
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, replica_urls=None):
         self.database_url = database_url or os.environ.get('DATABASE_URL')
+        if replica_urls is None:
+            replica_urls = [url.strip() for url in Config.DATABASE_REPLICA_URLS.split(',') if url.strip()]
+        self.replica_urls = replica_urls
         self.connection_pool = None
+        self.replicas = ReplicaSet([])
+        self._local = threading.local()  # Per-thread wait for the current checkout
         self._init_connection_pool()
     
     def _parse_database_url(self, database_url):
@@ -41,55 +96,153 @@ class DatabaseService:
             # Assume it's already a connection dict or string
             return database_url
     
+    def _build_pool(self, database_url):
+        """Connection pool for one server (connections are opened on first use)"""
+        db_config = self._parse_database_url(database_url)
+        connect_config = {
+            **db_config,
+            'autocommit': True,
+            'time_zone': '+00:00'
+        }
+        
+        return ConnectionPool(
+            lambda: mysql.connector.connect(**connect_config),
+            pool_size=Config.DB_POOL_SIZE,
+            max_overflow=Config.DB_POOL_MAX_OVERFLOW,
+            timeout=Config.DB_POOL_TIMEOUT,
+            recycle=Config.DB_POOL_RECYCLE,
+            pre_ping=Config.DB_POOL_PRE_PING,
+            session_variables={'time_zone': '+00:00'}
+        )
+    
     def _init_connection_pool(self):
-        """Initialize connection pool"""
+        """Initialize the primary connection pool and one pool per read replica"""
         try:
-            db_config = self._parse_database_url(self.database_url)
+            self.connection_pool = self._build_pool(self.database_url)
+            logger.info(f"✅ Database connection pool initialized "
+                        f"(size {Config.DB_POOL_SIZE} + {Config.DB_POOL_MAX_OVERFLOW} overflow)")
             
-            # Add pool-specific configuration
-            pool_config = {
-                **db_config,
-                'pool_name': 'film_price_guide_pool',
-                'pool_size': 5,
-                'pool_reset_session': True,
-                'autocommit': True,
-                'time_zone': '+00:00'
-            }
-            
-            self.connection_pool = pooling.MySQLConnectionPool(**pool_config)
-            logger.info("✅ Database connection pool initialized")
-            
-        except Error as e:
+        except ValueError as e:
             logger.error(f"❌ Failed to create connection pool: {e}")
             self.connection_pool = None
+        
+        replicas = []
+        for url in self.replica_urls:
+            try:
+                parsed = urlparse(url)
+                replicas.append(Replica(f"{parsed.hostname}:{parsed.port or 3306}", self._build_pool(url)))
+            except ValueError as e:
+                logger.error(f"❌ Failed to create read replica pool: {e}")
+        self.replicas = ReplicaSet(replicas)
+        if replicas:
+            logger.info(f"✅ Routing reads to {len(replicas)} replica(s): "
+                        f"{', '.join(replica.name for replica in replicas)}")
     
     @contextmanager
-    def get_connection(self):
-        """Get database connection from pool"""
-        connection = None
+    def _checkout(self, pool, replica=None, connection=None):
+        """Check a connection out of pool (or take one already acquired) for the duration of the block"""
+        if not pool:
+            raise PoolError("Database connection pool is not configured")
+        
+        if connection is None:
+            try:
+                connection = pool.acquire()
+            except Error as e:
+                logger.error(f"Database connection error: {e}")
+                raise
+        
         try:
-            if self.connection_pool:
-                connection = self.connection_pool.get_connection()
-            else:
-                # Fallback to direct connection
-                db_config = self._parse_database_url(self.database_url)
-                connection = mysql.connector.connect(**db_config)
-            
             yield connection
             
         except Error as e:
             logger.error(f"Database connection error: {e}")
-            if connection:
+            if replica and isinstance(e, (InterfaceError, OperationalError)):
+                # Lost the replica mid-query: send the next reads to the primary
+                replica.mark_down(e)
+            try:
                 connection.rollback()
+            except Error:
+                pass
             raise
         finally:
-            if connection and connection.is_connected():
-                connection.close()
+            pool.release(connection)
+    
+    @contextmanager
+    def get_connection(self, read_only=False):
+        """
+        Get database connection from pool
+        Waits up to DB_POOL_TIMEOUT for a free connection when all are in use
+        
+        Args:
+            read_only: The block only reads, so it may run on a read replica.
+                It goes to the primary when there are no healthy replicas or
+                this session wrote within DB_REPLICA_STICKY_SECONDS (see
+                utils/read_replicas). Any other checkout counts as a write.
+        """
+        start_time = time.perf_counter()
+        
+        if self.replicas:
+            if read_only:
+                replica = self.replicas.choose()
+                connection = self._acquire_replica(replica) if replica else None
+                if connection is not None:
+                    with self._checkout(replica.pool, replica, connection) as connection:
+                        self._local.pool_wait_ms = (time.perf_counter() - start_time) * 1000
+                        yield connection
+                    return
+            else:
+                mark_write()
+        
+        with self._checkout(self.connection_pool) as connection:
+            self._local.pool_wait_ms = (time.perf_counter() - start_time) * 1000
+            yield connection
+    
+    def _acquire_replica(self, replica):
+        """A connection from replica's pool, or None to read from the primary instead"""
+        try:
+            connection = replica.pool.acquire()
+        except PoolTimeoutError:
+            # Busy rather than unhealthy: this read goes to the primary, the replica stays in rotation
+            self.replicas.record_fallback()
+            return None
+        except Error as e:
+            replica.mark_down(e)
+            self.replicas.record_fallback()
+            return None
+        
+        self.replicas.record_read(replica)
+        return connection
+    
+    def get_pool_stats(self):
+        """Connection pool usage and wait counters"""
+        return self.connection_pool.get_stats() if self.connection_pool else {}
+    
+    def get_replica_stats(self):
+        """Read routing counters and each replica's health and pool stats"""
+        return self.replicas.get_stats() if self.replicas else {}
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Run several statements on one connection inside a single transaction
+        Commits when the block exits cleanly, rolls back on any exception
+        """
+        with self.get_connection() as conn:
+            conn.start_transaction()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                yield cursor
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
     
     def test_connection(self):
-        """Test database connection"""
+        """Test database connection (always the primary)"""
         try:
-            with self.get_connection() as conn:
+            with self._checkout(self.connection_pool) as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
                 result = cursor.fetchone()
@@ -99,27 +252,192 @@ class DatabaseService:
             return False, f"Database connection failed: {e}"
     
     def execute_query(self, query, params=None, fetch=False):
-        """Execute a database query"""
+        """Execute a database query (reads may be served by a read replica)"""
+        start_time = None
         try:
-            with self.get_connection() as conn:
+            with self.get_connection(read_only=fetch and is_read_query(query)) as conn:
+                start_time = time.perf_counter()
                 cursor = conn.cursor(dictionary=True)
                 cursor.execute(query, params or ())
                 
                 if fetch:
                     if 'SELECT' in query.upper():
                         result = cursor.fetchall()
+                        rows = len(result)
                     else:
                         result = cursor.fetchone()
+                        rows = 1 if result else 0
                 else:
                     result = cursor.rowcount
+                    rows = max(result, 0)
                 
                 cursor.close()
+                self._record_query(conn, query, params, start_time, rows)
                 return True, result
                 
         except Error as e:
             logger.error(f"Query execution error: {e}")
+            if start_time is not None:
+                self._record_query(None, query, params, start_time, 0, error=True)
             return False, str(e)
     
+    def _record_query(self, conn, query, params, start_time, rows, error=False):
+        """
+        Add a statement to the query stats (Config.QUERY_STATS_ENABLED)
+        Sampled slow statements are EXPLAINed on the connection that ran them
+        """
+        if not Config.QUERY_STATS_ENABLED:
+            return
+        
+        stats = get_query_stats()
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        pool_wait_ms = getattr(self._local, 'pool_wait_ms', 0.0)
+        if not stats.record(query, elapsed_ms, rows, pool_wait_ms, error=error) or conn is None:
+            return
+        
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(f"EXPLAIN {query}", params or ())
+            stats.add_slow_plan(query, cursor.fetchall())
+            cursor.close()
+        except Error as e:
+            logger.debug(f"EXPLAIN of slow query failed: {e}")
+    
+    def iter_query(self, query, params=None, batch_size=None, as_tuples=False):
+        """
+        Stream the rows of a SELECT in constant memory
+        
+        Uses an unbuffered cursor, so rows come off the server batch_size at a
+        time instead of all at once through fetchall(). The connection stays
+        checked out of the pool until the generator is exhausted or closed;
+        closing it early drains the rest of the result first, so bound long
+        reads with LIMIT rather than by stopping early.
+        
+        Args:
+            query: SELECT statement
+            params: Query parameters
+            batch_size: Rows per fetch (Config.DB_STREAM_FETCH_SIZE by default)
+            as_tuples: Yield tuples in SELECT column order instead of dicts
+        
+        Yields:
+            One row at a time
+        
+        Raises:
+            Error: Unlike execute_query, failures propagate - a stream cannot
+                report them once rows have been handed out
+        """
+        batch_size = batch_size or Config.DB_STREAM_FETCH_SIZE
+        
+        with self.get_connection(read_only=is_read_query(query)) as conn:
+            # The server otherwise drops a reader that pauses (e.g. on a slow client) past 60s
+            setup = conn.cursor()
+            setup.execute("SET SESSION net_write_timeout = %s", (Config.DB_STREAM_NET_WRITE_TIMEOUT,))
+            setup.close()
+            
+            cursor = conn.cursor(buffered=False, dictionary=not as_tuples)
+            exhausted = False
+            start_time = time.perf_counter()
+            first_batch_time = None
+            row_count = 0
+            try:
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if first_batch_time is None:
+                        first_batch_time = time.perf_counter()
+                    if not rows:
+                        exhausted = True
+                        break
+                    row_count += len(rows)
+                    for row in rows:
+                        yield row
+            finally:
+                if not exhausted:
+                    # Unread rows would otherwise break the connection for its next user
+                    try:
+                        conn.consume_results()
+                    except Error as e:
+                        logger.warning(f"Could not drain streamed query: {e}")
+                cursor.close()
+                # Timed to the first batch: the rest of a stream runs at the reader's pace
+                if Config.QUERY_STATS_ENABLED:
+                    elapsed_ms = ((first_batch_time or time.perf_counter()) - start_time) * 1000
+                    get_query_stats().record(query, elapsed_ms, row_count,
+                                             getattr(self._local, 'pool_wait_ms', 0.0),
+                                             error=first_batch_time is None)
+    
+    def bulk_write(self, table, columns, rows, update_columns=None, on_update=None,
+                   chunk_size=None, cursor=None):
+        """
+        Write many rows as multi-row INSERT (or upsert) statements in one transaction
+        
+        Args:
+            table: Table to write
+            columns: Columns written, in order
+            rows: Parameter dicts keyed by column (missing keys are NULL) or
+                sequences in column order; consumed a chunk at a time
+            update_columns: Upsert these columns from the new row on a duplicate
+                key (col = VALUES(col)); None writes a plain INSERT
+            on_update: Extra SQL assignments for the upsert, e.g. "updated_at = NOW()"
+            chunk_size: Rows per statement (Config.DB_BULK_CHUNK_SIZE by default)
+            cursor: Write inside the caller's transaction instead of opening one
+        
+        Returns:
+            {'rows', 'affected_rows', 'elapsed_ms', 'chunks': [{'rows', 'affected_rows', 'elapsed_ms'}]}
+        
+        Raises:
+            ValueError: A table or column name is not a plain identifier
+            Error: A statement failed; the whole transaction is rolled back
+        """
+        columns = tuple(columns)
+        update_columns = tuple(update_columns or ())
+        for name in (table,) + columns + update_columns:
+            if not _IDENTIFIER.match(name):
+                raise ValueError(f"Invalid identifier: {name!r}")
+        
+        chunk_size = chunk_size or Config.DB_BULK_CHUNK_SIZE
+        row_placeholder = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        assignments = [f"{column} = VALUES({column})" for column in update_columns]
+        if on_update:
+            assignments.append(on_update)
+        upsert = f" ON DUPLICATE KEY UPDATE {', '.join(assignments)}" if assignments else ''
+        
+        def write(cursor):
+            result = {'rows': 0, 'affected_rows': 0, 'chunks': []}
+            start_time = time.perf_counter()
+            chunk = []
+            
+            def flush():
+                chunk_start = time.perf_counter()
+                cursor.execute(
+                    f"INSERT INTO {table} ({', '.join(columns)}) "
+                    f"VALUES {', '.join([row_placeholder] * len(chunk))}{upsert}",
+                    [value for row in chunk for value in row]
+                )
+                result['chunks'].append({
+                    'rows': len(chunk),
+                    'affected_rows': cursor.rowcount,
+                    'elapsed_ms': round((time.perf_counter() - chunk_start) * 1000, 2)
+                })
+                result['rows'] += len(chunk)
+                result['affected_rows'] += cursor.rowcount
+            
+            for row in rows:
+                chunk.append(tuple(row.get(column) for column in columns) if isinstance(row, dict) else tuple(row))
+                if len(chunk) >= chunk_size:
+                    flush()
+                    chunk = []
+            if chunk:
+                flush()
+            
+            result['elapsed_ms'] = round((time.perf_counter() - start_time) * 1000, 2)
+            return result
+        
+        if cursor is not None:
+            return write(cursor)
+        with self.transaction() as own_cursor:
+            return write(own_cursor)
+    
     def get_user_by_email(self, email):
         """Get user by email"""
         query = "SELECT * FROM users WHERE email = %s AND is_active = 1"
@@ -147,88 +465,225 @@ class DatabaseService:
         success, result = self.execute_query(query, user_data)
         return success, result
     
+    def create_users(self, users, chunk_size=None):
+        """
+        Create many users in one transaction (admin imports)
+        Takes the same dicts as create_user; returns bulk_write's result
+        """
+        return self.bulk_write('users', USER_COLUMNS, users, chunk_size=chunk_size)
+    
     def update_user_login(self, user_id):
         """Update user's last login timestamp"""
         query = "UPDATE users SET last_login = NOW() WHERE id = %s"
         return self.execute_query(query, (user_id,))
     
-    def search_films(self, search_term, format_filter=None, limit=50):
-        """Search for films in database"""
-        query = """
-        SELECT f.*, 
-               COUNT(ph.id) as price_count,
-               MIN(ph.price) as min_price,
-               MAX(ph.price) as max_price,
-               AVG(ph.price) as avg_price
-        FROM films f
-        LEFT JOIN price_history ph ON f.id = ph.film_id
-        WHERE (f.title LIKE %s OR f.director LIKE %s OR f.year LIKE %s)
+    def search_films(self, search_term, format_filter=None, limit=50, mode=None):
+        """
+        Search for films in database
+        
+        Uses the FULLTEXT(title, subtitle, director) index, best matches first.
+        mode is 'boolean' (every word, last one as a prefix) or 'natural'
+        (any word, ranked); defaults to Config.SEARCH_MODE. A bare year matches
+        the release year, and queries with no indexable word fall back to a
+        title prefix match.
+        """
+        films, _ = self.search_films_page(search_term, format_filter, limit, mode)
+        return films
+    
+    def search_films_page(self, search_term, format_filter=None, limit=50, mode=None, cursor=None):
         """
+        One page of search_films results, continuing after cursor
+        
+        Ordered by (relevance DESC, title, id) and paged by seeking past the
+        previous page's last row, so deep pages cost the same as the first.
         
-        params = [f"%{search_term}%", f"%{search_term}%", f"%{search_term}%"]
+        Returns:
+            (films, continuation token for the next page or None)
+        
+        Raises:
+            InvalidCursorError: cursor is malformed or from another search
+        """
+        mode = mode if mode in SEARCH_MODES else Config.SEARCH_MODE
+        scope = listing_scope('films.search', q=search_term, format=format_filter, mode=mode)
+        
+        relevance, relevance_params = "0", []
+        if is_year(search_term):
+            where, params = "f.release_year = %s", [int(search_term)]
+        elif searchable_words(search_term):
+            match, against = match_clause(FILM_SEARCH_COLUMNS, search_term, mode, alias='f')
+            # Fixed precision so the score round-trips exactly through a cursor
+            relevance, relevance_params = f"CAST({match} AS DECIMAL(20,6))", [against]
+            where, params = match, [against]
+        else:
+            where, params = "f.title LIKE %s", [prefix_pattern(search_term)]
         
         if format_filter:
-            query += " AND f.format = %s"
+            where += " AND f.format = %s"
             params.append(format_filter)
         
-        query += " GROUP BY f.id ORDER BY f.title LIMIT %s"
-        params.append(limit)
+        if cursor:
+            seek, seek_params = seek_condition(
+                [(relevance, relevance_params, True), ('f.title', [], False), ('f.id', [], False)],
+                decode_cursor(cursor, scope)
+            )
+            where += f" AND {seek}"
+            params += seek_params
+        
+        # The relevance placeholder comes before the WHERE ones in the statement
+        params = relevance_params + params + [limit + 1]
+        
+        # Rank and limit on the films index first, then look up that page's price stats
+        query = f"""
+        SELECT f.*,
+               matched.relevance,
+               COALESCE(s.sale_count, 0) as price_count,
+               s.min_price,
+               s.max_price,
+               s.avg_price
+        FROM (
+            SELECT f.id, f.title, {relevance} AS relevance
+            FROM films f
+            WHERE {where}
+            ORDER BY relevance DESC, f.title, f.id
+            LIMIT %s
+        ) matched
+        JOIN films f ON f.id = matched.id
+        LEFT JOIN film_price_stats s ON s.film_id = f.id
+        ORDER BY matched.relevance DESC, f.title, f.id
+        """
         
         success, result = self.execute_query(query, params, fetch=True)
-        return result if success else []
+        if not success:
+            return [], None
+        return keyset_page(result, limit, scope, lambda row: (row['relevance'], row['title'], row['id']))
     
     def get_film_by_id(self, film_id):
         """Get film details by ID"""
         query = """
         SELECT f.*, 
-               COUNT(ph.id) as price_count,
-               MIN(ph.price) as min_price,
-               MAX(ph.price) as max_price,
-               AVG(ph.price) as avg_price
+               COALESCE(s.sale_count, 0) as price_count,
+               s.min_price,
+               s.max_price,
+               s.avg_price,
+               s.last_price,
+               s.last_sale_date,
+               COALESCE(s.sales_30d, 0) as sales_30d,
+               s.avg_price_30d,
+               COALESCE(s.sales_90d, 0) as sales_90d,
+               s.avg_price_90d,
+               COALESCE(s.sales_365d, 0) as sales_365d,
+               s.avg_price_365d
         FROM films f
-        LEFT JOIN price_history ph ON f.id = ph.film_id
+        LEFT JOIN film_price_stats s ON s.film_id = f.id
         WHERE f.id = %s
-        GROUP BY f.id
         """
         success, result = self.execute_query(query, (film_id,), fetch=True)
         return result[0] if success and result else None
     
     def get_price_history(self, film_id, limit=100):
         """Get price history for a film"""
-        query = """
+        history, _ = self.get_price_history_page(film_id, limit)
+        return history
+    
+    def get_price_history_page(self, film_id, limit=100, cursor=None):
+        """
+        One page of a film's price history, newest first, continuing after cursor
+        
+        Seeks on (sale_date, id) through idx_film_date instead of OFFSET
+        
+        Returns:
+            (sales, continuation token for the next page or None)
+        
+        Raises:
+            InvalidCursorError: cursor is malformed or from another film's history
+        """
+        scope = listing_scope('price_history', film_id=film_id)
+        where, params = "film_id = %s", [film_id]
+        
+        if cursor:
+            seek, seek_params = seek_condition(
+                [('sale_date', [], True), ('id', [], True)], decode_cursor(cursor, scope)
+            )
+            where += f" AND {seek}"
+            params += seek_params
+        
+        query = f"""
         SELECT * FROM price_history 
-        WHERE film_id = %s 
-        ORDER BY sale_date DESC 
+        WHERE {where} 
+        ORDER BY sale_date DESC, id DESC 
         LIMIT %s
         """
-        success, result = self.execute_query(query, (film_id, limit), fetch=True)
-        return result if success else []
+        success, result = self.execute_query(query, params + [limit + 1], fetch=True)
+        if not success:
+            return [], None
+        return keyset_page(result, limit, scope, lambda row: (row['sale_date'], row['id']))
     
     def add_price_entry(self, price_data):
-        """Add a new price entry"""
+        """
+        Add a price entry, or update it if the listing is already stored
+        Listings are unique on (platform, external_listing_id), so re-crawled sales don't duplicate
+        """
         query = """
         INSERT INTO price_history (
             film_id, price, shipping_cost, condition_name, sale_date,
-            platform, listing_url, ebay_item_id
+            platform, external_listing_url, external_listing_id
         ) VALUES (
             %(film_id)s, %(price)s, %(shipping_cost)s, %(condition_name)s,
             %(sale_date)s, %(platform)s, %(listing_url)s, %(ebay_item_id)s
         )
+        ON DUPLICATE KEY UPDATE 
+        price = VALUES(price),
+        shipping_cost = VALUES(shipping_cost),
+        condition_name = VALUES(condition_name),
+        sale_date = VALUES(sale_date),
+        external_listing_url = VALUES(external_listing_url)
+        """
+        success, result = self.execute_query(query, price_data)
+        
+        if success and Config.PRICE_STATS_ENABLED:
+            # One film: an exact recompute is cheap and covers both insert and update
+            from services.price_stats_service import get_price_stats_service
+            try:
+                with self.transaction() as cursor:
+                    get_price_stats_service().recompute_films(cursor, [price_data['film_id']])
+            except Exception as e:
+                logger.error(f"Price stats update error for film {price_data['film_id']}: {e}")
+        
+        return success, result
+    
+    def add_price_entries(self, entries, chunk_size=None):
         """
-        return self.execute_query(query, price_data)
+        Add or update many price entries in one transaction (imports, backfills)
+        Takes the same dicts as add_price_entry; returns bulk_write's result.
+        film_price_stats for the films touched is recomputed in the same transaction.
+        """
+        film_ids = set()
+        
+        def rows():
+            for entry in entries:
+                film_ids.add(entry['film_id'])
+                entry = {**PRICE_ENTRY_DEFAULTS, **entry}
+                yield tuple(entry.get(key) for key in PRICE_ENTRY_KEYS)
+        
+        with self.transaction() as cursor:
+            result = self.bulk_write('price_history', PRICE_ENTRY_COLUMNS, rows(),
+                                     update_columns=PRICE_ENTRY_UPDATE_COLUMNS,
+                                     chunk_size=chunk_size, cursor=cursor)
+            if film_ids and Config.PRICE_STATS_ENABLED:
+                from services.price_stats_service import get_price_stats_service
+                get_price_stats_service().recompute_films(cursor, film_ids)
+        
+        return result
     
     def get_user_watchlist(self, user_id):
         """Get user's watchlist"""
-        query = """
-        SELECT w.*, f.title, f.year, f.format, f.poster_url
-        FROM watchlist w
-        JOIN films f ON w.film_id = f.id
-        WHERE w.user_id = %s AND w.status = 'Active'
-        ORDER BY w.created_at DESC
-        """
-        success, result = self.execute_query(query, (user_id,), fetch=True)
+        success, result = self.execute_query(USER_WATCHLIST_QUERY, (user_id,), fetch=True)
         return result if success else []
     
+    def iter_user_watchlist(self, user_id):
+        """Stream user's watchlist (see iter_query), for watchlists too large to load at once"""
+        return self.iter_query(USER_WATCHLIST_QUERY, (user_id,))
+    
     def add_to_watchlist(self, user_id, film_id, target_price=None):
         """Add film to user's watchlist"""
         query = """
@@ -264,6 +719,20 @@ class DatabaseService:
         updated_at = NOW()
         """
         return self.execute_query(query, (api_name, api_key, api_secret))
+    
+    def save_api_keys(self, api_keys):
+        """
+        Save several API keys in one statement
+        
+        Args:
+            api_keys: (api_name, api_key, api_secret) tuples
+        """
+        now = datetime.utcnow()
+        return self.bulk_write(
+            'api_keys', ('api_name', 'api_key', 'api_secret', 'created_at'),
+            ((api_name, api_key, api_secret, now) for api_name, api_key, api_secret in api_keys),
+            update_columns=('api_key', 'api_secret'), on_update='updated_at = NOW()'
+        )
 
 # Global database instance
 db_service = None
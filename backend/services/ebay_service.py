@@ -7,12 +7,17 @@ Handles all eBay API interactions for Film Price Guide
 import requests
 import base64
 import json
-import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from typing import Dict, List, Optional, Any
 import logging
 
 from config.config import Config
+from utils.http_client import get_http_client
+from utils.token_store import get_token_store
+from utils.token_bucket import get_rate_limiter, waiting_allowed, without_waiting
+from utils.response_cache import get_response_cache, make_cache_key
+from utils.title_classifier import classify_title
 
 logger = logging.getLogger(__name__)
 
@@ -31,16 +36,31 @@ class EbayService:
         self.marketplace_insights_url = f"{self.base_url}/buy/marketplace_insights/v1_beta"
         self.oauth_url = f"{self.base_url}/identity/v1/oauth2/token"
         
-        # Rate limiting
-        self.last_request_time = 0
-        self.min_request_interval = 1.0  # Minimum 1 second between requests
+        # Shared pooled transport
+        self.http = get_http_client()
         
-        # Token management
-        self._access_token = None
-        self._token_expires_at = None
+        # Rate limiting (1 request per second, shared by every worker)
+        self.min_request_interval = 1.0
+        self.rate_limiter = get_rate_limiter('ebay', rate=1 / self.min_request_interval, capacity=1)
+        
+        # Sold-items responses change slowly, so identical searches are served from cache
+        self.search_cache = get_response_cache(
+            'ebay_sold_items',
+            ttl=Config.EBAY_CACHE_TTL,
+            max_entries=Config.EBAY_CACHE_MAX_ENTRIES,
+            max_bytes=Config.EBAY_CACHE_MAX_BYTES,
+            disk=Config.EBAY_CACHE_DISK
+        )
+        
+        # Token management (shared by every worker on the host)
+        self.token_store = get_token_store()
+        self._token_name = f"ebay:{self.environment}:{self.app_id}"
         
         # Validate configuration
         self._validate_config()
+        
+        # Keep the shared token fresh so requests never wait on OAuth
+        self.token_store.start_background_refresh(self._token_name, self._request_access_token)
     
     def _validate_config(self):
         """Validate eBay API configuration"""
@@ -52,15 +72,18 @@ class EbayService:
     def _get_access_token(self) -> str:
         """
         Get OAuth 2.0 access token for eBay API
-        Caches token and refreshes when expired
+        Served from the cross-process token store; refreshed there when expired
+        """
+        return self.token_store.get_token(self._token_name, self._request_access_token)
+    
+    def _request_access_token(self):
+        """
+        Mint a new OAuth 2.0 access token
+        
+        Returns:
+            Tuple of (access token, lifetime in seconds)
         """
         try:
-            # Check if we have a valid cached token
-            if (self._access_token and self._token_expires_at and 
-                datetime.utcnow() < self._token_expires_at):
-                return self._access_token
-            
-            # Generate new access token
             logger.info("Generating new eBay access token")
             
             # Prepare OAuth request
@@ -77,18 +100,14 @@ class EbayService:
                 'scope': 'https://api.ebay.com/oauth/api_scope'
             }
             
-            response = requests.post(self.oauth_url, headers=headers, data=data)
+            response = self.http.post(self.oauth_url, headers=headers, data=data)
             response.raise_for_status()
             
             token_data = response.json()
-            self._access_token = token_data['access_token']
-            
-            # Set expiration time (subtract 5 minutes for safety)
             expires_in = token_data.get('expires_in', 7200)  # Default 2 hours
-            self._token_expires_at = datetime.utcnow() + timedelta(seconds=expires_in - 300)
             
             logger.info("eBay access token generated successfully")
-            return self._access_token
+            return token_data['access_token'], expires_in
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get eBay access token: {str(e)}")
@@ -98,15 +117,12 @@ class EbayService:
             raise
     
     def _rate_limit(self):
-        """Apply rate limiting between API requests"""
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            time.sleep(sleep_time)
-        
-        self.last_request_time = time.time()
+        """
+        Apply rate limiting between API requests
+        Takes a token from the bucket shared by all workers and threads; raises
+        RateLimitExceeded at once on a request thread, background callers wait
+        """
+        self.rate_limiter.acquire_or_raise()
     
     def _make_api_request(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -130,7 +146,7 @@ class EbayService:
             
             # Make request
             url = f"{self.marketplace_insights_url}/{endpoint}"
-            response = requests.get(url, headers=headers, params=params)
+            response = self.http.get(url, headers=headers, params=params)
             
             # Log request for debugging
             logger.info(f"eBay API request: {response.url}")
@@ -164,6 +180,7 @@ class EbayService:
         
         Returns:
             Dictionary containing search results and metadata
+            (fromCache is True when served without calling eBay)
         """
         try:
             logger.info(f"Searching eBay sold items with params: {search_params}")
@@ -171,19 +188,115 @@ class EbayService:
             # Build API parameters
             api_params = self._build_search_params(search_params)
             
+            # Serve repeated searches from cache
+            cache_key = make_cache_key(self._normalize_cache_params(api_params))
+            cached = self.search_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"eBay search served from cache: {len(cached.get('itemSales', []))} items")
+                return {**cached, 'fromCache': True}
+            
             # Make API request
             response_data = self._make_api_request('item_sales/search', api_params)
             
             # Process and enhance response
             processed_data = self._process_search_response(response_data, search_params)
+            self.search_cache.set(cache_key, processed_data)
             
             logger.info(f"eBay search completed: {len(processed_data.get('itemSales', []))} items found")
-            return processed_data
+            return {**processed_data, 'fromCache': False}
             
         except Exception as e:
             logger.error(f"Error in eBay search: {str(e)}")
             raise
     
+    def search_all_sold_items(self, search_params: Dict[str, Any],
+                              max_items: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Search for sold items across every result page, up to max_items
+        
+        Fetches the first page to learn the result total, then pulls the
+        remaining offsets concurrently (still under the eBay rate limit).
+        
+        Args:
+            search_params: Same parameters as search_sold_items (limit/offset are managed here)
+            max_items: Maximum number of sales to fetch (default: eBay's offset ceiling)
+        
+        Returns:
+            Dictionary shaped like search_sold_items with a merged, de-duplicated itemSales list
+        """
+        try:
+            page_size = Config.EBAY_PAGE_SIZE
+            start_offset = int(search_params.get('offset', 0))
+            max_items = min(max_items or Config.EBAY_MAX_OFFSET, Config.EBAY_MAX_OFFSET)
+            
+            logger.info(f"Fetching all eBay sold item pages (max {max_items}) with params: {search_params}")
+            
+            # First page tells us how many results exist
+            first_params = {**search_params, 'limit': page_size, 'offset': start_offset}
+            first_page = self._make_api_request('item_sales/search', self._build_search_params(first_params))
+            
+            total = int(first_page.get('total', 0))
+            end_offset = min(total, start_offset + max_items, Config.EBAY_MAX_OFFSET)
+            offsets = list(range(start_offset + page_size, end_offset, page_size))
+            
+            pages = [first_page]
+            if offsets:
+                # Page threads have no request context, so carry over whether the caller may wait
+                wait_for_slots = waiting_allowed()
+                
+                def fetch_page(offset):
+                    page_params = {**search_params, 'limit': page_size, 'offset': offset}
+                    with without_waiting(not wait_for_slots):
+                        return self._make_api_request('item_sales/search', self._build_search_params(page_params))
+                
+                workers = max(1, min(Config.EBAY_PAGE_FETCH_WORKERS, len(offsets)))
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # map() keeps results in offset order
+                    pages.extend(executor.map(fetch_page, offsets))
+            
+            merged = self._merge_item_sales(pages, max_items)
+            
+            response_data = {
+                **first_page,
+                'limit': len(merged),
+                'offset': start_offset,
+                'itemSales': merged
+            }
+            response_data.pop('next', None)
+            
+            processed_data = self._process_search_response(response_data, search_params)
+            processed_data['pagesFetched'] = len(pages)
+            
+            logger.info(f"eBay full search completed: {len(merged)} unique items from {len(pages)} pages (total {total})")
+            return processed_data
+            
+        except Exception as e:
+            logger.error(f"Error in eBay full search: {str(e)}")
+            raise
+    
+    def _merge_item_sales(self, pages: List[Dict[str, Any]], max_items: int) -> List[Dict[str, Any]]:
+        """Merge itemSales from several pages, dropping sales already seen"""
+        merged = []
+        seen = set()
+        
+        for page in pages:
+            for item in page.get('itemSales', []):
+                # Result sets can shift between page requests, so the same sale may repeat
+                key = item.get('itemId') or (
+                    item.get('title'),
+                    item.get('lastSoldDate'),
+                    item.get('lastSoldPrice', {}).get('value')
+                )
+                if key in seen:
+                    continue
+                seen.add(key)
+                merged.append(item)
+                
+                if len(merged) >= max_items:
+                    return merged
+        
+        return merged
+    
     def _build_search_params(self, search_params: Dict[str, Any]) -> Dict[str, Any]:
         """Build API parameters from search request"""
         api_params = {}
@@ -213,6 +326,23 @@ class EbayService:
         
         return api_params
     
+    @staticmethod
+    def _normalize_cache_params(api_params: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize API parameters so equivalent searches share a cache entry"""
+        normalized = dict(api_params)
+        
+        if normalized.get('q'):
+            normalized['q'] = ' '.join(str(normalized['q']).lower().split())
+        if normalized.get('category_ids'):
+            categories = {c.strip() for c in str(normalized['category_ids']).split(',') if c.strip()}
+            normalized['category_ids'] = ','.join(sorted(categories))
+        if normalized.get('filter'):
+            normalized['filter'] = ','.join(sorted(f.strip() for f in str(normalized['filter']).split(',')))
+        normalized['limit'] = int(normalized.get('limit', 50))
+        normalized['offset'] = int(normalized.get('offset', 0))
+        
+        return normalized
+    
     def _process_search_response(self, response_data: Dict[str, Any], 
                                original_params: Dict[str, Any]) -> Dict[str, Any]:
         """Process and enhance eBay API response"""
@@ -260,9 +390,10 @@ class EbayService:
         try:
             enhanced = item.copy()
             
-            # Add format detection
-            title = item.get('title', '')
-            enhanced['detectedFormat'] = self._detect_format(title)
+            # Add format, year, studio and edition detection (one scan of the title)
+            title_attributes = classify_title(item.get('title', ''))
+            enhanced['detectedFormat'] = title_attributes['format']
+            enhanced['titleAttributes'] = title_attributes
             
             # Add condition mapping
             condition_id = item.get('conditionId')
@@ -288,20 +419,7 @@ class EbayService:
     
     def _detect_format(self, title: str) -> str:
         """Detect movie format from title"""
-        title_upper = title.upper()
-        
-        if 'VHS' in title_upper:
-            return 'VHS'
-        elif 'DVD' in title_upper:
-            return 'DVD'
-        elif 'BLU-RAY' in title_upper or 'BLURAY' in title_upper:
-            return 'Blu-ray'
-        elif '4K' in title_upper or 'UHD' in title_upper:
-            return '4K UHD'
-        elif 'LASERDISC' in title_upper:
-            return 'LaserDisc'
-        else:
-            return 'Unknown'
+        return classify_title(title)['format']
     
     def _map_condition_id(self, condition_id: str) -> str:
         """Map eBay condition ID to readable name"""
@@ -429,4 +547,14 @@ class EbayService:
             'calls_made_today': 0,  # Would need to track this
             'rate_limit_per_second': 1,
             'environment': self.environment
-        }
\ No newline at end of file
+        }
+
+# Global eBay service instance
+ebay_service = None
+
+def get_ebay_service():
+    """Get eBay service instance"""
+    global ebay_service
+    if not ebay_service:
+        ebay_service = EbayService()
+    return ebay_service
@@ -4,18 +4,20 @@ GoCollect API Service for Film Price Guide
 Integrates collectible movie item pricing from GoCollect
 """
 
-import requests
 import os
-import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Any
 import logging
 
+from config.config import Config
+from utils.http_client import get_http_client
+from utils.token_bucket import RateLimitExceeded, get_rate_limiter
+
 logger = logging.getLogger(__name__)
 
 class GoCollectService:
     def __init__(self):
-        self.base_url = "https://gocollect.com"
+        self.base_url = Config.GOCOLLECT_BASE_URL.rstrip('/')
         self.api_token = os.getenv('GOCOLLECT_API_TOKEN')
         self.headers = {
             'Authorization': f'Bearer {self.api_token}',
@@ -23,12 +25,18 @@ class GoCollectService:
             'Accept': 'application/json'
         }
         
+        # Shared pooled transport
+        self.http = get_http_client()
+        
         # Rate limiting - VERY STRICT (from OpenAPI spec)
         self.rate_limit_daily = 50  # Non-subscribers (conservative default)
         self.rate_limit_pro_daily = 100  # Pro subscribers
         self.rate_limit_sold_examples = 500  # Per hour for sold examples API
         self.rate_limit_staged_sales = 500  # Per hour for staged sales API
         
+        # Request spacing (one call every 2 seconds, shared by every worker)
+        self.rate_limiter = get_rate_limiter('gocollect', rate=0.5, capacity=1)
+        
         # Valid markets from OpenAPI spec
         self.valid_markets = [
             'comics', 'video-games', 'concert-posters', 
@@ -74,7 +82,13 @@ class GoCollectService:
             
             logger.info(f"Searching GoCollect for: {query} in {cam} market")
             
-            response = requests.get(endpoint, headers=self.headers, params=params)
+            try:
+                self.rate_limiter.acquire_or_raise()
+            except RateLimitExceeded as e:
+                logger.warning(f"GoCollect {e}")
+                return None
+            
+            response = self.http.get(endpoint, headers=self.headers, params=params)
             
             if response.status_code == 200:
                 results = response.json()
@@ -133,7 +147,13 @@ class GoCollectService:
             
             logger.info(f"Getting insights for GoCollect item {item_id}")
             
-            response = requests.get(endpoint, headers=self.headers, params=params)
+            try:
+                self.rate_limiter.acquire_or_raise()
+            except RateLimitExceeded as e:
+                logger.warning(f"GoCollect {e}")
+                return None
+            
+            response = self.http.get(endpoint, headers=self.headers, params=params)
             
             if response.status_code == 200:
                 insights = response.json()
@@ -172,9 +192,7 @@ class GoCollectService:
         
         for market in movie_relevant_markets:
             try:
-                # Add delay to respect very strict rate limits (50-100/day)
-                time.sleep(1)  # Be very conservative with rate limits
-                
+                # Requests are spaced by the shared GoCollect rate limiter
                 market_results = self.search_collectibles(movie_title, market, limit=20)  # Reduced from 50
                 if market_results:
                     results[market] = market_results
@@ -214,8 +232,6 @@ class GoCollectService:
             
             # Get insights for each collectible (limit to top 3 to respect STRICT rate limits)
             for item in collectibles[:3]:  # Reduced from 5 to 3
-                time.sleep(2)  # More conservative rate limiting (daily limits are very low)
-                
                 insights = self.get_item_insights(item['item_id'])
                 if insights and insights.get('metrics'):
                     pricing_data.append(insights)
@@ -291,11 +307,10 @@ class GoCollectService:
         """Check if GoCollect API is accessible"""
         try:
             # Simple search to test connectivity
-            response = requests.get(
+            response = self.http.get(
                 f"{self.base_url}/api/collectibles/v1/item/search",
                 headers=self.headers,
-                params={'query': 'test', 'limit': 1},
-                timeout=10
+                params={'query': 'test', 'limit': 1}
             )
             return response.status_code in [200, 204]  # 204 = no results, but API working
             
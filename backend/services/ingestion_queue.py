@@ -0,0 +1,467 @@
+# backend/services/ingestion_queue.py
+"""
+Asynchronous Ingestion Queue
+Durable SQLite work queue for eBay itemSales plus background workers that
+batch-write them through the ingestion service, off the request path
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Any, Tuple
+import logging
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+class IngestionQueue:
+    """
+    SQLite-backed queue of itemSales payloads
+    
+    Jobs move pending -> processing -> deleted on success. Every claim
+    counts as an attempt. A failed job goes back to pending with exponential
+    backoff until max_attempts, then it is parked as dead (the dead-letter
+    queue) for inspection or requeue. A job left in processing longer than
+    the visibility timeout (crashed worker) is claimable again, or
+    dead-lettered if that claim was its last attempt. Enqueue refuses work once the pending backlog
+    reaches max_items, so a slow database sheds load instead of growing
+    the queue without bound.
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_items: Optional[int] = None,
+                 max_attempts: Optional[int] = None):
+        self.path = path or os.path.join(Config.SHARED_STATE_DIR, 'ingestion_queue.db')
+        self.max_items = max_items or Config.INGESTION_QUEUE_MAX_ITEMS
+        self.max_attempts = max_attempts or Config.INGESTION_QUEUE_MAX_ATTEMPTS
+        self.retry_delay = Config.INGESTION_QUEUE_RETRY_DELAY
+        self.visibility_timeout = Config.INGESTION_QUEUE_VISIBILITY_TIMEOUT
+        
+        # Wakes idle workers in this process as soon as work arrives
+        self.work_available = threading.Event()
+        self._counters_lock = threading.Lock()
+        self._counters = {
+            'enqueued_jobs': 0,
+            'enqueued_items': 0,
+            'rejected_jobs': 0,
+            'rejected_items': 0,
+            'completed_jobs': 0,
+            'retried_jobs': 0,
+            'dead_lettered_jobs': 0,
+            'stale_results': 0
+        }
+        
+        self._init_store()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; transactions are managed explicitly"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_store(self):
+        """Create the jobs table"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT,
+                    payload TEXT NOT NULL,
+                    item_count INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    available_at REAL NOT NULL,
+                    claimed_by TEXT,
+                    claimed_at REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status
+                ON ingestion_jobs (status, available_at)
+            ''')
+        finally:
+            conn.close()
+    
+    def _count(self, name: str, amount: int = 1):
+        with self._counters_lock:
+            self._counters[name] += amount
+    
+    def enqueue(self, items: List[Dict[str, Any]], source: Optional[str] = None) -> bool:
+        """
+        Queue itemSales for background ingestion
+        
+        Args:
+            items: itemSales entries as returned by the Marketplace Insights API
+            source: Free-form label for logs (e.g. the search query)
+        
+        Returns:
+            True if queued, False if the backlog is full (the items are dropped)
+        """
+        if not items:
+            return True
+        
+        payload = json.dumps(items, default=str)
+        now = time.time()
+        
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                backlog = conn.execute(
+                    "SELECT COALESCE(SUM(item_count), 0) FROM ingestion_jobs WHERE status != 'dead'"
+                ).fetchone()[0]
+                if backlog + len(items) > self.max_items:
+                    conn.execute('ROLLBACK')
+                    self._count('rejected_jobs')
+                    self._count('rejected_items', len(items))
+                    logger.warning(f"Ingestion queue full ({backlog} items pending), "
+                                   f"dropped {len(items)} items for '{source}'")
+                    return False
+                
+                conn.execute('''
+                    INSERT INTO ingestion_jobs (source, payload, item_count, available_at, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (source, payload, len(items), now, now))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+        
+        self._count('enqueued_jobs')
+        self._count('enqueued_items', len(items))
+        self.work_available.set()
+        return True
+    
+    def claim(self, worker_id: str, max_items: int) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Claim ready jobs totalling about max_items items
+        
+        Each claim counts as an attempt, so a job that keeps crashing its
+        worker (and is reclaimed after the visibility timeout) still ends up
+        dead-lettered after max_attempts.
+        
+        Returns:
+            List of (job id, items); at least one job when any is ready
+        """
+        now = time.time()
+        expired = []
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                rows = conn.execute('''
+                    SELECT id, payload, item_count, attempts, status FROM ingestion_jobs
+                    WHERE (status = 'pending' AND available_at <= ?)
+                       OR (status = 'processing' AND claimed_at < ?)
+                    ORDER BY id
+                    LIMIT ?
+                ''', (now, now - self.visibility_timeout, max(max_items, 1))).fetchall()
+                
+                claimed = []
+                total = 0
+                for row in rows:
+                    if row['attempts'] >= self.max_attempts:
+                        # Its last claim timed out without a result
+                        expired.append(row['id'])
+                        continue
+                    if claimed and total + row['item_count'] > max_items:
+                        break
+                    claimed.append(row)
+                    total += row['item_count']
+                
+                if expired:
+                    placeholders = ', '.join(['?'] * len(expired))
+                    conn.execute(
+                        f"UPDATE ingestion_jobs SET status = 'dead', claimed_by = NULL, claimed_at = NULL, "
+                        f"last_error = 'Worker did not finish before the visibility timeout' "
+                        f"WHERE id IN ({placeholders})",
+                        expired
+                    )
+                if claimed:
+                    placeholders = ', '.join(['?'] * len(claimed))
+                    conn.execute(
+                        f"UPDATE ingestion_jobs SET status = 'processing', claimed_by = ?, claimed_at = ?, "
+                        f"attempts = attempts + 1 WHERE id IN ({placeholders})",
+                        [worker_id, now] + [row['id'] for row in claimed]
+                    )
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+        
+        if expired:
+            self._count('dead_lettered_jobs', len(expired))
+            logger.error(f"Ingestion jobs {expired} moved to dead letters: claims kept timing out")
+        return [(row['id'], json.loads(row['payload'])) for row in claimed]
+    
+    def complete(self, job_ids: List[int], worker_id: str) -> int:
+        """
+        Remove jobs that were written successfully
+        Only jobs still claimed by worker_id are removed; returns how many were
+        """
+        if not job_ids:
+            return 0
+        
+        placeholders = ', '.join(['?'] * len(job_ids))
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                f"DELETE FROM ingestion_jobs WHERE id IN ({placeholders}) AND claimed_by = ?",
+                job_ids + [worker_id]
+            )
+            removed = cursor.rowcount
+        finally:
+            conn.close()
+        
+        self._count('completed_jobs', removed)
+        if removed < len(job_ids):
+            self._count('stale_results', len(job_ids) - removed)
+            logger.warning(f"Worker {worker_id} completed {len(job_ids) - removed} ingestion job(s) "
+                           f"after its claim expired; the newer claim owns them")
+        return removed
+    
+    def fail(self, job_id: int, error: str, worker_id: str) -> bool:
+        """
+        Schedule a retry with exponential backoff, or dead-letter the job after max_attempts
+        Returns False (and changes nothing) if worker_id no longer holds the claim
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    'SELECT attempts FROM ingestion_jobs WHERE id = ? AND claimed_by = ?', (job_id, worker_id)
+                ).fetchone()
+                if not row:
+                    conn.execute('COMMIT')
+                    self._count('stale_results')
+                    logger.warning(f"Worker {worker_id} failed ingestion job {job_id} after its claim "
+                                   f"expired; the newer claim owns it")
+                    return False
+                
+                # The claim already counted this attempt
+                attempts = row['attempts']
+                if attempts >= self.max_attempts:
+                    conn.execute('''
+                        UPDATE ingestion_jobs SET status = 'dead', last_error = ?,
+                        claimed_by = NULL, claimed_at = NULL WHERE id = ? AND claimed_by = ?
+                    ''', (error[:1000], job_id, worker_id))
+                else:
+                    available_at = time.time() + self.retry_delay * (2 ** (attempts - 1))
+                    conn.execute('''
+                        UPDATE ingestion_jobs SET status = 'pending', last_error = ?,
+                        available_at = ?, claimed_by = NULL, claimed_at = NULL WHERE id = ? AND claimed_by = ?
+                    ''', (error[:1000], available_at, job_id, worker_id))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+        
+        if attempts >= self.max_attempts:
+            self._count('dead_lettered_jobs')
+            logger.error(f"Ingestion job {job_id} moved to dead letters after {attempts} attempts: {error}")
+        else:
+            self._count('retried_jobs')
+            logger.warning(f"Ingestion job {job_id} failed (attempt {attempts}), will retry: {error}")
+        return True
+    
+    def get_dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """List dead-lettered jobs (without payloads)"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT id, source, item_count, attempts, last_error, created_at
+                FROM ingestion_jobs WHERE status = 'dead' ORDER BY id DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+    
+    def requeue_dead_letters(self) -> int:
+        """Give every dead-lettered job a fresh set of attempts"""
+        conn = self._connect()
+        try:
+            cursor = conn.execute('''
+                UPDATE ingestion_jobs SET status = 'pending', attempts = 0, available_at = ?
+                WHERE status = 'dead'
+            ''', (time.time(),))
+            count = cursor.rowcount
+        finally:
+            conn.close()
+        
+        if count:
+            self.work_available.set()
+        return count
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue depth by status, age of the oldest pending job and this process's counters"""
+        conn = self._connect()
+        try:
+            rows = conn.execute('''
+                SELECT status, COUNT(*) AS jobs, COALESCE(SUM(item_count), 0) AS items,
+                       MIN(created_at) AS oldest
+                FROM ingestion_jobs GROUP BY status
+            ''').fetchall()
+        finally:
+            conn.close()
+        
+        stats = {status: {'jobs': 0, 'items': 0} for status in ('pending', 'processing', 'dead')}
+        oldest_pending = None
+        for row in rows:
+            stats[row['status']] = {'jobs': row['jobs'], 'items': row['items']}
+            if row['status'] == 'pending':
+                oldest_pending = row['oldest']
+        
+        stats['depth_items'] = stats['pending']['items'] + stats['processing']['items']
+        stats['max_items'] = self.max_items
+        stats['oldest_pending_seconds'] = round(time.time() - oldest_pending, 1) if oldest_pending else 0
+        with self._counters_lock:
+            stats['counters'] = dict(self._counters)
+        return stats
+
+class IngestionWorkerPool:
+    """
+    Background threads that drain the ingestion queue
+    
+    Each worker claims up to INGESTION_BATCH_SIZE items across jobs and
+    writes them in one ingestion call. If a merged batch fails, its jobs
+    are retried one by one so a single bad payload cannot hold back others.
+    """
+    
+    def __init__(self, queue: IngestionQueue, workers: Optional[int] = None,
+                 batch_items: Optional[int] = None, ingestion_service=None):
+        self.queue = queue
+        self.workers = workers or Config.INGESTION_QUEUE_WORKERS
+        self.batch_items = batch_items or Config.INGESTION_BATCH_SIZE
+        self.poll_interval = Config.INGESTION_QUEUE_POLL_INTERVAL
+        self._ingestion_service = ingestion_service
+        
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def ingestion_service(self):
+        # Imported lazily so the queue can be used without a database driver
+        if self._ingestion_service is None:
+            from services.ingestion_service import get_ingestion_service
+            self._ingestion_service = get_ingestion_service()
+        return self._ingestion_service
+    
+    def start(self):
+        """Start the worker threads (safe to call repeatedly)"""
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            if self._threads:
+                return
+            
+            self._stop.clear()
+            prefix = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, args=(f"{prefix}-{index}",),
+                    name=f"ingestion-worker-{index}", daemon=True
+                )
+                self._threads.append(thread)
+                thread.start()
+        
+        logger.info(f"Started {self.workers} ingestion workers")
+    
+    def stop(self, timeout: float = 10):
+        """Ask workers to finish their current batch and exit"""
+        self._stop.set()
+        self.queue.work_available.set()
+        for thread in self._threads:
+            thread.join(timeout)
+    
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+    
+    def _run(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                jobs = self.queue.claim(worker_id, self.batch_items)
+            except Exception as e:
+                logger.error(f"Ingestion worker {worker_id} could not claim jobs: {str(e)}")
+                jobs = []
+            
+            if not jobs:
+                self.queue.work_available.wait(self.poll_interval)
+                self.queue.work_available.clear()
+                continue
+            
+            self._process(worker_id, jobs)
+    
+    def _process(self, worker_id: str, jobs: List[Tuple[int, List[Dict[str, Any]]]]):
+        """Write claimed jobs as one batch, isolating failures per job"""
+        try:
+            items = [item for _, job_items in jobs for item in job_items]
+            self.ingestion_service.ingest_item_sales(items)
+            self.queue.complete([job_id for job_id, _ in jobs], worker_id)
+            return
+        except Exception as e:
+            if len(jobs) == 1:
+                self.queue.fail(jobs[0][0], str(e), worker_id)
+                return
+            logger.warning(f"Batch of {len(jobs)} ingestion jobs failed, retrying individually: {str(e)}")
+        
+        for job_id, job_items in jobs:
+            try:
+                self.ingestion_service.ingest_item_sales(job_items)
+                self.queue.complete([job_id], worker_id)
+            except Exception as e:
+                self.queue.fail(job_id, str(e), worker_id)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'workers': self.workers,
+            'alive': sum(1 for thread in self._threads if thread.is_alive()),
+            'batch_items': self.batch_items
+        }
+
+# Global queue and worker pool shared by every endpoint in the process
+ingestion_queue = None
+ingestion_workers = None
+_queue_lock = threading.Lock()
+
+def get_ingestion_queue() -> IngestionQueue:
+    """Get shared ingestion queue instance"""
+    global ingestion_queue
+    if not ingestion_queue:
+        with _queue_lock:
+            if not ingestion_queue:
+                ingestion_queue = IngestionQueue()
+    return ingestion_queue
+
+def get_ingestion_workers() -> IngestionWorkerPool:
+    """Get shared ingestion worker pool (not started until start() is called)"""
+    global ingestion_workers
+    if not ingestion_workers:
+        queue = get_ingestion_queue()
+        with _queue_lock:
+            if not ingestion_workers:
+                ingestion_workers = IngestionWorkerPool(queue)
+    return ingestion_workers
+
+def get_ingestion_queue_stats() -> Dict[str, Any]:
+    """Queue depth and worker metrics for the admin status endpoint"""
+    stats = get_ingestion_queue().get_stats()
+    stats['workers'] = get_ingestion_workers().get_stats()
+    return stats
@@ -0,0 +1,320 @@
+# backend/services/ingestion_service.py
+"""
+Price Ingestion Service
+Set-based persistence of eBay sales into films and price_history
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Any, Tuple, Iterable
+import logging
+
+from config.config import Config
+from services.database_service import get_db
+from models.film import Film
+from utils.title_classifier import classify_title
+from utils.film_index import FilmIndex, get_film_index
+from services.price_stats_service import get_price_stats_service
+
+logger = logging.getLogger(__name__)
+
+# Columns written for every price_history row, in INSERT order
+PRICE_HISTORY_COLUMNS = (
+    'film_id', 'price', 'currency', 'condition_name', 'condition_id', 'sale_date',
+    'platform', 'listing_type', 'seller_rating', 'total_sold_quantity',
+    'external_listing_id', 'external_listing_url', 'listing_title'
+)
+LISTING_ID_INDEX = PRICE_HISTORY_COLUMNS.index('external_listing_id')
+PRICE_INDEX = PRICE_HISTORY_COLUMNS.index('price')
+SALE_DATE_INDEX = PRICE_HISTORY_COLUMNS.index('sale_date')
+
+# films.format ENUM values, lowercased (the column's collation is case-insensitive)
+FILM_FORMATS = frozenset(value.lower() for value in ('VHS', 'DVD', 'Blu-ray', 'Digital', '4K UHD', 'Laserdisc'))
+
+# Columns refreshed when a listing is already stored (upsert mode)
+# film_id is left alone so existing alerts and stats keep pointing at the same film
+PRICE_HISTORY_UPDATE_COLUMNS = (
+    'price', 'currency', 'condition_name', 'condition_id', 'sale_date',
+    'seller_rating', 'total_sold_quantity', 'external_listing_url', 'listing_title'
+)
+
+def _chunks(rows: List[Any], size: int) -> Iterable[List[Any]]:
+    """Split a list into consecutive chunks of at most size rows"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+class PriceIngestionService:
+    """
+    Batch ingestion of eBay itemSales
+    
+    Normalizes every title up front, resolves known films from the
+    in-memory film index and the rest (creating missing films) in one
+    set-based pass, then writes price rows with one multi-row INSERT per
+    batch, all inside a single transaction.
+    
+    Sales are keyed on (platform, external_listing_id). In upsert mode a
+    listing that is already stored is updated in place; otherwise it is
+    left untouched and skipped.
+    
+    film_price_stats is kept current in the same transaction: new sales
+    are added incrementally, films with updated sales are recomputed.
+    """
+    
+    def __init__(self, db=None, batch_size: Optional[int] = None, upsert: Optional[bool] = None,
+                 film_index=None, price_stats=None):
+        self.db = db or get_db()
+        self.film_index = film_index or get_film_index()
+        if price_stats is None and Config.PRICE_STATS_ENABLED:
+            price_stats = get_price_stats_service()
+        self.price_stats = price_stats
+        self.batch_size = batch_size or Config.INGESTION_BATCH_SIZE
+        self.upsert = Config.INGESTION_UPSERT if upsert is None else upsert
+    
+    def ingest_item_sales(self, items: List[Dict[str, Any]], platform: str = 'eBay',
+                          upsert: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Persist a list of eBay itemSales
+        
+        Args:
+            items: itemSales entries as returned by the Marketplace Insights API
+            platform: price_history platform value
+            upsert: Update listings that are already stored (defaults to the service setting)
+        
+        Returns:
+            Ingestion statistics including throughput in rows/sec
+        """
+        start_time = time.perf_counter()
+        upsert = self.upsert if upsert is None else upsert
+        
+        prepared = self._prepare_items(items)
+        stats = {
+            'items_received': len(items),
+            'items_skipped': len(items) - len(prepared),
+            'films_created': 0,
+            'films_from_index': 0,
+            'rows_inserted': 0,
+            'rows_updated': 0,
+            'rows_unchanged': 0,
+            'batches': 0
+        }
+        
+        if prepared:
+            with self.db.transaction() as cursor:
+                film_ids, stats['films_created'], stats['films_from_index'] = self._resolve_film_ids(
+                    cursor, {key for key, _ in prepared}
+                )
+                
+                rows = []
+                for key, item in prepared:
+                    film_id = film_ids.get(self._lookup_key(key))
+                    if film_id is None:
+                        # Never abort the batch over one film that could not be created
+                        logger.warning(f"No film id for {key}, skipping listing {item.get('itemId')}")
+                        stats['items_skipped'] += 1
+                        continue
+                    rows.append(self._build_price_row(item, film_id, platform))
+                
+                for batch in _chunks(rows, self.batch_size):
+                    # Locking read: the new/updated split below decides what film_price_stats adds
+                    existing = self._existing_listing_ids(cursor, platform, batch)
+                    new_rows = [row for row in batch if row[LISTING_ID_INDEX] not in existing]
+                    
+                    if upsert:
+                        self._upsert_price_rows(cursor, batch)
+                        stats['rows_updated'] += len(batch) - len(new_rows)
+                    else:
+                        if new_rows:
+                            self._insert_price_rows(cursor, new_rows)
+                        stats['rows_unchanged'] += len(batch) - len(new_rows)
+                    
+                    if self.price_stats:
+                        updated_films = {existing[row[LISTING_ID_INDEX]] for row in batch
+                                         if row[LISTING_ID_INDEX] in existing} if upsert else set()
+                        self._update_price_stats(cursor, new_rows, updated_films)
+                    
+                    stats['rows_inserted'] += len(new_rows)
+                    stats['batches'] += 1
+            
+            # Only committed ids go into the index
+            self.film_index.put_many(film_ids)
+        
+        elapsed = time.perf_counter() - start_time
+        stats['elapsed_seconds'] = round(elapsed, 4)
+        rows_written = stats['rows_inserted'] + stats['rows_updated'] + stats['rows_unchanged']
+        stats['rows_per_sec'] = round(rows_written / elapsed, 1) if elapsed > 0 else 0.0
+        
+        logger.info(
+            f"Ingested {stats['rows_inserted']} new price rows, updated {stats['rows_updated']}, "
+            f"kept {stats['rows_unchanged']} "
+            f"({stats['films_created']} new films, {stats['films_from_index']} from index, "
+            f"{stats['items_skipped']} skipped) "
+            f"in {stats['elapsed_seconds']}s - {stats['rows_per_sec']} rows/sec"
+        )
+        return stats
+    
+    def _prepare_items(self, items: List[Dict[str, Any]]) -> List[Tuple[Tuple[str, str], Dict[str, Any]]]:
+        """Normalize titles and drop sales that cannot be stored"""
+        prepared = []
+        listing_positions = {}
+        for item in items:
+            title = item.get('title')
+            if not title or not self._parse_sale_date(item.get('lastSoldDate')):
+                continue
+            
+            # Items from EbayService were already classified when the response was processed
+            format_type = item.get('detectedFormat') or classify_title(title)['format']
+            key = Film.normalize_key(title, format_type)
+            # 'Unknown' (no format keyword in the title) is not a films.format value
+            if not key[0] or key[1].lower() not in FILM_FORMATS:
+                continue
+            
+            # The same listing twice in one payload would hit the unique key; keep the latest
+            item_id = item.get('itemId')
+            if item_id and item_id in listing_positions:
+                prepared[listing_positions[item_id]] = (key, item)
+                continue
+            if item_id:
+                listing_positions[item_id] = len(prepared)
+            
+            prepared.append((key, item))
+        
+        return prepared
+    
+    @staticmethod
+    def _lookup_key(key: Tuple[str, str]) -> Tuple[str, str]:
+        """films uses a case-insensitive collation, so match keys the same way"""
+        return FilmIndex.key(*key)
+    
+    def _resolve_film_ids(self, cursor, keys: set) -> Tuple[Dict[Tuple[str, str], int], int, int]:
+        """
+        Map every (title, format) key to a film id, creating missing films
+        Known films come from the film index; only the rest are queried
+        
+        Returns:
+            Tuple of (lookup key -> film id, number of films created, number found in the index)
+        """
+        keys = list(keys)
+        film_ids = self.film_index.get_many(keys)
+        from_index = len(film_ids)
+        
+        unknown = [key for key in keys if self._lookup_key(key) not in film_ids]
+        if unknown:
+            film_ids.update(self._select_film_ids(cursor, unknown))
+        
+        missing = [key for key in unknown if self._lookup_key(key) not in film_ids]
+        created = 0
+        if missing:
+            # Another worker may create the same film first; unique_title_format
+            # turns that into a skipped row and the select below finds its id
+            for batch in _chunks(missing, self.batch_size):
+                placeholders = ', '.join(['(%s, %s)'] * len(batch))
+                params = [value for key in batch for value in key]
+                cursor.execute(f"INSERT IGNORE INTO films (title, format) VALUES {placeholders}", params)
+                created += cursor.rowcount
+            
+            film_ids.update(self._select_film_ids(cursor, missing))
+        
+        return film_ids, created, from_index
+    
+    def _select_film_ids(self, cursor, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """Look up film ids for many (title, format) keys with row-constructor IN queries"""
+        film_ids = {}
+        
+        for batch in _chunks(keys, self.batch_size):
+            placeholders = ', '.join(['(%s, %s)'] * len(batch))
+            params = [value for key in batch for value in key]
+            cursor.execute(
+                f"SELECT id, title, format FROM films WHERE (title, format) IN ({placeholders}) "
+                f"ORDER BY id",
+                params
+            )
+            for row in cursor.fetchall():
+                # Keep the oldest film if duplicates from before unique_title_format remain
+                film_ids.setdefault(self._lookup_key((row['title'], row['format'])), row['id'])
+        
+        return film_ids
+    
+    def _build_price_row(self, item: Dict[str, Any], film_id: int, platform: str) -> Tuple[Any, ...]:
+        """Build one price_history row in PRICE_HISTORY_COLUMNS order"""
+        last_sold_price = item.get('lastSoldPrice', {})
+        
+        return (
+            film_id,
+            float(last_sold_price.get('value', 0)),
+            last_sold_price.get('currency', 'USD'),
+            item.get('condition'),
+            item.get('conditionId'),
+            self._parse_sale_date(item.get('lastSoldDate')),
+            platform,
+            None,  # listing_type: eBay doesn't always provide this
+            item.get('seller', {}).get('feedbackScore'),
+            item.get('totalSoldQuantity', 1),
+            item.get('itemId'),
+            item.get('itemWebUrl'),
+            item.get('title')
+        )
+    
+    def _existing_listing_ids(self, cursor, platform: str, rows: List[Tuple[Any, ...]]) -> Dict[str, int]:
+        """
+        Find which listings in a batch are already stored, and their film (one unique-index lookup)
+        
+        The read locks the batch's listing keys until the transaction ends, so a
+        concurrent worker ingesting the same listings waits for this commit and
+        then sees them as stored instead of counting them as new sales too
+        """
+        listing_ids = [row[LISTING_ID_INDEX] for row in rows if row[LISTING_ID_INDEX]]
+        if not listing_ids:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(listing_ids))
+        cursor.execute(
+            f"SELECT external_listing_id, film_id FROM price_history "
+            f"WHERE platform = %s AND external_listing_id IN ({placeholders}) FOR UPDATE",
+            [platform] + listing_ids
+        )
+        return {row['external_listing_id']: row['film_id'] for row in cursor.fetchall()}
+    
+    def _update_price_stats(self, cursor, new_rows: List[Tuple[Any, ...]], updated_films: set) -> None:
+        """Add new sales to film_price_stats and recompute films whose stored sales changed"""
+        self.price_stats.apply_new_sales(
+            cursor, [(row[0], row[PRICE_INDEX], row[SALE_DATE_INDEX]) for row in new_rows]
+        )
+        if updated_films:
+            # An updated sale may have changed price or date; only a recompute is exact.
+            # Upserts keep the stored film_id, so these are the films the rows belong to.
+            self.price_stats.recompute_films(cursor, updated_films)
+    
+    def _insert_price_rows(self, cursor, rows: List[Tuple[Any, ...]]) -> int:
+        """Write a batch of price rows with a single multi-row INSERT"""
+        result = self.db.bulk_write('price_history', PRICE_HISTORY_COLUMNS, rows,
+                                    chunk_size=len(rows), cursor=cursor)
+        return result['affected_rows']
+    
+    def _upsert_price_rows(self, cursor, rows: List[Tuple[Any, ...]]) -> int:
+        """Write a batch of price rows, updating listings that are already stored"""
+        result = self.db.bulk_write('price_history', PRICE_HISTORY_COLUMNS, rows,
+                                    update_columns=PRICE_HISTORY_UPDATE_COLUMNS,
+                                    chunk_size=len(rows), cursor=cursor)
+        return result['affected_rows']
+    
+    @staticmethod
+    def _parse_sale_date(date_string: str) -> Optional[datetime]:
+        """Convert eBay ISO timestamps (e.g. 2024-01-31T18:22:05.000Z) to naive UTC datetimes"""
+        try:
+            parsed = datetime.fromisoformat(date_string.replace('Z', '+00:00'))
+        except (ValueError, AttributeError):
+            return None
+        
+        if parsed.tzinfo:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+# Global ingestion service instance
+ingestion_service = None
+
+def get_ingestion_service():
+    """Get price ingestion service instance"""
+    global ingestion_service
+    if not ingestion_service:
+        ingestion_service = PriceIngestionService()
+    return ingestion_service
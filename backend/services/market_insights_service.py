@@ -0,0 +1,451 @@
+# backend/services/market_insights_service.py
+"""
+Market insights rollup
+Populates market_insights with daily, weekly, monthly and quarterly sales
+statistics per film, per category, per format and for the whole market.
+
+Each run reads the price_history rows changed since the previous run's
+high-water mark, works out which periods and scopes they touch, and
+recomputes only those (plus the following period, whose trend is measured
+against them). Rows are upserted on unique_period_scope, so a repeated or
+overlapping run only redoes work.
+"""
+
+import itertools
+import statistics
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable, Set, Tuple
+import logging
+
+from config.config import Config
+from services.database_service import get_db
+
+logger = logging.getLogger(__name__)
+
+PERIOD_TYPES = ('Daily', 'Weekly', 'Monthly', 'Quarterly')
+ALL_FORMATS = 'All'
+
+# Row in rollup_watermarks holding the last processed price_history.updated_at
+JOB_NAME = 'market_insights'
+
+# MySQL named lock so only one process runs the rollup at a time
+ROLLUP_LOCK_NAME = 'market_insights_rollup'
+
+INSIGHT_COLUMNS = (
+    'period_start', 'period_end', 'period_type', 'film_id', 'category_id', 'format',
+    'total_sales', 'avg_price', 'median_price', 'min_price', 'max_price',
+    'price_trend', 'trend_percentage', 'volume_trend'
+)
+
+# trend_percentage is DECIMAL(5,2)
+MAX_TREND_PERCENTAGE = 999.99
+
+# A scope is (film_id, category_id, format) with 0 standing in for "any",
+# so scopes sort and compare like the unique key's film_scope/category_scope
+Scope = Tuple[int, int, str]
+OVERALL_SCOPE: Scope = (0, 0, ALL_FORMATS)
+
+def _add_months(day: date, months: int) -> date:
+    """First day of the month months after day's month"""
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+def period_bounds(period_type: str, day: date) -> Tuple[date, date]:
+    """First and last day of the period of period_type containing day"""
+    if period_type == 'Daily':
+        return day, day
+    if period_type == 'Weekly':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period_type == 'Monthly':
+        start = day.replace(day=1)
+        return start, _add_months(start, 1) - timedelta(days=1)
+    if period_type == 'Quarterly':
+        start = date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+        return start, _add_months(start, 3) - timedelta(days=1)
+    raise ValueError(f"Unknown period type: {period_type}")
+
+def next_period_start(period_type: str, start: date) -> date:
+    return period_bounds(period_type, start)[1] + timedelta(days=1)
+
+def previous_period_start(period_type: str, start: date) -> date:
+    return period_bounds(period_type, start - timedelta(days=1))[0]
+
+def _chunks(values: List[Any], size: int) -> Iterable[List[Any]]:
+    """Split a list into consecutive chunks of at most size values"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _percent_change(current: float, previous: float) -> float:
+    if not previous:
+        return 0.0
+    change = (current - previous) / previous * 100
+    return max(-MAX_TREND_PERCENTAGE, min(MAX_TREND_PERCENTAGE, change))
+
+def summarize(entries: List[Tuple[Scope, date, float]]) -> Dict[Tuple[Scope, date], Dict[str, Any]]:
+    """
+    Aggregate (scope, period_start, price) entries per scope and period
+    One sort orders every group's prices, so medians, minimums and maximums
+    are read off by position instead of being computed group by group
+    """
+    entries.sort()
+    groups = {}
+    for key, group in itertools.groupby(entries, key=lambda entry: (entry[0], entry[1])):
+        prices = [entry[2] for entry in group]
+        count = len(prices)
+        middle = count // 2
+        mean = sum(prices) / count
+        groups[key] = {
+            'total_sales': count,
+            'avg_price': mean,
+            'median_price': prices[middle] if count % 2 else (prices[middle - 1] + prices[middle]) / 2,
+            'min_price': prices[0],
+            'max_price': prices[-1],
+            'volatility': statistics.pstdev(prices) / mean if count > 1 and mean else 0.0
+        }
+    return groups
+
+def classify_trends(stats: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> Tuple[str, float, str]:
+    """
+    Price trend, its percentage and volume trend of a period against the one before
+    
+    Returns:
+        (price_trend, trend_percentage, volume_trend)
+    """
+    threshold = Config.MARKET_TREND_THRESHOLD
+    if previous is None:
+        return ('Volatile' if stats['volatility'] >= Config.MARKET_VOLATILITY_THRESHOLD else 'Stable'), 0.0, 'Stable'
+    
+    price_change = _percent_change(stats['avg_price'], previous['avg_price'])
+    if stats['volatility'] >= Config.MARKET_VOLATILITY_THRESHOLD:
+        price_trend = 'Volatile'
+    elif price_change >= threshold:
+        price_trend = 'Increasing'
+    elif price_change <= -threshold:
+        price_trend = 'Decreasing'
+    else:
+        price_trend = 'Stable'
+    
+    volume_change = _percent_change(stats['total_sales'], previous['total_sales'])
+    if volume_change >= threshold:
+        volume_trend = 'Increasing'
+    elif volume_change <= -threshold:
+        volume_trend = 'Decreasing'
+    else:
+        volume_trend = 'Stable'
+    
+    return price_trend, round(price_change, 2), volume_trend
+
+class _Touched:
+    """Scopes of one period whose insights need recomputing"""
+    
+    def __init__(self):
+        self.films: Set[int] = set()
+        self.formats: Set[str] = set()
+        self.categories: Set[int] = set()
+    
+    def update(self, other: '_Touched') -> None:
+        self.films |= other.films
+        self.formats |= other.formats
+        self.categories |= other.categories
+    
+    def scopes(self, film_formats: Dict[int, str]) -> Set[Scope]:
+        scopes = {OVERALL_SCOPE}
+        scopes.update((film_id, 0, film_formats[film_id]) for film_id in self.films)
+        scopes.update((0, 0, film_format) for film_format in self.formats)
+        scopes.update((0, category_id, ALL_FORMATS) for category_id in self.categories)
+        return scopes
+
+class MarketInsightsService:
+    """Incremental rollup of price_history into market_insights"""
+    
+    def __init__(self, db=None, batch_days: Optional[int] = None, chunk_size: int = 500):
+        self.db = db or get_db()
+        self.batch_days = batch_days or Config.MARKET_INSIGHTS_BATCH_DAYS
+        self.chunk_size = chunk_size
+        self._counters = {
+            'runs': 0,
+            'rows_upserted': 0,
+            'periods_recomputed': 0
+        }
+        self._last_run: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    def _get_watermark(self) -> Optional[datetime]:
+        success, result = self.db.execute_query(
+            "SELECT high_water_mark FROM rollup_watermarks WHERE job_name = %s", (JOB_NAME,), fetch=True
+        )
+        return result[0]['high_water_mark'] if success and result else None
+    
+    def _set_watermark(self, mark: datetime) -> None:
+        self.db.execute_query(
+            "INSERT INTO rollup_watermarks (job_name, high_water_mark) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE high_water_mark = GREATEST(COALESCE(high_water_mark, VALUES(high_water_mark)), "
+            "VALUES(high_water_mark))",
+            (JOB_NAME, mark)
+        )
+    
+    def _changed_sales(self, since: Optional[datetime]) -> List[Dict[str, Any]]:
+        """(film, format, sale day) combinations with price_history rows changed since the mark"""
+        query = """
+        SELECT ph.film_id, f.format, DATE(ph.sale_date) AS sale_day, MAX(ph.updated_at) AS changed_at
+        FROM price_history ph
+        JOIN films f ON f.id = ph.film_id
+        """
+        params = []
+        if since is not None:
+            # Re-read a little behind the mark: rows committed late can carry an earlier updated_at
+            query += " WHERE ph.updated_at >= %s"
+            params.append(since - timedelta(seconds=Config.MARKET_INSIGHTS_LAG_SECONDS))
+        query += " GROUP BY ph.film_id, f.format, DATE(ph.sale_date)"
+        
+        success, rows = self.db.execute_query(query, params, fetch=True)
+        if not success:
+            raise RuntimeError('Failed to read changed price history')
+        return rows or []
+    
+    def _film_categories(self, film_ids: List[int]) -> Dict[int, List[int]]:
+        categories: Dict[int, List[int]] = {}
+        for chunk in _chunks(sorted(film_ids), self.chunk_size):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            success, rows = self.db.execute_query(
+                f"SELECT film_id, category_id FROM film_category_mappings WHERE film_id IN ({placeholders})",
+                chunk, fetch=True
+            )
+            for row in rows or []:
+                categories.setdefault(row['film_id'], []).append(row['category_id'])
+        return categories
+    
+    def _touched_periods(self, changes: List[Dict[str, Any]],
+                         categories: Dict[int, List[int]]) -> Dict[str, Dict[date, _Touched]]:
+        """Map each period type to the periods (and their scopes) the changes fall in"""
+        today = datetime.utcnow().date()
+        touched: Dict[str, Dict[date, _Touched]] = {period_type: {} for period_type in PERIOD_TYPES}
+        
+        for change in changes:
+            for period_type in PERIOD_TYPES:
+                start = period_bounds(period_type, change['sale_day'])[0]
+                period = touched[period_type].setdefault(start, _Touched())
+                period.films.add(change['film_id'])
+                period.formats.add(change['format'])
+                period.categories.update(categories.get(change['film_id'], []))
+        
+        # The following period's trend compares against a changed one
+        for period_type, periods in touched.items():
+            for start, period in list(periods.items()):
+                following = next_period_start(period_type, start)
+                if following <= today:
+                    periods.setdefault(following, _Touched()).update(period)
+        
+        return touched
+    
+    def _period_runs(self, period_type: str, starts: List[date]) -> Iterable[List[date]]:
+        """
+        Group sorted period starts into runs of consecutive periods read together
+        A run spans at most batch_days (but always holds at least one period)
+        """
+        run: List[date] = []
+        for start in starts:
+            end = period_bounds(period_type, start)[1]
+            if run and (next_period_start(period_type, run[-1]) != start
+                        or (end - run[0]).days >= self.batch_days):
+                yield run
+                run = []
+            run.append(start)
+        if run:
+            yield run
+    
+    def _load_entries(self, period_type: str, low: date, high: date, films: Set[int],
+                      categories: Set[int]) -> List[Tuple[Scope, date, float]]:
+        """Sales in [low, high) as (scope, period_start, price) entries for every scope they count toward"""
+        entries: List[Tuple[Scope, date, float]] = []
+        
+        success, sales = self.db.execute_query(
+            """
+            SELECT ph.film_id, f.format, ph.price, DATE(ph.sale_date) AS sale_day
+            FROM price_history ph
+            JOIN films f ON f.id = ph.film_id
+            WHERE ph.sale_date >= %s AND ph.sale_date < %s
+            """,
+            (low, high), fetch=True
+        )
+        if not success:
+            raise RuntimeError('Failed to read price history')
+        
+        for sale in sales or []:
+            start = period_bounds(period_type, sale['sale_day'])[0]
+            price = float(sale['price'])
+            entries.append((OVERALL_SCOPE, start, price))
+            entries.append(((0, 0, sale['format']), start, price))
+            if sale['film_id'] in films:
+                entries.append(((sale['film_id'], 0, sale['format']), start, price))
+        
+        for chunk in _chunks(sorted(categories), self.chunk_size):
+            placeholders = ', '.join(['%s'] * len(chunk))
+            success, sales = self.db.execute_query(
+                f"""
+                SELECT m.category_id, ph.price, DATE(ph.sale_date) AS sale_day
+                FROM price_history ph
+                JOIN film_category_mappings m ON m.film_id = ph.film_id
+                WHERE m.category_id IN ({placeholders}) AND ph.sale_date >= %s AND ph.sale_date < %s
+                """,
+                list(chunk) + [low, high], fetch=True
+            )
+            if not success:
+                raise RuntimeError('Failed to read category price history')
+            for sale in sales or []:
+                start = period_bounds(period_type, sale['sale_day'])[0]
+                entries.append(((0, sale['category_id'], ALL_FORMATS), start, float(sale['price'])))
+        
+        return entries
+    
+    def _build_rows(self, period_type: str, run: List[date], periods: Dict[date, _Touched],
+                    groups: Dict[Tuple[Scope, date], Dict[str, Any]],
+                    film_formats: Dict[int, str]) -> List[Tuple[Any, ...]]:
+        rows = []
+        for start in run:
+            previous_start = previous_period_start(period_type, start)
+            end = period_bounds(period_type, start)[1]
+            for scope in sorted(periods[start].scopes(film_formats)):
+                stats = groups.get((scope, start))
+                if stats is None:
+                    continue
+                price_trend, trend_percentage, volume_trend = classify_trends(
+                    stats, groups.get((scope, previous_start))
+                )
+                film_id, category_id, scope_format = scope
+                rows.append((
+                    start, end, period_type, film_id or None, category_id or None, scope_format,
+                    stats['total_sales'], round(stats['avg_price'], 2), round(stats['median_price'], 2),
+                    stats['min_price'], stats['max_price'], price_trend, trend_percentage, volume_trend
+                ))
+        return rows
+    
+    def run(self, full: bool = False) -> Dict[str, Any]:
+        """
+        Recompute the insights touched since the last run
+        
+        Args:
+            full: Ignore the high-water mark and recompute every period
+        
+        Returns:
+            Run summary (periods and rows written, elapsed time)
+        """
+        start_time = time.perf_counter()
+        since = None if full else self._get_watermark()
+        changes = self._changed_sales(since)
+        result = {'changes': len(changes), 'periods_recomputed': 0, 'rows_upserted': 0, 'full': full}
+        
+        if changes:
+            film_formats = {change['film_id']: change['format'] for change in changes}
+            categories = self._film_categories(list(film_formats))
+            touched = self._touched_periods(changes, categories)
+            
+            for period_type, periods in touched.items():
+                for run in self._period_runs(period_type, sorted(periods)):
+                    films: Set[int] = set()
+                    run_categories: Set[int] = set()
+                    for start in run:
+                        films |= periods[start].films
+                        run_categories |= periods[start].categories
+                    
+                    # One period earlier than the run so its first period has a trend baseline
+                    low = previous_period_start(period_type, run[0])
+                    high = next_period_start(period_type, run[-1])
+                    groups = summarize(self._load_entries(period_type, low, high, films, run_categories))
+                    rows = self._build_rows(period_type, run, periods, groups, film_formats)
+                    
+                    # Upsert on unique_period_scope, one transaction per run of periods
+                    self.db.bulk_write('market_insights', INSIGHT_COLUMNS, rows,
+                                       update_columns=INSIGHT_COLUMNS[6:],
+                                       on_update='calculated_at = CURRENT_TIMESTAMP',
+                                       chunk_size=self.chunk_size)
+                    
+                    result['periods_recomputed'] += len(run)
+                    result['rows_upserted'] += len(rows)
+            
+            # Only advanced once everything up to it is written
+            self._set_watermark(max(change['changed_at'] for change in changes))
+        
+        result['elapsed_seconds'] = round(time.perf_counter() - start_time, 2)
+        result['finished_at'] = datetime.utcnow().isoformat()
+        with self._lock:
+            self._counters['runs'] += 1
+            self._counters['rows_upserted'] += result['rows_upserted']
+            self._counters['periods_recomputed'] += result['periods_recomputed']
+            self._last_run = result
+        logger.info(f"Market insights rollup: {result['rows_upserted']} rows for "
+                    f"{result['periods_recomputed']} periods in {result['elapsed_seconds']}s")
+        return result
+    
+    def run_once(self, full: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Run the rollup unless another process is already running it
+        
+        Returns:
+            Run summary, or None when another process holds the lock
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (ROLLUP_LOCK_NAME,))
+                if not cursor.fetchone()[0]:
+                    return None
+                try:
+                    return self.run(full=full)
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (ROLLUP_LOCK_NAME,))
+                    cursor.fetchone()
+            finally:
+                cursor.close()
+    
+    def start(self, interval: Optional[float] = None) -> None:
+        """Run the rollup every interval seconds on a daemon thread"""
+        interval = interval or Config.MARKET_INSIGHTS_INTERVAL
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._loop, args=(interval,),
+                name='market-insights-rollup', daemon=True
+            )
+            self._thread.start()
+        logger.info(f"Market insights rollup every {interval:.0f}s")
+    
+    def stop(self) -> None:
+        """Stop the background rollup"""
+        self._stop.set()
+    
+    def _loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"Market insights rollup error: {str(e)}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get rollup counters and the last run's result"""
+        with self._lock:
+            return {
+                **self._counters,
+                'last_run': self._last_run,
+                'running': bool(self._thread and self._thread.is_alive())
+            }
+
+# Global market insights service instance
+market_insights_service = None
+_market_insights_service_lock = threading.Lock()
+
+def get_market_insights_service() -> MarketInsightsService:
+    """Get market insights service instance"""
+    global market_insights_service
+    if not market_insights_service:
+        with _market_insights_service_lock:
+            if not market_insights_service:
+                market_insights_service = MarketInsightsService()
+    return market_insights_service
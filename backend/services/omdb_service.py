@@ -11,6 +11,8 @@ from typing import Dict, List, Optional, Any
 import logging
 
 from config.config import Config
+from utils.http_client import get_http_client
+from utils.token_bucket import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -29,9 +31,12 @@ class OmdbService:
         self.requests_made_today = 0
         self.last_reset_date = datetime.utcnow().date()
         
-        # Request timing
-        self.last_request_time = 0
-        self.min_request_interval = 0.1  # 100ms between requests
+        # Request timing (100ms between requests, shared by every worker)
+        self.min_request_interval = 0.1
+        self.rate_limiter = get_rate_limiter('omdb', rate=1 / self.min_request_interval, capacity=1)
+        
+        # Shared pooled transport
+        self.http = get_http_client()
         
         # Validate configuration
         self._validate_config()
@@ -62,14 +67,8 @@ class OmdbService:
             raise Exception(f"OMDb daily limit of {self.daily_limit} requests exceeded")
         
         # Apply timing limit
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            time.sleep(sleep_time)
+        self.rate_limiter.acquire_or_raise()
         
-        self.last_request_time = time.time()
         self.requests_made_today += 1
     
     def _make_api_request(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -87,7 +86,7 @@ class OmdbService:
             api_params['r'] = self.response_format
             
             # Make request
-            response = requests.get(self.base_url, params=api_params, timeout=10)
+            response = self.http.get(self.base_url, params=api_params)
             
             # Log request for debugging
             logger.info(f"OMDb API request: {response.url}")
@@ -377,7 +376,7 @@ class OmdbService:
             if not poster_url or poster_url == 'N/A':
                 return False
             
-            response = requests.get(poster_url, timeout=30)
+            response = self.http.get(poster_url, timeout=30)
             response.raise_for_status()
             
             with open(save_path, 'wb') as f:
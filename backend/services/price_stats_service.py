@@ -0,0 +1,362 @@
+# backend/services/price_stats_service.py
+"""
+Per-film price statistics
+Maintains the film_price_stats summary table so read endpoints look up one
+row per film instead of aggregating price_history on every request.
+
+- New sales are folded in with one set-based upsert inside the ingestion
+  transaction (counts and sums add, min/max/dates widen)
+- Films whose stored sales were changed in place are recomputed exactly
+- The 30/90/365-day windows decay with time, so a periodic job recomputes
+  them; between runs they can include sales that have just aged out
+- rebuild() recomputes everything from price_history in film id chunks
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+import logging
+
+from config.config import Config
+from services.database_service import get_db
+
+logger = logging.getLogger(__name__)
+
+# Rolling windows kept per film (days)
+WINDOWS = (30, 90, 365)
+
+# Columns written by both the incremental upsert and the exact recompute, in order
+STATS_COLUMNS = (
+    'film_id', 'sale_count', 'price_sum', 'min_price', 'max_price',
+    'first_sale_date', 'last_sale_date', 'last_price',
+    'sales_30d', 'price_sum_30d', 'sales_90d', 'price_sum_90d', 'min_price_90d', 'max_price_90d',
+    'sales_365d', 'price_sum_365d'
+)
+WINDOW_COLUMNS = STATS_COLUMNS[STATS_COLUMNS.index('sales_30d'):]
+
+# How each column combines with the stored row when new sales are added
+_ADDITIVE = ('sale_count', 'price_sum', 'sales_30d', 'price_sum_30d', 'sales_90d', 'price_sum_90d',
+             'sales_365d', 'price_sum_365d')
+_LOWEST = ('min_price', 'first_sale_date', 'min_price_90d')
+_HIGHEST = ('max_price', 'max_price_90d')
+
+# MySQL named lock so only one process runs the window refresh at a time
+REFRESH_LOCK_NAME = 'film_price_stats_refresh'
+
+def _window_cutoffs(now: Optional[datetime] = None) -> Dict[int, datetime]:
+    """Start of each rolling window (naive UTC, like price_history.sale_date)"""
+    now = now or datetime.utcnow()
+    return {days: now - timedelta(days=days) for days in WINDOWS}
+
+def _chunks(values: List[Any], size: int) -> Iterable[List[Any]]:
+    """Split a list into consecutive chunks of at most size values"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+class PriceStatsService:
+    """Incremental and bulk maintenance of film_price_stats"""
+    
+    def __init__(self, db=None, chunk_size: Optional[int] = None):
+        self.db = db or get_db()
+        self.chunk_size = chunk_size or Config.PRICE_STATS_CHUNK_SIZE
+        self._counters = {
+            'sales_applied': 0,
+            'films_recomputed': 0,
+            'window_refreshes': 0,
+            'rebuilds': 0
+        }
+        self._last_window_refresh: Optional[Dict[str, Any]] = None
+        self._last_rebuild: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+    
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
+    
+    def apply_new_sales(self, cursor, sales: List[Tuple[int, float, Optional[datetime]]]) -> int:
+        """
+        Fold newly inserted sales into their films' stats
+        
+        Args:
+            cursor: Cursor of the transaction that inserted the sales
+            sales: (film_id, price, sale_date) for each new price_history row
+        
+        Returns:
+            Number of films updated
+        """
+        if not sales:
+            return 0
+        
+        cutoffs = _window_cutoffs()
+        per_film: Dict[int, Dict[str, Any]] = {}
+        
+        for film_id, price, sale_date in sales:
+            stats = per_film.get(film_id)
+            if stats is None:
+                stats = dict.fromkeys(STATS_COLUMNS)
+                stats.update({column: 0 for column in _ADDITIVE})
+                stats['film_id'] = film_id
+                per_film[film_id] = stats
+            
+            stats['sale_count'] += 1
+            stats['price_sum'] += price
+            stats['min_price'] = price if stats['min_price'] is None else min(stats['min_price'], price)
+            stats['max_price'] = price if stats['max_price'] is None else max(stats['max_price'], price)
+            if sale_date is None:
+                continue
+            
+            if stats['first_sale_date'] is None or sale_date < stats['first_sale_date']:
+                stats['first_sale_date'] = sale_date
+            if stats['last_sale_date'] is None or sale_date >= stats['last_sale_date']:
+                stats['last_sale_date'] = sale_date
+                stats['last_price'] = price
+            
+            for days, cutoff in cutoffs.items():
+                if sale_date >= cutoff:
+                    stats[f'sales_{days}d'] += 1
+                    stats[f'price_sum_{days}d'] += price
+            if sale_date >= cutoffs[90]:
+                stats['min_price_90d'] = price if stats['min_price_90d'] is None else min(stats['min_price_90d'], price)
+                stats['max_price_90d'] = price if stats['max_price_90d'] is None else max(stats['max_price_90d'], price)
+        
+        # Film id order keeps row locks in the same order across concurrent workers
+        rows = [tuple(per_film[film_id][column] for column in STATS_COLUMNS) for film_id in sorted(per_film)]
+        cursor.execute(self._build_increment_query(len(rows)), [value for row in rows for value in row])
+        
+        self._count('sales_applied', len(sales))
+        return len(rows)
+    
+    @staticmethod
+    def _build_increment_query(row_count: int) -> str:
+        """Multi-row upsert that adds a batch's per-film aggregates to the stored ones"""
+        updates = []
+        for column in _ADDITIVE:
+            updates.append(f"{column} = {column} + VALUES({column})")
+        for column in _LOWEST:
+            updates.append(f"{column} = LEAST(COALESCE({column}, VALUES({column})), COALESCE(VALUES({column}), {column}))")
+        for column in _HIGHEST:
+            updates.append(f"{column} = GREATEST(COALESCE({column}, VALUES({column})), COALESCE(VALUES({column}), {column}))")
+        # last_price must be assigned before last_sale_date moves
+        updates.append(
+            "last_price = IF(VALUES(last_sale_date) IS NOT NULL "
+            "AND (last_sale_date IS NULL OR VALUES(last_sale_date) >= last_sale_date), "
+            "VALUES(last_price), last_price)"
+        )
+        updates.append(
+            "last_sale_date = GREATEST(COALESCE(last_sale_date, VALUES(last_sale_date)), "
+            "COALESCE(VALUES(last_sale_date), last_sale_date))"
+        )
+        
+        row_placeholder = '(' + ', '.join(['%s'] * len(STATS_COLUMNS)) + ')'
+        return (
+            f"INSERT INTO film_price_stats ({', '.join(STATS_COLUMNS)}) "
+            f"VALUES {', '.join([row_placeholder] * row_count)} "
+            f"ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+        )
+    
+    @staticmethod
+    def _aggregate_query(where: str, update_columns: Tuple[str, ...] = STATS_COLUMNS[1:]) -> str:
+        """
+        INSERT ... SELECT recomputing the stats of the films matched by where
+        Stored rows only have update_columns overwritten
+        """
+        assignments = ', '.join(f"{column} = VALUES({column})" for column in update_columns)
+        return f"""
+        INSERT INTO film_price_stats ({', '.join(STATS_COLUMNS)})
+        SELECT film_id,
+               COUNT(*),
+               SUM(price),
+               MIN(price),
+               MAX(price),
+               MIN(sale_date),
+               MAX(sale_date),
+               CAST(SUBSTRING_INDEX(GROUP_CONCAT(price ORDER BY sale_date DESC, id DESC), ',', 1) AS DECIMAL(10,2)),
+               SUM(sale_date >= %(cutoff_30)s),
+               COALESCE(SUM(IF(sale_date >= %(cutoff_30)s, price, 0)), 0),
+               SUM(sale_date >= %(cutoff_90)s),
+               COALESCE(SUM(IF(sale_date >= %(cutoff_90)s, price, 0)), 0),
+               MIN(IF(sale_date >= %(cutoff_90)s, price, NULL)),
+               MAX(IF(sale_date >= %(cutoff_90)s, price, NULL)),
+               SUM(sale_date >= %(cutoff_365)s),
+               COALESCE(SUM(IF(sale_date >= %(cutoff_365)s, price, 0)), 0)
+        FROM price_history
+        WHERE {where}
+        GROUP BY film_id
+        ON DUPLICATE KEY UPDATE {assignments}, windows_refreshed_at = UTC_TIMESTAMP()
+        """
+    
+    @staticmethod
+    def _cutoff_params() -> Dict[str, datetime]:
+        return {f'cutoff_{days}': cutoff for days, cutoff in _window_cutoffs().items()}
+    
+    def recompute_films(self, cursor, film_ids: Iterable[int]) -> int:
+        """
+        Recompute stats exactly for a few films (e.g. after sales were updated in place)
+        Runs on the caller's cursor so it commits with the change that caused it
+        """
+        film_ids = sorted(set(film_ids))
+        for chunk in _chunks(film_ids, self.chunk_size):
+            params = self._cutoff_params()
+            params.update({f'film_{i}': film_id for i, film_id in enumerate(chunk)})
+            in_list = ', '.join(f'%(film_{i})s' for i in range(len(chunk)))
+            
+            cursor.execute(self._aggregate_query(f"film_id IN ({in_list})"), params)
+            # Films left without any sales drop out of the table
+            cursor.execute(
+                f"DELETE FROM film_price_stats WHERE film_id IN ({in_list}) "
+                f"AND NOT EXISTS (SELECT 1 FROM price_history ph WHERE ph.film_id = film_price_stats.film_id)",
+                params
+            )
+        
+        self._count('films_recomputed', len(film_ids))
+        return len(film_ids)
+    
+    def rebuild(self) -> Dict[str, Any]:
+        """
+        Recompute the whole table from price_history
+        Works through film id ranges, one short transaction each, so readers
+        and ingestion are never blocked behind a single long statement
+        """
+        start_time = time.perf_counter()
+        success, bounds = self.db.execute_query(
+            "SELECT MIN(id) AS min_id, MAX(id) AS max_id FROM films", fetch=True
+        )
+        if not success or not bounds or bounds[0]['min_id'] is None:
+            return {'films_processed': 0, 'chunks': 0, 'elapsed_seconds': 0.0}
+        
+        min_id, max_id = bounds[0]['min_id'], bounds[0]['max_id']
+        chunks = 0
+        for low in range(min_id, max_id + 1, self.chunk_size):
+            params = self._cutoff_params()
+            params.update({'low': low, 'high': low + self.chunk_size - 1})
+            with self.db.transaction() as cursor:
+                cursor.execute(self._aggregate_query("film_id BETWEEN %(low)s AND %(high)s"), params)
+                cursor.execute(
+                    "DELETE FROM film_price_stats WHERE film_id BETWEEN %(low)s AND %(high)s "
+                    "AND NOT EXISTS (SELECT 1 FROM price_history ph WHERE ph.film_id = film_price_stats.film_id)",
+                    params
+                )
+            chunks += 1
+        
+        result = {
+            'films_processed': max_id - min_id + 1,
+            'chunks': chunks,
+            'elapsed_seconds': round(time.perf_counter() - start_time, 2),
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._counters['rebuilds'] += 1
+            self._last_rebuild = result
+        logger.info(f"Rebuilt film_price_stats for ids {min_id}-{max_id} in {result['elapsed_seconds']}s")
+        return result
+    
+    def refresh_windows(self) -> Dict[str, Any]:
+        """
+        Recompute the 30/90/365-day windows so sales that aged out stop counting
+        Only films with a sale in the last year (or stale non-zero windows) are touched
+        """
+        start_time = time.perf_counter()
+        success, candidates = self.db.execute_query(
+            "SELECT film_id FROM film_price_stats WHERE sales_365d > 0 OR last_sale_date >= %s",
+            (_window_cutoffs()[365],), fetch=True
+        )
+        film_ids = [row['film_id'] for row in candidates] if success and candidates else []
+        
+        for chunk in _chunks(sorted(film_ids), self.chunk_size):
+            params = self._cutoff_params()
+            params.update({f'film_{i}': film_id for i, film_id in enumerate(chunk)})
+            in_list = ', '.join(f'%(film_{i})s' for i in range(len(chunk)))
+            resets = ', '.join(f"{column} = {'NULL' if column in _LOWEST + _HIGHEST else '0'}"
+                               for column in WINDOW_COLUMNS)
+            
+            # One transaction per chunk: readers never see the zeroed intermediate state
+            with self.db.transaction() as cursor:
+                cursor.execute(f"UPDATE film_price_stats SET {resets} WHERE film_id IN ({in_list})", params)
+                # Only the window columns change; all-time stats are already exact
+                cursor.execute(self._aggregate_query(
+                    f"film_id IN ({in_list}) AND sale_date >= %(cutoff_365)s", WINDOW_COLUMNS
+                ), params)
+        
+        result = {
+            'films_refreshed': len(film_ids),
+            'elapsed_seconds': round(time.perf_counter() - start_time, 2),
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._counters['window_refreshes'] += 1
+            self._last_window_refresh = result
+        logger.info(f"Refreshed price windows for {len(film_ids)} films in {result['elapsed_seconds']}s")
+        return result
+    
+    def start_window_refresh(self, interval: Optional[float] = None) -> None:
+        """Refresh the windows every interval seconds on a daemon thread"""
+        interval = interval or Config.PRICE_STATS_WINDOW_REFRESH_INTERVAL
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._stop.clear()
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, args=(interval,),
+                name='price-stats-refresh', daemon=True
+            )
+            self._refresh_thread.start()
+        logger.info(f"Price stats window refresh every {interval:.0f}s")
+    
+    def stop_window_refresh(self) -> None:
+        """Stop the background refresh"""
+        self._stop.set()
+    
+    def _refresh_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.refresh_windows_once()
+            except Exception as e:
+                logger.error(f"Price stats window refresh error: {str(e)}")
+    
+    def refresh_windows_once(self) -> Optional[Dict[str, Any]]:
+        """
+        Refresh the windows unless another process is already doing it
+        Every web worker runs the loop; the MySQL named lock lets one of them work
+        
+        Returns:
+            Refresh result, or None when another process holds the lock
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (REFRESH_LOCK_NAME,))
+                if not cursor.fetchone()[0]:
+                    return None
+                try:
+                    return self.refresh_windows()
+                finally:
+                    cursor.execute("SELECT RELEASE_LOCK(%s)", (REFRESH_LOCK_NAME,))
+                    cursor.fetchone()
+            finally:
+                cursor.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get maintenance counters and the last refresh/rebuild results"""
+        with self._lock:
+            return {
+                **self._counters,
+                'last_window_refresh': self._last_window_refresh,
+                'last_rebuild': self._last_rebuild,
+                'window_refresh_running': bool(self._refresh_thread and self._refresh_thread.is_alive())
+            }
+
+# Global price stats service instance
+price_stats_service = None
+_price_stats_service_lock = threading.Lock()
+
+def get_price_stats_service() -> PriceStatsService:
+    """Get price stats service instance"""
+    global price_stats_service
+    if not price_stats_service:
+        with _price_stats_service_lock:
+            if not price_stats_service:
+                price_stats_service = PriceStatsService()
+    return price_stats_service
@@ -12,6 +12,8 @@ from typing import Dict, List, Optional, Any
 import logging
 
 from config.config import Config
+from utils.http_client import get_http_client
+from utils.token_bucket import get_rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -26,10 +28,17 @@ class TmdbService:
         self.language = Config.TMDB_LANGUAGE
         self.image_quality = Config.TMDB_IMAGE_QUALITY
         
-        # Rate limiting (40 requests per 10 seconds for free accounts)
+        # Rate limiting (40 requests per 10 seconds for free accounts, shared by every worker)
         self.max_requests_per_window = 40
         self.window_duration = 10  # seconds
-        self.request_timestamps = []
+        self.rate_limiter = get_rate_limiter(
+            'tmdb',
+            rate=self.max_requests_per_window / self.window_duration,
+            capacity=self.max_requests_per_window
+        )
+        
+        # Shared pooled transport
+        self.http = get_http_client()
         
         # Image configuration cache
         self._image_config = None
@@ -47,23 +56,7 @@ class TmdbService:
     
     def _rate_limit(self):
         """Apply rate limiting for TMDb API (40 requests per 10 seconds)"""
-        current_time = time.time()
-        
-        # Remove timestamps older than window duration
-        self.request_timestamps = [
-            ts for ts in self.request_timestamps 
-            if current_time - ts < self.window_duration
-        ]
-        
-        # Check if we're at the limit
-        if len(self.request_timestamps) >= self.max_requests_per_window:
-            sleep_time = self.window_duration - (current_time - self.request_timestamps[0])
-            if sleep_time > 0:
-                logger.info(f"Rate limit reached, sleeping for {sleep_time:.2f} seconds")
-                time.sleep(sleep_time)
-        
-        # Add current request timestamp
-        self.request_timestamps.append(current_time)
+        self.rate_limiter.acquire_or_raise()
     
     def _make_api_request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
@@ -89,7 +82,7 @@ class TmdbService:
             url = f"{self.base_url.rstrip('/')}/{endpoint.lstrip('/')}"
             
             # Make request
-            response = requests.get(url, headers=headers, params=api_params, timeout=10)
+            response = self.http.get(url, headers=headers, params=api_params)
             
             # Log request for debugging
             logger.info(f"TMDb API request: {response.url}")
@@ -500,7 +493,7 @@ class TmdbService:
             if not image_url:
                 return False
             
-            response = requests.get(image_url, timeout=30)
+            response = self.http.get(image_url, timeout=30)
             response.raise_for_status()
             
             # Create directory if it doesn't exist
@@ -531,17 +524,13 @@ class TmdbService:
     
     def get_api_usage(self) -> Dict[str, Any]:
         """Get current API usage statistics"""
-        current_time = time.time()
-        recent_requests = [
-            ts for ts in self.request_timestamps 
-            if current_time - ts < self.window_duration
-        ]
+        requests_remaining = int(self.rate_limiter.available())
         
         return {
             'max_requests_per_window': self.max_requests_per_window,
             'window_duration_seconds': self.window_duration,
-            'requests_in_current_window': len(recent_requests),
-            'requests_remaining': self.max_requests_per_window - len(recent_requests),
+            'requests_in_current_window': self.max_requests_per_window - requests_remaining,
+            'requests_remaining': requests_remaining,
             'api_version': self.api_version,
             'language': self.language
         }
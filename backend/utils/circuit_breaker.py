@@ -0,0 +1,181 @@
+# backend/utils/circuit_breaker.py
+"""
+Per-upstream circuit breakers
+Stops request threads from queueing behind a failing or very slow upstream:
+after too many errors or slow calls in the rolling window the breaker opens
+and calls fail fast until a cool-down passes, then a few half-open probes
+decide whether to close it again
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+import logging
+
+import requests
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of calling an upstream whose breaker is open"""
+    
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit for {name} is open, retry in {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Error-rate and slow-call breaker over a rolling time window"""
+    
+    def __init__(self, name: str, window_seconds: Optional[float] = None,
+                 min_calls: Optional[int] = None, error_threshold: Optional[float] = None,
+                 slow_call_seconds: Optional[float] = None, slow_call_threshold: Optional[float] = None,
+                 open_seconds: Optional[float] = None, half_open_probes: Optional[int] = None):
+        self.name = name
+        self.window_seconds = window_seconds or Config.CIRCUIT_WINDOW_SECONDS
+        self.min_calls = min_calls or Config.CIRCUIT_MIN_CALLS
+        self.error_threshold = error_threshold or Config.CIRCUIT_ERROR_THRESHOLD
+        self.slow_call_seconds = slow_call_seconds or Config.CIRCUIT_SLOW_CALL_SECONDS
+        self.slow_call_threshold = slow_call_threshold or Config.CIRCUIT_SLOW_CALL_THRESHOLD
+        self.open_seconds = open_seconds or Config.CIRCUIT_OPEN_SECONDS
+        self.half_open_probes = half_open_probes or Config.CIRCUIT_HALF_OPEN_PROBES
+        
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        # (timestamp, ok, slow) per finished call
+        self._calls = deque()
+        self._counters = {'calls': 0, 'failures': 0, 'slow_calls': 0, 'rejected': 0, 'trips': 0}
+        self._lock = threading.Lock()
+    
+    def _prune(self, now: float) -> None:
+        """Drop outcomes older than the rolling window"""
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+    
+    def _trip(self, now: float, reason: str) -> None:
+        """Open the breaker"""
+        self.state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._counters['trips'] += 1
+        logger.warning(f"Circuit for {self.name} opened: {reason}")
+    
+    def allow(self) -> None:
+        """
+        Admit a call or raise CircuitOpenError
+        Callers that are admitted must report the outcome with record()
+        """
+        with self._lock:
+            now = time.monotonic()
+            
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self._counters['rejected'] += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+                logger.info(f"Circuit for {self.name} half-open, probing")
+            
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self._counters['rejected'] += 1
+                    raise CircuitOpenError(self.name, 0)
+                self._probes_in_flight += 1
+    
+    def record(self, ok: bool, elapsed: float) -> None:
+        """Record the outcome of an admitted call"""
+        with self._lock:
+            now = time.monotonic()
+            slow = elapsed >= self.slow_call_seconds
+            self._counters['calls'] += 1
+            if not ok:
+                self._counters['failures'] += 1
+            if slow:
+                self._counters['slow_calls'] += 1
+            
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if not ok or slow:
+                    self._trip(now, 'half-open probe failed')
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info(f"Circuit for {self.name} closed")
+                return
+            
+            if self.state == OPEN:
+                # A call admitted before the trip finished late; it says nothing new
+                return
+            
+            self._calls.append((now, ok, slow))
+            self._prune(now)
+            
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            
+            failures = sum(1 for _, call_ok, _ in self._calls if not call_ok)
+            slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+            if failures / total >= self.error_threshold:
+                self._trip(now, f"{failures}/{total} calls failed in {self.window_seconds:.0f}s")
+            elif slow_calls / total >= self.slow_call_threshold:
+                self._trip(now, f"{slow_calls}/{total} calls slower than {self.slow_call_seconds}s")
+    
+    def is_closed(self) -> bool:
+        """Whether calls are flowing normally"""
+        return self.state == CLOSED
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            total = len(self._calls)
+            failures = sum(1 for _, ok, _ in self._calls if not ok)
+            slow_calls = sum(1 for _, _, slow in self._calls if slow)
+            
+            return {
+                'state': self.state,
+                'window_calls': total,
+                'window_error_rate': round(failures / total, 3) if total else 0.0,
+                'window_slow_rate': round(slow_calls / total, 3) if total else 0.0,
+                'retry_after_seconds': round(max(self._opened_at + self.open_seconds - now, 0), 1)
+                                       if self.state == OPEN else 0,
+                **self._counters
+            }
+
+# Breakers are keyed by upstream (scheme://host) and shared process-wide
+circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Get (or create) the breaker for an upstream"""
+    breaker = circuit_breakers.get(name)
+    if breaker is None:
+        with _circuit_breakers_lock:
+            breaker = circuit_breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name)
+                circuit_breakers[name] = breaker
+    return breaker
+
+def get_circuit_breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Get state for every breaker, for the admin status endpoint"""
+    with _circuit_breakers_lock:
+        breakers = list(circuit_breakers.items())
+    return {name: breaker.get_stats() for name, breaker in breakers}
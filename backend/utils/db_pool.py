@@ -0,0 +1,216 @@
+# backend/utils/db_pool.py
+"""
+Bounded MySQL connection pool
+Keeps up to pool_size connections open for reuse and allows max_overflow
+more under bursts. Once every connection is checked out, callers wait up to
+the acquire timeout for one to come back instead of opening ad-hoc
+connections. Connections older than the recycle age are replaced, and idle
+ones are pinged before being handed out so a connection the server has
+dropped never reaches a query.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(PoolError):
+    """No connection came free within the pool's acquire timeout"""
+
+def _close_quietly(connection: Any) -> None:
+    try:
+        connection.close()
+    except Exception:
+        pass
+
+class ConnectionPool:
+    """Thread-safe pool with a hard connection cap, bounded waits and checkout telemetry"""
+    
+    def __init__(self, connect: Callable[[], Any], pool_size: int, max_overflow: int = 0,
+                 timeout: float = 10.0, recycle: int = 1800, pre_ping: bool = True,
+                 session_variables: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            connect: Opens a new connection
+            pool_size: Connections kept open between uses
+            max_overflow: Extra connections allowed while all pooled ones are busy;
+                closed when returned
+            timeout: Seconds to wait for a free connection before PoolTimeoutError
+            recycle: Replace connections older than this many seconds (0 disables)
+            pre_ping: Ping idle connections before handing them out
+            session_variables: Re-applied after each session reset on return
+        """
+        self._connect = connect
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self.session_variables = session_variables or {}
+        
+        # Idle connections as (connection, opened at); the newest are reused first
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._opened_at: Dict[int, float] = {}  # Checked-out connections by id()
+        self._in_use = 0
+        self._condition = threading.Condition()
+        
+        self._stats = {
+            'acquisitions': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'connections_opened': 0,
+            'recycled': 0,
+            'ping_failures': 0,
+            'discarded': 0,
+            'peak_in_use': 0,
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0
+        }
+    
+    @property
+    def max_connections(self) -> int:
+        return self.pool_size + self.max_overflow
+    
+    def acquire(self) -> Any:
+        """
+        Check out a connection, waiting up to the timeout for one to be released
+        
+        Raises:
+            PoolTimeoutError: Every connection stayed in use for the whole timeout
+            Error: A new connection could not be opened
+        """
+        start_time = time.monotonic()
+        deadline = start_time + self.timeout
+        waited = False
+        
+        with self._condition:
+            while True:
+                if self._idle:
+                    connection, opened_at = self._idle.pop()
+                    break
+                if self._in_use < self.max_connections:
+                    connection, opened_at = None, None
+                    break
+                if not waited:
+                    # Pool exhausted: count it once per caller, then wait for a release
+                    waited = True
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeoutError(
+                        f"No database connection free within {self.timeout}s "
+                        f"({self._in_use} of {self.max_connections} in use)"
+                    )
+                self._condition.wait(remaining)
+            
+            self._in_use += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._in_use)
+        
+        try:
+            connection, opened_at = self._checkout(connection, opened_at)
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        
+        wait_ms = (time.monotonic() - start_time) * 1000
+        with self._condition:
+            self._opened_at[id(connection)] = opened_at
+            self._stats['acquisitions'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+        return connection
+    
+    def _checkout(self, connection: Any, opened_at: Optional[float]) -> Tuple[Any, float]:
+        """Validate an idle connection (recycle age, pre-ping) or open a new one"""
+        if connection is not None:
+            if self.recycle and time.monotonic() - opened_at > self.recycle:
+                self._count('recycled')
+                _close_quietly(connection)
+                connection = None
+            elif self.pre_ping:
+                try:
+                    connection.ping(reconnect=False)
+                except Error as e:
+                    logger.warning(f"Discarding dead pooled connection: {e}")
+                    self._count('ping_failures')
+                    _close_quietly(connection)
+                    connection = None
+        
+        if connection is None:
+            connection = self._connect()
+            opened_at = time.monotonic()
+            self._count('connections_opened')
+        return connection, opened_at
+    
+    def release(self, connection: Any) -> None:
+        """
+        Return a connection to the pool
+        Its session is reset first; overflow and broken connections are closed
+        """
+        keep = True
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+            connection.reset_session(session_variables=self.session_variables)
+        except Error as e:
+            logger.warning(f"Discarding pooled connection that failed to reset: {e}")
+            keep = False
+        
+        with self._condition:
+            opened_at = self._opened_at.pop(id(connection), time.monotonic())
+            self._in_use -= 1
+            if keep and self._in_use + len(self._idle) < self.pool_size:
+                self._idle.append((connection, opened_at))
+                connection = None
+            elif not keep:
+                self._stats['discarded'] += 1
+            self._condition.notify()
+        
+        if connection is not None:
+            _close_quietly(connection)
+    
+    def close(self) -> None:
+        """Close every idle connection; checked-out ones close when released"""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _ in idle:
+            _close_quietly(connection)
+    
+    def _count(self, name: str) -> None:
+        with self._condition:
+            self._stats[name] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool size, current use and cumulative checkout/wait counters"""
+        with self._condition:
+            stats = dict(self._stats)
+            in_use = self._in_use
+            idle = len(self._idle)
+        
+        acquisitions = stats.pop('acquisitions')
+        total_wait_ms = stats.pop('total_wait_ms')
+        return {
+            'pool_size': self.pool_size,
+            'max_overflow': self.max_overflow,
+            'timeout_seconds': self.timeout,
+            'recycle_seconds': self.recycle,
+            'pre_ping': self.pre_ping,
+            'in_use': in_use,
+            'idle': idle,
+            'acquisitions': acquisitions,
+            'avg_wait_ms': round(total_wait_ms / acquisitions, 2) if acquisitions else 0.0,
+            **stats,
+            'max_wait_ms': round(stats['max_wait_ms'], 2)
+        }
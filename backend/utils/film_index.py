@@ -0,0 +1,158 @@
+# backend/utils/film_index.py
+"""
+In-memory film lookup index
+Maps a normalized (title, format) key to its films.id so ingestion and
+find_or_create_by_title_format skip the films query for known films
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+import logging
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+class FilmIndex:
+    """
+    Bounded LRU map of (title, format) -> film id
+    
+    Keys are lowercased to match the films table's case-insensitive
+    collation. Only committed ids belong in the index: callers add a film
+    after the transaction that created it commits and invalidate a key
+    whenever the id it maps to turns out to be stale.
+    """
+    
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or Config.FILM_INDEX_MAX_ENTRIES
+        
+        self._entries: 'OrderedDict[Tuple[str, str], int]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'warmed': 0
+        }
+    
+    @staticmethod
+    def key(title: str, format: str) -> Tuple[str, str]:
+        """Index key for an already-normalized (title, format) pair"""
+        return (title or '').lower(), (format or '').lower()
+    
+    def get(self, title: str, format: str) -> Optional[int]:
+        """Get the film id for a normalized (title, format), or None if unknown"""
+        key = self.key(title, format)
+        with self._lock:
+            film_id = self._entries.get(key)
+            if film_id is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return film_id
+    
+    def get_many(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+        """Look up many normalized keys at once, returning index key -> film id for the hits"""
+        found = {}
+        with self._lock:
+            for title, format in keys:
+                key = self.key(title, format)
+                film_id = self._entries.get(key)
+                if film_id is None:
+                    self._stats['misses'] += 1
+                    continue
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                found[key] = film_id
+        return found
+    
+    def put(self, title: str, format: str, film_id: int):
+        """Record a committed film (replaces any previous id for the key)"""
+        with self._lock:
+            self._store(self.key(title, format), film_id)
+    
+    def put_many(self, film_ids: Dict[Tuple[str, str], int]):
+        """Record many committed films keyed by index key"""
+        with self._lock:
+            for key, film_id in film_ids.items():
+                self._store(key, film_id)
+    
+    def invalidate(self, title: str, format: str) -> bool:
+        """Drop a key, e.g. after its film was deleted or merged"""
+        with self._lock:
+            if self._entries.pop(self.key(title, format), None) is None:
+                return False
+            self._stats['invalidations'] += 1
+            return True
+    
+    def clear(self) -> int:
+        """Drop every entry, returning how many were removed"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+    
+    def warm(self, db) -> int:
+        """
+        Load the most recent films from the films table
+        
+        Args:
+            db: DatabaseService used to run the query
+        
+        Returns:
+            Number of films loaded
+        """
+        success, rows = db.execute_query(
+            "SELECT id, title, format FROM films ORDER BY id DESC LIMIT %s",
+            (self.max_entries,), fetch=True
+        )
+        if not success:
+            logger.warning(f"Could not warm film index: {rows}")
+            return 0
+        
+        with self._lock:
+            # Oldest first so the newest films end up most recently used
+            for row in reversed(rows):
+                key = self.key(row['title'], row['format'])
+                if key not in self._entries:
+                    self._store(key, row['id'])
+            self._stats['warmed'] = len(rows)
+        
+        logger.info(f"Warmed film index with {len(rows)} films")
+        return len(rows)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        return stats
+    
+    def _store(self, key: Tuple[str, str], film_id: int):
+        """Insert or refresh a key and evict down to max_entries (lock held)"""
+        self._entries[key] = film_id
+        self._entries.move_to_end(key)
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+# Global film index shared by every service in the process
+film_index = None
+_film_index_lock = threading.Lock()
+
+def get_film_index() -> FilmIndex:
+    """Get shared film index instance"""
+    global film_index
+    if not film_index:
+        with _film_index_lock:
+            if not film_index:
+                film_index = FilmIndex()
+    return film_index
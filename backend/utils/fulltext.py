@@ -0,0 +1,80 @@
+# backend/utils/fulltext.py
+"""
+MySQL FULLTEXT query building
+Turns user search text into MATCH ... AGAINST clauses for the films FULLTEXT
+indexes. Queries made only of words InnoDB does not index (shorter than
+innodb_ft_min_token_size, or stopwords) cannot use FULLTEXT and fall back to
+an indexed title prefix LIKE.
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from config.config import Config
+
+NATURAL = 'natural'
+BOOLEAN = 'boolean'
+SEARCH_MODES = (NATURAL, BOOLEAN)
+
+# Column lists must match a FULLTEXT index exactly (see data/mysql_schema.sql)
+FILM_SEARCH_COLUMNS = ('title', 'subtitle', 'director')
+FILM_TITLE_COLUMNS = ('title',)
+FILM_DIRECTOR_COLUMNS = ('director',)
+
+# InnoDB's default stopword list (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD).
+# A required (+) stopword makes a boolean search match nothing, so they are dropped.
+INNODB_STOPWORDS = frozenset([
+    'a', 'about', 'an', 'are', 'as', 'at', 'be', 'by', 'com', 'de', 'en', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'la', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'what',
+    'when', 'where', 'who', 'will', 'with', 'und', 'www'
+])
+
+# Letters and digits only: boolean-mode operators in user text are never passed through
+_WORD_PATTERN = re.compile(r"[^\W_]+(?:'[^\W_]+)?", re.UNICODE)
+_YEAR_PATTERN = re.compile(r'^(?:18|19|20)\d{2}$')
+
+def searchable_words(text: Optional[str]) -> List[str]:
+    """Get the words of text that the FULLTEXT index can match"""
+    if not text:
+        return []
+    return [word for word in _WORD_PATTERN.findall(text.lower())
+            if len(word) >= Config.FULLTEXT_MIN_TOKEN_SIZE and word not in INNODB_STOPWORDS]
+
+def is_year(text: Optional[str]) -> bool:
+    """Whether the search text is just a release year"""
+    return bool(text) and bool(_YEAR_PATTERN.match(text.strip()))
+
+def boolean_query(text: str) -> str:
+    """
+    Build a boolean-mode query requiring every word, the last one as a prefix
+    "jurassic par" -> "+jurassic +par*" so partially typed titles still match
+    """
+    words = searchable_words(text)
+    terms = [f'+{word}' for word in words[:-1]]
+    if words:
+        terms.append(f'+{words[-1]}*')
+    return ' '.join(terms)
+
+def match_clause(columns: Tuple[str, ...], text: str, mode: str = BOOLEAN,
+                 alias: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Build a MATCH ... AGAINST expression
+    
+    Args:
+        columns: Columns of one FULLTEXT index, in index order
+        text: User search text
+        mode: natural (ranked, any word) or boolean (every word, prefix on the last)
+        alias: Table alias to qualify the columns with
+    
+    Returns:
+        (SQL expression usable in SELECT and WHERE, parameter for its placeholder)
+    """
+    qualified = ', '.join(f'{alias}.{column}' if alias else column for column in columns)
+    if mode == NATURAL:
+        return f'MATCH({qualified}) AGAINST (%s IN NATURAL LANGUAGE MODE)', ' '.join(searchable_words(text))
+    return f'MATCH({qualified}) AGAINST (%s IN BOOLEAN MODE)', boolean_query(text)
+
+def prefix_pattern(text: str) -> str:
+    """LIKE pattern for the short-query fallback, with wildcards in the text escaped"""
+    escaped = text.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'{escaped}%'
@@ -0,0 +1,252 @@
+# backend/utils/http_client.py
+"""
+Shared HTTP transport for upstream API clients
+Keeps one pooled keep-alive session per upstream host so eBay, TMDb, OMDb
+and GoCollect calls reuse TCP/TLS connections instead of reconnecting.
+Each host sits behind a circuit breaker, and idempotent GETs can be hedged.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlsplit
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config.config import Config
+from utils.circuit_breaker import get_circuit_breaker
+
+logger = logging.getLogger(__name__)
+
+class HttpClient:
+    """Per-host pooled HTTP client with retries, default timeouts, breakers and reuse counters"""
+    
+    def __init__(self, pool_maxsize: Optional[int] = None, max_retries: Optional[int] = None,
+                 backoff_factor: Optional[float] = None,
+                 timeout: Optional[Tuple[float, float]] = None):
+        self.pool_maxsize = pool_maxsize or Config.HTTP_POOL_MAXSIZE
+        self.max_retries = Config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_factor = Config.HTTP_RETRY_BACKOFF if backoff_factor is None else backoff_factor
+        self.timeout = timeout or (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+        
+        # One session (and therefore one connection pool) per scheme://host
+        self._sessions: Dict[str, requests.Session] = {}
+        self._request_counts: Dict[str, int] = {}
+        self._error_counts: Dict[str, int] = {}
+        self._hedge_counts: Dict[str, Dict[str, int]] = {}
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def _build_retry_policy(self) -> Retry:
+        """
+        Retry transient failures with exponential backoff
+        429s are left to the callers, which all have their own quota handling
+        """
+        return Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD', 'OPTIONS']),
+            raise_on_status=False
+        )
+    
+    def _build_session(self) -> requests.Session:
+        """Create a keep-alive session with a bounded connection pool"""
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,  # Each session only ever talks to one host
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self._build_retry_policy()
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        return session
+    
+    @staticmethod
+    def _host_key(url: str) -> str:
+        """Get the scheme://host[:port] key used to select a pool"""
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+    
+    def _session_for(self, url: str) -> Tuple[str, requests.Session]:
+        """Get (or lazily create) the pooled session for a URL's host"""
+        host = self._host_key(url)
+        
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = self._build_session()
+                self._sessions[host] = session
+                self._request_counts[host] = 0
+                self._error_counts[host] = 0
+                logger.info(f"Created pooled HTTP session for {host} (pool size {self.pool_maxsize})")
+            self._request_counts[host] += 1
+        
+        return host, session
+    
+    def _should_hedge(self, method: str, host: str, breaker, hedge: Optional[bool]) -> bool:
+        """Hedge only idempotent GETs to healthy hosts, and only when enabled"""
+        if method != 'GET' or Config.HTTP_HEDGE_DELAY <= 0:
+            return False
+        if breaker is not None and not breaker.is_closed():
+            # A struggling upstream does not need twice the traffic
+            return False
+        if hedge is not None:
+            return hedge
+        return not Config.HTTP_HEDGE_HOSTS or urlsplit(host).hostname in Config.HTTP_HEDGE_HOSTS
+    
+    @staticmethod
+    def _discard_response(future) -> None:
+        """Release the connection held by a hedge that lost the race"""
+        if future.exception() is None:
+            future.result().close()
+    
+    def _hedged_request(self, host: str, session: requests.Session, method: str, url: str,
+                        kwargs: Dict[str, Any]) -> requests.Response:
+        """
+        Send the request, and a duplicate if no answer arrives within HTTP_HEDGE_DELAY
+        The first successful response wins; the slower one is discarded
+        """
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.pool_maxsize * 2,
+                                                          thread_name_prefix='http-hedge')
+            counts = self._hedge_counts.setdefault(host, {'hedged': 0, 'hedge_wins': 0})
+        
+        primary = self._hedge_executor.submit(session.request, method, url, **kwargs)
+        done, _ = wait([primary], timeout=Config.HTTP_HEDGE_DELAY)
+        if done:
+            return primary.result()
+        
+        backup = self._hedge_executor.submit(session.request, method, url, **kwargs)
+        with self._lock:
+            counts['hedged'] += 1
+        
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                
+                if future is backup:
+                    with self._lock:
+                        counts['hedge_wins'] += 1
+                for loser in pending:
+                    loser.add_done_callback(self._discard_response)
+                return future.result()
+        
+        raise error
+    
+    def request(self, method: str, url: str, hedge: Optional[bool] = None, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's pooled session
+        Applies the default (connect, read) timeout unless one is given. Raises
+        CircuitOpenError (a ConnectionError) without calling out when the host's
+        breaker is open. hedge forces hedging on or off for this GET.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        breaker = get_circuit_breaker(self._host_key(url)) if Config.CIRCUIT_BREAKER_ENABLED else None
+        if breaker is not None:
+            breaker.allow()
+        
+        host, session = self._session_for(url)
+        start = time.monotonic()
+        
+        try:
+            if self._should_hedge(method, host, breaker, hedge):
+                response = self._hedged_request(host, session, method, url, kwargs)
+            else:
+                response = session.request(method, url, **kwargs)
+        except Exception as e:
+            if breaker is not None:
+                breaker.record(False, time.monotonic() - start)
+            if isinstance(e, requests.exceptions.RequestException):
+                with self._lock:
+                    self._error_counts[host] += 1
+            raise
+        
+        if breaker is not None:
+            # 429s are quota answers from a healthy upstream, not failures
+            breaker.record(response.status_code < 500, time.monotonic() - start)
+        return response
+    
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request"""
+        return self.request('GET', url, **kwargs)
+    
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request"""
+        return self.request('POST', url, **kwargs)
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get per-host connection reuse counters
+        
+        Returns:
+            Dictionary keyed by host with request, connection and reuse counts
+        """
+        with self._lock:
+            sessions = list(self._sessions.items())
+            request_counts = dict(self._request_counts)
+            error_counts = dict(self._error_counts)
+            hedge_counts = {host: dict(counts) for host, counts in self._hedge_counts.items()}
+        
+        stats = {}
+        for host, session in sessions:
+            pools = session.get_adapter(host).poolmanager.pools
+            
+            # urllib3 counts every connection it opens and every request it sends
+            opened = 0
+            sent = 0
+            for pool_key in pools.keys():
+                pool = pools.get(pool_key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+            reused = max(sent - opened, 0)
+            
+            stats[host] = {
+                'requests': request_counts.get(host, 0),
+                'errors': error_counts.get(host, 0),
+                'connections_opened': opened,
+                'connections_reused': reused,
+                'reuse_ratio': round(reused / sent, 3) if sent else 0.0,
+                'pool_maxsize': self.pool_maxsize,
+                **hedge_counts.get(host, {'hedged': 0, 'hedge_wins': 0})
+            }
+        
+        return stats
+    
+    def close(self) -> None:
+        """Close all pooled sessions"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+
+# Global HTTP client shared by every service in the process
+http_client = None
+_http_client_lock = threading.Lock()
+
+def get_http_client() -> HttpClient:
+    """Get shared HTTP client instance"""
+    global http_client
+    if not http_client:
+        with _http_client_lock:
+            if not http_client:
+                http_client = HttpClient()
+    return http_client
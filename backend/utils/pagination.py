@@ -0,0 +1,138 @@
+# backend/utils/pagination.py
+"""
+Keyset (seek) pagination
+Pages through a query ordered by an indexed key, e.g. (title, id) or
+(sale_date, id), by seeking past the last row of the previous page instead
+of skipping rows with OFFSET, so every page costs the same as the first.
+
+The position is handed to clients as an opaque, signed continuation token
+tied to the listing it came from.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from config.config import Config
+
+# Bytes of HMAC-SHA256 kept in a token; enough to reject tampered or forged ones
+SIGNATURE_BYTES = 12
+
+class InvalidCursorError(ValueError):
+    """A continuation token that is malformed, tampered with or from another listing"""
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(scope: str, payload: str) -> bytes:
+    key = Config.SECRET_KEY.encode('utf-8')
+    return hmac.new(key, f"{scope}\n{payload}".encode('utf-8'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+def _encode_value(value: Any) -> Any:
+    """JSON-safe form of a sort key value, tagged so it decodes to the same type"""
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'dec': str(value)}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return Decimal(value['dec'])
+        raise InvalidCursorError('Unknown cursor value')
+    return value
+
+def encode_cursor(scope: str, values: Sequence[Any]) -> str:
+    """
+    Build a continuation token for the row with the given sort key values
+    
+    Args:
+        scope: Identifies the listing (endpoint, sort and filters); a token
+            is only accepted back for the same scope
+        values: The row's sort key values, in sort order
+    """
+    payload = _b64encode(json.dumps([_encode_value(value) for value in values],
+                                    separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_b64encode(_sign(scope, payload))}"
+
+def decode_cursor(token: str, scope: str) -> List[Any]:
+    """
+    Get the sort key values back out of a continuation token
+    
+    Raises:
+        InvalidCursorError: The token is malformed, altered or from another scope
+    """
+    try:
+        payload, signature = token.split('.')
+        if not hmac.compare_digest(_b64decode(signature), _sign(scope, payload)):
+            raise InvalidCursorError('Cursor does not belong to this listing')
+        values = json.loads(_b64decode(payload))
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError):
+        raise InvalidCursorError('Malformed cursor')
+    
+    if not isinstance(values, list):
+        raise InvalidCursorError('Malformed cursor')
+    return [_decode_value(value) for value in values]
+
+def listing_scope(name: str, **filters: Any) -> str:
+    """Scope string for a listing and the filters that shape it"""
+    return name + ''.join(f"|{key}={filters[key]}" for key in sorted(filters))
+
+def seek_condition(keys: Sequence[Tuple[str, List[Any], bool]],
+                   values: Sequence[Any]) -> Tuple[str, List[Any]]:
+    """
+    WHERE condition selecting the rows after a position in the sort order
+    
+    Args:
+        keys: (SQL expression, its own placeholder params, descending) per sort
+            key, most significant first; the last must be unique (e.g. the id)
+        values: The position's value for each key
+    
+    Returns:
+        (SQL condition, params) - expanded as k1 > v1 OR (k1 = v1 AND k2 > v2) ...
+        which MySQL turns into index ranges, unlike a row constructor comparison
+    """
+    if len(keys) != len(values):
+        raise InvalidCursorError('Cursor does not match the sort order')
+    
+    alternatives = []
+    params: List[Any] = []
+    for position, (expression, expression_params, descending) in enumerate(keys):
+        terms = []
+        for earlier, (equal_expression, equal_params, _) in enumerate(keys[:position]):
+            terms.append(f"{equal_expression} = %s")
+            params.extend(equal_params + [values[earlier]])
+        terms.append(f"{expression} {'<' if descending else '>'} %s")
+        params.extend(expression_params + [values[position]])
+        alternatives.append(' AND '.join(terms))
+    
+    return '(' + ' OR '.join(f'({alternative})' for alternative in alternatives) + ')', params
+
+def keyset_page(rows: List[Dict[str, Any]], limit: int, scope: str,
+                key: Callable[[Dict[str, Any]], Sequence[Any]]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Cut a page from rows fetched with LIMIT limit + 1
+    
+    Returns:
+        (page rows, continuation token for the next page or None on the last page)
+    """
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(scope, key(page[-1]))
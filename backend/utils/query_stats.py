@@ -0,0 +1,243 @@
+# backend/utils/query_stats.py
+"""
+Per-statement query instrumentation for DatabaseService
+Groups statements by a normalized fingerprint (literals and placeholders
+replaced by ?, IN/VALUES lists collapsed) and keeps call counts, a latency
+histogram, rows and pool wait per fingerprint. Statements slower than
+SLOW_QUERY_MS are logged and kept in a short slow-query log, a sample of
+them with their EXPLAIN plan.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in milliseconds; slower calls land in '+Inf'
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Fingerprint under which statements are counted once max_fingerprints is reached
+OVERFLOW_FINGERPRINT = '(other)'
+
+# Sort keys accepted by QueryStats.top
+SORT_KEYS = ('total_ms', 'calls', 'avg_ms', 'max_ms', 'rows', 'pool_wait_ms', 'errors')
+
+# Statements MySQL can EXPLAIN without running them
+_EXPLAINABLE = ('SELECT', 'WITH', '(SELECT', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_COMMENT = re.compile(r'/\*.*?\*/|--[^\n]*|#[^\n]*', re.DOTALL)
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_VALUES_ROWS = re.compile(r'(values\s*\(\?\+\))(?:\s*,\s*\(\?\+\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+def fingerprint(query: str) -> str:
+    """
+    Normalized form of a statement, the same for every call that differs only
+    in values, e.g. "select * from films where id = ? and format in (?+)"
+    """
+    text = _STRING.sub('?', query)
+    text = _COMMENT.sub(' ', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _WHITESPACE.sub(' ', text).strip().lower()
+    text = _VALUE_LIST.sub('(?+)', text)
+    return _VALUES_ROWS.sub(r'\1', text)
+
+def is_explainable(query: str) -> bool:
+    return query.lstrip().upper().startswith(_EXPLAINABLE)
+
+class _Fingerprint:
+    """Counters for one fingerprint"""
+    
+    __slots__ = ('calls', 'errors', 'total_ms', 'max_ms', 'rows', 'pool_wait_ms',
+                 'slow_calls', 'buckets', 'sample', 'last_seen')
+    
+    def __init__(self, sample: str):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.pool_wait_ms = 0.0
+        self.slow_calls = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.sample = sample
+        self.last_seen = 0.0
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of calls"""
+        if not self.calls:
+            return None
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else round(self.max_ms, 2)
+        return round(self.max_ms, 2)
+    
+    def to_dict(self, name: str) -> Dict[str, Any]:
+        histogram = {f"<={bound}ms": count for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)}
+        histogram['+Inf'] = self.buckets[-1]
+        return {
+            'fingerprint': name,
+            'sample': self.sample,
+            'calls': self.calls,
+            'errors': self.errors,
+            'slow_calls': self.slow_calls,
+            'total_ms': round(self.total_ms, 2),
+            'avg_ms': round(self.total_ms / self.calls, 2) if self.calls else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'rows': self.rows,
+            'avg_rows': round(self.rows / self.calls, 1) if self.calls else 0.0,
+            'pool_wait_ms': round(self.pool_wait_ms, 2),
+            'histogram': histogram,
+            'last_seen': datetime.utcfromtimestamp(self.last_seen).isoformat() if self.last_seen else None
+        }
+
+class QueryStats:
+    """Process-wide statement counters and slow-query log"""
+    
+    def __init__(self, slow_ms: Optional[float] = None, explain_rate: Optional[float] = None,
+                 max_fingerprints: Optional[int] = None, slow_log_size: Optional[int] = None):
+        self.slow_ms = Config.SLOW_QUERY_MS if slow_ms is None else slow_ms
+        self.explain_rate = Config.SLOW_QUERY_EXPLAIN_SAMPLE_RATE if explain_rate is None else explain_rate
+        self.max_fingerprints = max_fingerprints or Config.QUERY_STATS_MAX_FINGERPRINTS
+        slow_log_size = slow_log_size or Config.SLOW_QUERY_LOG_SIZE
+        
+        self._fingerprints: Dict[str, _Fingerprint] = {}
+        self._slow_log: Deque[Dict[str, Any]] = deque(maxlen=slow_log_size)
+        self._started_at = time.time()
+        self._lock = threading.Lock()
+    
+    def record(self, query: str, elapsed_ms: float, rows: int = 0, pool_wait_ms: float = 0.0,
+               error: bool = False) -> bool:
+        """
+        Count one statement
+        
+        Returns:
+            True when the statement was slow and its EXPLAIN plan should be
+            sampled (see add_slow_plan); the caller still holds the connection
+        """
+        name = fingerprint(query)
+        slow = elapsed_ms >= self.slow_ms
+        
+        with self._lock:
+            entry = self._fingerprints.get(name)
+            if entry is None:
+                if len(self._fingerprints) >= self.max_fingerprints:
+                    name = OVERFLOW_FINGERPRINT
+                    entry = self._fingerprints.get(name)
+                if entry is None:
+                    entry = self._fingerprints[name] = _Fingerprint(_WHITESPACE.sub(' ', query).strip()[:1000])
+            
+            entry.calls += 1
+            entry.total_ms += elapsed_ms
+            entry.max_ms = max(entry.max_ms, elapsed_ms)
+            entry.rows += rows
+            entry.pool_wait_ms += pool_wait_ms
+            entry.last_seen = time.time()
+            entry.buckets[self._bucket(elapsed_ms)] += 1
+            if error:
+                entry.errors += 1
+            if slow:
+                entry.slow_calls += 1
+                self._slow_log.append({
+                    'fingerprint': name,
+                    'elapsed_ms': round(elapsed_ms, 2),
+                    'rows': rows,
+                    'pool_wait_ms': round(pool_wait_ms, 2),
+                    'error': error,
+                    'at': datetime.utcnow().isoformat(),
+                    'explain': None
+                })
+        
+        if not slow:
+            return False
+        
+        logger.warning(f"🐢 Slow query ({elapsed_ms:.0f}ms, {rows} rows, "
+                       f"{pool_wait_ms:.0f}ms pool wait): {name[:500]}")
+        return not error and is_explainable(query) and random.random() < self.explain_rate
+    
+    def add_slow_plan(self, query: str, plan: List[Dict[str, Any]]) -> None:
+        """Attach an EXPLAIN plan to the statement's latest slow-log entry"""
+        name = fingerprint(query)
+        logger.warning(f"🐢 EXPLAIN {name[:200]}: {plan}")
+        with self._lock:
+            for entry in reversed(self._slow_log):
+                if entry['fingerprint'] == name:
+                    entry['explain'] = plan
+                    break
+    
+    @staticmethod
+    def _bucket(elapsed_ms: float) -> int:
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                return index
+        return len(LATENCY_BUCKETS_MS)
+    
+    def top(self, limit: int = 20, sort: str = 'total_ms') -> List[Dict[str, Any]]:
+        """The limit fingerprints with the highest sort value (total time by default)"""
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of: {', '.join(SORT_KEYS)}")
+        with self._lock:
+            rows = [entry.to_dict(name) for name, entry in self._fingerprints.items()]
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:limit]
+    
+    def slow_log(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Most recent slow statements first"""
+        with self._lock:
+            entries = list(reversed(self._slow_log))
+        return entries[:limit] if limit else entries
+    
+    def reset(self) -> None:
+        with self._lock:
+            self._fingerprints.clear()
+            self._slow_log.clear()
+            self._started_at = time.time()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Totals across all fingerprints, for the admin status endpoint"""
+        with self._lock:
+            entries = list(self._fingerprints.values())
+            slow_logged = len(self._slow_log)
+        calls = sum(entry.calls for entry in entries)
+        total_ms = sum(entry.total_ms for entry in entries)
+        return {
+            'enabled': Config.QUERY_STATS_ENABLED,
+            'since': datetime.utcfromtimestamp(self._started_at).isoformat(),
+            'fingerprints': len(entries),
+            'calls': calls,
+            'errors': sum(entry.errors for entry in entries),
+            'slow_calls': sum(entry.slow_calls for entry in entries),
+            'total_ms': round(total_ms, 2),
+            'avg_ms': round(total_ms / calls, 2) if calls else 0.0,
+            'slow_query_ms': self.slow_ms,
+            'slow_log_entries': slow_logged
+        }
+
+# Global query stats shared by every DatabaseService in the process
+query_stats = None
+_query_stats_lock = threading.Lock()
+
+def get_query_stats() -> QueryStats:
+    """Get shared query stats instance"""
+    global query_stats
+    if not query_stats:
+        with _query_stats_lock:
+            if not query_stats:
+                query_stats = QueryStats()
+    return query_stats
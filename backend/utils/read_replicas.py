@@ -0,0 +1,184 @@
+# backend/utils/read_replicas.py
+"""
+Read replica selection for DatabaseService
+Spreads read-only queries round-robin over the healthy replicas. A replica
+that fails to connect, or falls too far behind its source, is skipped for a
+while and its reads go to the primary.
+
+Read-your-writes: after a session writes, its reads stay on the primary for
+a short window so it never reads data older than its own write. Inside a
+request the session is the Flask session cookie, so this carries across
+requests and workers; elsewhere (background jobs) it is the current thread.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from flask import has_request_context, session
+from mysql.connector import Error
+
+from config.config import Config
+from utils.db_pool import ConnectionPool, PoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Flask session key holding the time of the session's last write
+SESSION_WRITE_KEY = '_db_write_at'
+
+_thread_writes = threading.local()
+
+def mark_write() -> None:
+    """Record that the current session wrote to the primary"""
+    now = time.time()
+    if has_request_context():
+        session[SESSION_WRITE_KEY] = now
+    else:
+        _thread_writes.at = now
+
+def is_sticky() -> bool:
+    """Whether the current session wrote recently enough that replicas may not have it yet"""
+    if has_request_context():
+        written_at = session.get(SESSION_WRITE_KEY)
+    else:
+        written_at = getattr(_thread_writes, 'at', None)
+    return written_at is not None and time.time() - written_at < Config.DB_REPLICA_STICKY_SECONDS
+
+class Replica:
+    """One replica's pool and health"""
+    
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.down_until = 0.0
+        self.last_error: Optional[str] = None
+        self.lag_seconds: Optional[int] = None
+        self.lag_checked_at = 0.0
+        self.reads = 0
+        self.failures = 0
+        self._check_lock = threading.Lock()
+    
+    def is_up(self) -> bool:
+        return time.monotonic() >= self.down_until
+    
+    def mark_down(self, error: Any) -> None:
+        """Skip this replica for DB_REPLICA_RETRY_INTERVAL seconds"""
+        self.down_until = time.monotonic() + Config.DB_REPLICA_RETRY_INTERVAL
+        self.last_error = str(error)
+        self.failures += 1
+        logger.warning(f"⚠️ Read replica {self.name} unavailable, reading from primary: {error}")
+    
+    def check_lag(self) -> None:
+        """
+        Refresh replication lag every DB_REPLICA_HEALTH_INTERVAL seconds
+        Only one thread checks at a time; the rest use the last known state
+        """
+        if not Config.DB_REPLICA_MAX_LAG or time.monotonic() - self.lag_checked_at < Config.DB_REPLICA_HEALTH_INTERVAL:
+            return
+        if not self._check_lock.acquire(blocking=False):
+            return
+        
+        try:
+            self.lag_checked_at = time.monotonic()
+            connection = self.pool.acquire()
+            try:
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except Error:
+                    # Servers before MySQL 8.0.22
+                    cursor.execute("SHOW SLAVE STATUS")
+                status = cursor.fetchone()
+                cursor.close()
+            finally:
+                self.pool.release(connection)
+            
+            # No status means this is not a replica (e.g. a read-only copy), so no lag
+            lag = None
+            if status:
+                lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+            self.lag_seconds = lag
+            
+            if status and lag is None:
+                self.mark_down("replication is not running")
+            elif lag is not None and lag > Config.DB_REPLICA_MAX_LAG:
+                self.mark_down(f"{lag}s behind the primary")
+        
+        except PoolTimeoutError:
+            pass  # Busy, not unhealthy; check again next interval
+        except Error as e:
+            self.mark_down(e)
+        finally:
+            self._check_lock.release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'healthy': self.is_up(),
+            'retry_in_seconds': max(0, round(self.down_until - time.monotonic(), 1)),
+            'last_error': self.last_error,
+            'lag_seconds': self.lag_seconds,
+            'reads': self.reads,
+            'failures': self.failures,
+            'pool': self.pool.get_stats()
+        }
+
+class ReplicaSet:
+    """Round-robin choice over the healthy replicas, with routing counters"""
+    
+    def __init__(self, replicas: List[Replica]):
+        self.replicas = replicas
+        self._next = itertools.cycle(range(len(replicas)))
+        self._lock = threading.Lock()
+        self._stats = {'replica_reads': 0, 'sticky_reads': 0, 'fallback_reads': 0}
+    
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+    
+    def choose(self) -> Optional[Replica]:
+        """
+        Replica for the next read, or None to read from the primary
+        (the session wrote recently, or no replica is healthy)
+        """
+        if is_sticky():
+            self._count('sticky_reads')
+            return None
+        
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[next(self._next)]
+            if not replica.is_up():
+                continue
+            replica.check_lag()
+            if replica.is_up():
+                return replica
+        
+        self._count('fallback_reads')
+        return None
+    
+    def record_read(self, replica: Replica) -> None:
+        with self._lock:
+            replica.reads += 1
+            self._stats['replica_reads'] += 1
+    
+    def record_fallback(self) -> None:
+        self._count('fallback_reads')
+    
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+    
+    def close(self) -> None:
+        for replica in self.replicas:
+            replica.pool.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            **stats,
+            'sticky_seconds': Config.DB_REPLICA_STICKY_SECONDS,
+            'max_lag_seconds': Config.DB_REPLICA_MAX_LAG,
+            'replicas': {replica.name: replica.get_stats() for replica in self.replicas}
+        }
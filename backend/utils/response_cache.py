@@ -0,0 +1,246 @@
+# backend/utils/response_cache.py
+"""
+TTL response cache for upstream API results
+In-memory LRU tier bounded by entry count and approximate size, with an
+optional SQLite tier that survives restarts and is shared by every worker
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+def make_cache_key(params: Dict[str, Any]) -> str:
+    """Build a stable key from request parameters (order-independent)"""
+    encoded = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+class ResponseCache:
+    """
+    TTL + LRU cache of JSON-serializable responses
+    
+    Entries expire after ttl seconds. The memory tier evicts least recently
+    used entries once it holds max_entries or max_bytes; when a disk path is
+    set, entries are also written to SQLite and read back on memory misses.
+    """
+    
+    def __init__(self, name: str, ttl: int, max_entries: int, max_bytes: int,
+                 disk_path: Optional[str] = None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path
+        
+        # key -> (expires_at, size in bytes, value)
+        self._entries: 'OrderedDict[str, Tuple[float, int, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+        
+        if self.disk_path:
+            self._init_disk()
+    
+    def _init_disk(self):
+        """Create the on-disk tier, disabling it if the file can't be opened"""
+        try:
+            directory = os.path.dirname(self.disk_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            
+            conn = self._connect()
+            try:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS response_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+                conn.execute('DELETE FROM response_cache WHERE expires_at < ?', (time.time(),))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Disk tier for cache '{self.name}' disabled: {str(e)}")
+            self.disk_path = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.disk_path, timeout=5)
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value, or None on a miss"""
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return entry[2]
+                self._remove(key)
+                self._stats['expirations'] += 1
+        
+        if self.disk_path:
+            stored = self._disk_get(key, now)
+            if stored:
+                expires_at, encoded = stored
+                value = json.loads(encoded)
+                with self._lock:
+                    self._stats['disk_hits'] += 1
+                    self._store(key, value, len(encoded), expires_at)
+                return value
+        
+        with self._lock:
+            self._stats['misses'] += 1
+        return None
+    
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        """Cache a JSON-serializable value"""
+        encoded = json.dumps(value, default=str)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        
+        with self._lock:
+            self._store(key, value, len(encoded), expires_at)
+        
+        if self.disk_path:
+            self._disk_set(key, encoded, expires_at)
+    
+    def clear(self) -> int:
+        """Drop every entry from both tiers, returning the number of memory entries removed"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        
+        if self.disk_path:
+            try:
+                conn = self._connect()
+                try:
+                    conn.execute('DELETE FROM response_cache')
+                    conn.commit()
+                finally:
+                    conn.close()
+            except Exception as e:
+                logger.warning(f"Could not clear disk tier for cache '{self.name}': {str(e)}")
+        
+        return count
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        stats['ttl_seconds'] = self.ttl
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        stats['disk_tier'] = bool(self.disk_path)
+        return stats
+    
+    def _store(self, key: str, value: Any, size: int, expires_at: float):
+        """Insert into the memory tier and evict down to the caps (lock held)"""
+        if key in self._entries:
+            self._remove(key)
+        
+        # Values bigger than the whole cache are only kept on disk
+        if size > self.max_bytes:
+            return
+        
+        self._entries[key] = (expires_at, size, value)
+        self._bytes += size
+        
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+    
+    def _remove(self, key: str):
+        """Remove a memory entry (lock held)"""
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+    
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, str]]:
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    'SELECT expires_at, value FROM response_cache WHERE cache_key = ? AND expires_at > ?',
+                    (key, now)
+                ).fetchone()
+            finally:
+                conn.close()
+            return row
+        except Exception as e:
+            logger.warning(f"Disk read failed for cache '{self.name}': {str(e)}")
+            return None
+    
+    def _disk_set(self, key: str, encoded: str, expires_at: float):
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    'INSERT OR REPLACE INTO response_cache (cache_key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, encoded, expires_at)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.warning(f"Disk write failed for cache '{self.name}': {str(e)}")
+
+# Global cache registry shared by every service in the process
+_caches: Dict[str, ResponseCache] = {}
+_registry_lock = threading.Lock()
+
+def get_response_cache(name: str, ttl: int, max_entries: int, max_bytes: int,
+                       disk: bool = False) -> ResponseCache:
+    """
+    Get the named response cache, creating it on first use
+    
+    Args:
+        name: Cache name (also names the disk file)
+        ttl: Seconds an entry stays valid
+        max_entries: Memory tier entry cap
+        max_bytes: Memory tier size cap (JSON-encoded bytes)
+        disk: Also keep entries in SQLite under SHARED_STATE_DIR
+    """
+    with _registry_lock:
+        cache = _caches.get(name)
+        if not cache:
+            disk_path = os.path.join(Config.SHARED_STATE_DIR, f"{name}_cache.db") if disk else None
+            cache = ResponseCache(name, ttl, max_entries, max_bytes, disk_path=disk_path)
+            _caches[name] = cache
+        return cache
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get stats for every cache in the process"""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return {cache.name: cache.get_stats() for cache in caches}
+
+def clear_all_caches() -> int:
+    """Clear every cache in the process, returning the number of memory entries removed"""
+    with _registry_lock:
+        caches = list(_caches.values())
+    return sum(cache.clear() for cache in caches)
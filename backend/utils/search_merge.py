@@ -0,0 +1,285 @@
+# backend/utils/search_merge.py
+"""
+Unified search result merging
+Clusters the per-source results of a multi-source search into one entry per
+film (by IMDb/TMDb id, else normalized title + year), scores each cluster on
+text relevance, sales volume and data completeness, and pages the ranked list
+"""
+
+import math
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+from utils.title_classifier import classify_title, title_key
+
+# Score weights (sum to 1)
+RELEVANCE_WEIGHT = 0.6
+VOLUME_WEIGHT = 0.25
+COMPLETENESS_WEIGHT = 0.15
+
+# Where a cluster's display fields come from, best first
+SOURCE_PRIORITY = ['database', 'omdb', 'tmdb', 'ebay']
+
+# Fields counted for data completeness
+COMPLETENESS_FIELDS = ['year', 'film_id', 'imdb_id', 'tmdb_id', 'poster_url', 'overview', 'rating']
+
+# eBay listings kept on each merged result (the rest are only counted)
+LISTING_PREVIEW_COUNT = 3
+
+_YEAR_PATTERN = re.compile(r'(\d{4})')
+
+def parse_year(value: Any) -> Optional[int]:
+    """Get a year from an int, "1979", "1979-1985" or "2001-05-12" """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    match = _YEAR_PATTERN.search(str(value))
+    return int(match.group(1)) if match else None
+
+def _price(value: Any) -> Optional[float]:
+    """Get a float price from a number, numeric string or eBay amount dict"""
+    if isinstance(value, dict):
+        value = value.get('value')
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+def _normalize(source: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Map one source result onto the common fields used for clustering"""
+    if source == 'database':
+        return {
+            'title': item.get('title'),
+            'year': parse_year(item.get('release_year') or item.get('year')),
+            'film_id': item.get('id'),
+            'imdb_id': item.get('imdb_id'),
+            'tmdb_id': item.get('tmdb_id'),
+            'poster_url': item.get('image_url'),
+            'overview': item.get('description'),
+            'rating': item.get('rating')
+        }
+    
+    if source == 'ebay':
+        return {
+            'title': item.get('title'),
+            'year': classify_title(item.get('title'))['year']
+        }
+    
+    # omdb and tmdb results are already shaped by search_omdb/search_tmdb
+    return {
+        'title': item.get('title'),
+        'year': parse_year(item.get('year')),
+        'imdb_id': item.get('imdb_id'),
+        'tmdb_id': item.get('tmdb_id'),
+        'poster_url': item.get('poster_url'),
+        'overview': item.get('overview'),
+        'rating': item.get('rating')
+    }
+
+class _Cluster:
+    """One film seen by one or more sources"""
+    
+    def __init__(self, key: str, year: Optional[int]):
+        self.key = key
+        self.year = year
+        self.fields: Dict[str, Tuple[int, Any]] = {}
+        self.sources = set()
+        self.formats: List[Dict[str, Any]] = []
+        self.listings: List[Dict[str, Any]] = []
+    
+    def add(self, source: str, normalized: Dict[str, Any], item: Dict[str, Any]) -> None:
+        """Add a source result, keeping each field from the highest priority source"""
+        self.sources.add(source)
+        rank = SOURCE_PRIORITY.index(source)
+        if self.year is None and normalized.get('year'):
+            self.year = normalized['year']
+        
+        for field, value in normalized.items():
+            if value in (None, '', 'N/A'):
+                continue
+            current = self.fields.get(field)
+            if current is None or rank < current[0]:
+                self.fields[field] = (rank, value)
+        
+        if source == 'database':
+            self.formats.append({
+                'film_id': item.get('id'),
+                'format': item.get('format'),
+                'price_count': int(item.get('price_count') or 0),
+                'min_price': _price(item.get('min_price')),
+                'max_price': _price(item.get('max_price')),
+                'avg_price': _price(item.get('avg_price'))
+            })
+        elif source == 'ebay':
+            self.listings.append(item)
+    
+    def get(self, field: str) -> Any:
+        """Get a field's best value"""
+        value = self.fields.get(field)
+        return value[1] if value else None
+    
+    def sold_count(self) -> int:
+        """Sales recorded in the database plus eBay units sold"""
+        stored = sum(entry['price_count'] for entry in self.formats)
+        listed = sum(int(listing.get('totalSoldQuantity') or 1) for listing in self.listings)
+        return stored + listed
+    
+    def to_dict(self, score: float) -> Dict[str, Any]:
+        """Serialize as one merged search result"""
+        prices = [price for price in (_price(listing.get('lastSoldPrice')) for listing in self.listings)
+                  if price is not None]
+        
+        return {
+            'title': self.get('title'),
+            'year': self.year,
+            'film_id': self.get('film_id'),
+            'imdb_id': self.get('imdb_id'),
+            'tmdb_id': self.get('tmdb_id'),
+            'poster_url': self.get('poster_url'),
+            'overview': self.get('overview'),
+            'rating': self.get('rating'),
+            'sources': [source for source in SOURCE_PRIORITY if source in self.sources],
+            'formats': self.formats,
+            'ebay': {
+                'listing_count': len(self.listings),
+                'min_price': min(prices) if prices else None,
+                'max_price': max(prices) if prices else None,
+                'avg_price': round(sum(prices) / len(prices), 2) if prices else None,
+                'listings': [{
+                    'title': listing.get('title'),
+                    'price': _price(listing.get('lastSoldPrice')),
+                    'sold_date': listing.get('lastSoldDate'),
+                    'url': listing.get('itemWebUrl')
+                } for listing in self.listings[:LISTING_PREVIEW_COUNT]]
+            },
+            'sold_count': self.sold_count(),
+            'score': round(score, 4)
+        }
+
+def _cluster(results_by_source: Dict[str, List[Dict[str, Any]]]) -> List[_Cluster]:
+    """Group source results into clusters, one per film"""
+    clusters: List[_Cluster] = []
+    by_id: Dict[Tuple[str, Any], _Cluster] = {}
+    by_title: Dict[str, List[_Cluster]] = {}
+    
+    def find(key: str, year: Optional[int], normalized: Dict[str, Any]) -> Optional[_Cluster]:
+        for id_field in ('imdb_id', 'tmdb_id'):
+            if normalized.get(id_field) and (id_field, normalized[id_field]) in by_id:
+                return by_id[(id_field, normalized[id_field])]
+        
+        candidates = by_title.get(key, [])
+        for cluster in candidates:
+            # A missing year matches anything; two known years must agree
+            if year is None or cluster.year is None or cluster.year == year:
+                return cluster
+        return None
+    
+    def find_listing_film(key: str, year: Optional[int]) -> Optional[_Cluster]:
+        # Listing titles carry extra words ("Alien Universal"), so try the
+        # longest leading run of words that names a known film
+        words = key.split()
+        for length in range(len(words), 0, -1):
+            candidates = by_title.get(' '.join(words[:length]), [])
+            for cluster in candidates:
+                if year is None or cluster.year is None or cluster.year == year:
+                    return cluster
+            # A listing's year is often the release's, not the film's; with
+            # only one film of that name it must still be that film
+            if len(candidates) == 1:
+                return candidates[0]
+        return None
+    
+    # Catalog sources first so listings attach to the films they describe
+    for source in SOURCE_PRIORITY:
+        for item in results_by_source.get(source) or []:
+            normalized = _normalize(source, item)
+            key = title_key(normalized.get('title'))
+            if not key:
+                continue
+            year = normalized.get('year')
+            
+            if source == 'ebay':
+                cluster = find_listing_film(key, year)
+            else:
+                cluster = find(key, year, normalized)
+            
+            if cluster is None:
+                cluster = _Cluster(key, year)
+                clusters.append(cluster)
+                by_title.setdefault(key, []).append(cluster)
+            
+            cluster.add(source, normalized, item)
+            for id_field in ('imdb_id', 'tmdb_id'):
+                if normalized.get(id_field):
+                    by_id.setdefault((id_field, normalized[id_field]), cluster)
+    
+    return clusters
+
+def text_relevance(query_key: str, key: str) -> float:
+    """Score how well a normalized title matches the normalized query (0-1)"""
+    if not query_key or not key:
+        return 0.0
+    if key == query_key:
+        return 1.0
+    if key.startswith(query_key + ' '):
+        return 0.8
+    
+    query_words = set(query_key.split())
+    title_words = set(key.split())
+    overlap = len(query_words & title_words) / len(query_words)
+    # Penalize long titles that only contain the query
+    return 0.6 * overlap * min(1.0, len(query_words) / len(title_words)) + 0.2 * overlap
+
+def merge_results(query: str, results_by_source: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Merge, de-duplicate and rank multi-source search results
+    
+    Args:
+        query: The search text
+        results_by_source: Source name (database, ebay, omdb, tmdb) -> its raw results
+    
+    Returns:
+        One merged result per film, best first. The order is deterministic
+        for the same input, so pages taken from it are stable.
+    """
+    clusters = _cluster(results_by_source)
+    if not clusters:
+        return []
+    
+    query_key = title_key(query) or query.strip().lower()
+    max_volume = max(math.log1p(cluster.sold_count()) for cluster in clusters) or 1.0
+    
+    scored = []
+    for cluster in clusters:
+        relevance = text_relevance(query_key, cluster.key)
+        volume = math.log1p(cluster.sold_count()) / max_volume
+        present = sum(1 for field in COMPLETENESS_FIELDS
+                      if (cluster.year if field == 'year' else cluster.get(field)) is not None)
+        completeness = present / len(COMPLETENESS_FIELDS)
+        
+        score = RELEVANCE_WEIGHT * relevance + VOLUME_WEIGHT * volume + COMPLETENESS_WEIGHT * completeness
+        scored.append((score, cluster))
+    
+    # Ties break on title, year and key so equal scores never swap between pages
+    scored.sort(key=lambda entry: (-round(entry[0], 6), entry[1].key, entry[1].year or 0))
+    return [cluster.to_dict(score) for score, cluster in scored]
+
+def paginate(items: List[Any], page: int, limit: int) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Slice one page out of a ranked list
+    
+    Returns:
+        (page items, pagination info with page, limit, total_count, total_pages, has_next)
+    """
+    page = max(page, 1)
+    total = len(items)
+    start = (page - 1) * limit
+    
+    return items[start:start + limit], {
+        'page': page,
+        'limit': limit,
+        'total_count': total,
+        'total_pages': math.ceil(total / limit) if limit else 0,
+        'has_next': start + limit < total
+    }
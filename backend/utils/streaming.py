@@ -0,0 +1,68 @@
+# backend/utils/streaming.py
+"""
+Streaming response bodies
+Turns row iterators (e.g. DatabaseService.iter_query) into JSON or CSV
+response chunks, so large results go out as they are read instead of being
+built up in worker memory first. Use with flask.stream_with_context.
+"""
+
+import csv
+import io
+import itertools
+from typing import Any, Iterable, Iterator, Sequence
+
+from flask import current_app
+
+# Response chunk size; rows are buffered up to this before each write
+CHUNK_BYTES = 64 * 1024
+
+def started(rows: Iterable[Any]) -> Iterator[Any]:
+    """
+    Start a row iterator now
+    A query that fails then raises before the response status is sent,
+    instead of cutting off a 200 response part way through
+    """
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        return iter(())
+    return itertools.chain([first], rows)
+
+def json_stream(key: str, rows: Iterable[Any], **fields: Any) -> Iterator[str]:
+    """
+    Stream {"<key>": [rows...], "count": n, **fields} as JSON text
+    Values are encoded by the app's JSON provider, the same as jsonify
+    """
+    dumps = current_app.json.dumps
+    buffer = [f"{{{dumps(key)}:["]
+    size = 0
+    count = 0
+    
+    for row in rows:
+        chunk = (',' if count else '') + dumps(row)
+        buffer.append(chunk)
+        size += len(chunk)
+        count += 1
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    
+    trailer = ''.join(f",{dumps(name)}:{dumps(value)}" for name, value in fields.items())
+    buffer.append(f'],"count":{count}{trailer}}}')
+    yield ''.join(buffer)
+
+def csv_stream(columns: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[str]:
+    """Stream a header row and then rows (tuples in column order) as CSV text"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    yield buffer.getvalue()
@@ -0,0 +1,230 @@
+# backend/utils/title_classifier.py
+"""
+Listing title classifier
+Extracts format, year, studio, edition and sealed/graded flags from an eBay
+listing title in a single pass: the title is tokenized once and every word
+(and two-word phrase) is resolved against one precompiled keyword table
+"""
+
+import re
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Formats in detection priority order: when a title mentions several
+# (e.g. "DVD + Blu-ray combo") the earliest entry here wins
+FORMAT_KEYWORDS = [
+    ('VHS', ['VHS']),
+    ('DVD', ['DVD']),
+    ('Blu-ray', ['BLU RAY', 'BLURAY']),
+    ('4K UHD', ['4K', 'UHD']),
+    ('LaserDisc', ['LASERDISC', 'LASER DISC']),
+]
+
+# Studios in priority order (first listed wins)
+STUDIO_KEYWORDS = [
+    ('Universal', ['UNIVERSAL']),
+    ('Disney', ['DISNEY']),
+    ('Warner', ['WARNER']),
+    ('Paramount', ['PARAMOUNT']),
+    ('Sony', ['SONY']),
+    ('MGM', ['MGM']),
+    ('Fox', ['FOX']),
+    ('20th Century', ['20TH CENTURY']),
+    ('Columbia', ['COLUMBIA']),
+    ('Lionsgate', ['LIONSGATE', 'LIONS GATE']),
+]
+
+# Editions (first mention in the title wins)
+EDITION_KEYWORDS = [
+    ("Collector's Edition", ["COLLECTOR'S EDITION", 'COLLECTORS EDITION']),
+    ('Special Edition', ['SPECIAL EDITION']),
+    ('Limited Edition', ['LIMITED EDITION']),
+    ('Anniversary Edition', ['ANNIVERSARY']),
+    ("Director's Cut", ["DIRECTOR'S CUT", 'DIRECTORS CUT']),
+    ('Criterion Collection', ['CRITERION']),
+    ('Steelbook', ['STEELBOOK', 'STEEL BOOK']),
+    ('Box Set', ['BOX SET', 'BOXSET']),
+]
+
+SEALED_KEYWORDS = ['SEALED', 'NIB']
+GRADED_KEYWORDS = ['GRADED', 'VGA', 'CGC']
+
+# Words are letters/digits (apostrophes kept for "Collector's"); "Blu-ray" becomes BLU, RAY
+_WORD_PATTERN = re.compile(r"[A-Z0-9']+")
+_YEAR_PATTERN = re.compile(r'\((\d{4})\)|\b(19\d{2}|20\d{2})\b')
+
+# (kind, priority, value) for each keyword
+Keyword = Tuple[str, int, str]
+
+def _build_keyword_tables() -> Tuple[Dict[str, Keyword], Dict[str, Dict[str, Keyword]], frozenset]:
+    """
+    Build the keyword tables
+    
+    Returns:
+        Single word table (plurals included), first word -> second word phrase
+        table, and the set of every word that can start a match
+    """
+    words: Dict[str, Keyword] = {}
+    phrases: Dict[str, Dict[str, Keyword]] = {}
+    
+    groups = [('format', FORMAT_KEYWORDS), ('studio', STUDIO_KEYWORDS), ('edition', EDITION_KEYWORDS),
+              ('sealed', [(True, SEALED_KEYWORDS)]), ('graded', [(True, GRADED_KEYWORDS)])]
+    
+    for kind, entries in groups:
+        for priority, (value, keywords) in enumerate(entries):
+            for keyword in keywords:
+                parts = keyword.split()
+                if len(parts) == 1:
+                    words.setdefault(parts[0], (kind, priority, value))
+                    words.setdefault(parts[0] + 'S', (kind, priority, value))
+                else:
+                    phrases.setdefault(parts[0], {}).setdefault(parts[1], (kind, priority, value))
+    
+    return words, phrases, frozenset(words) | frozenset(phrases)
+
+_WORDS, _PHRASES, _MATCH_STARTS = _build_keyword_tables()
+
+# Seller filler that says nothing about which film a listing is
+LISTING_NOISE_WORDS = ['NEW', 'RARE', 'OOP', 'HTF', 'VINTAGE', 'MOVIE', 'FILM', 'EDITION', 'TAPE',
+                       'DISC', 'COMPLETE', 'WIDESCREEN', 'FULLSCREEN', 'USED', 'LOT', 'COMBO']
+
+# Format and condition keywords never belong to a title, wherever they appear
+_MEDIA_KINDS = ('format', 'sealed', 'graded')
+_FORMAT_WORDS = frozenset(word for word, (kind, _, _) in _WORDS.items() if kind in _MEDIA_KINDS)
+_FORMAT_PHRASES = {
+    first: frozenset(second for second, (kind, _, _) in followers.items() if kind in _MEDIA_KINDS)
+    for first, followers in _PHRASES.items()
+}
+
+# Edition words and filler (plurals included, as in the keyword table); studios
+# stay because they are often part of a real title
+_FILLER = (
+    [word for word, (kind, _, _) in _WORDS.items() if kind == 'edition'] +
+    [word for first, followers in _PHRASES.items() for second, (kind, _, _) in followers.items()
+     if kind == 'edition' for word in (first, second)] +
+    LISTING_NOISE_WORDS
+)
+_TITLE_NOISE = frozenset(_FILLER + [word + 'S' for word in _FILLER])
+_TITLE_YEAR_PATTERN = re.compile(r'\(\s*\d{4}\s*\)')
+_ARTICLES = ('THE', 'A', 'AN')
+
+def _format_words_at(words: List[str], position: int) -> int:
+    """Number of words at position that spell a format or condition (2 for BLU RAY), else 0"""
+    word = words[position]
+    if word in _FORMAT_WORDS:
+        return 1
+    if position + 1 < len(words) and words[position + 1] in _FORMAT_PHRASES.get(word, ()):
+        return 2
+    return 0
+
+def _is_release_year(word: str) -> bool:
+    """A bare number that can be a release year (so "2049" in "Blade Runner 2049" is not)"""
+    return len(word) == 4 and word.isdigit() and 1888 <= int(word) <= date.today().year + 1
+
+def classify_title(title: Optional[str]) -> Dict[str, Any]:
+    """
+    Classify a listing title in one pass
+    
+    The title is uppercased and tokenized once; a set intersection against
+    the precompiled keyword table finds every candidate word, so the Python
+    work per title is proportional to the keywords present, not its length.
+    
+    Returns:
+        Dictionary with format ('Unknown' if none found), year, studio,
+        edition (None when absent) and sealed/graded flags
+    """
+    result = {
+        'format': 'Unknown',
+        'year': None,
+        'studio': None,
+        'edition': None,
+        'sealed': False,
+        'graded': False
+    }
+    if not title:
+        return result
+    
+    year_match = _YEAR_PATTERN.search(title)
+    if year_match:
+        result['year'] = int(year_match.group(1) or year_match.group(2))
+    
+    tokens = _WORD_PATTERN.findall(title.upper())
+    found = _MATCH_STARTS.intersection(tokens)
+    if not found:
+        return result
+    
+    best = {}
+    for token in found:
+        matches = []
+        keyword = _WORDS.get(token)
+        if keyword:
+            matches.append((keyword, token))
+        
+        followers = _PHRASES.get(token)
+        if followers:
+            for position, word in enumerate(tokens[:-1]):
+                if word == token and tokens[position + 1] in followers:
+                    matches.append((followers[tokens[position + 1]], token))
+        
+        for (kind, priority, value), first_word in matches:
+            # Editions rank by first mention in the title; everything else by priority
+            rank = tokens.index(first_word) if kind == 'edition' else priority
+            current = best.get(kind)
+            if current is None or rank < current[0]:
+                best[kind] = (rank, value)
+    
+    for kind, (_, value) in best.items():
+        result[kind] = value
+    
+    return result
+
+def title_key(title: Optional[str]) -> str:
+    """
+    Normalize a title for matching across sources
+    
+    "The Terminator (1984) VHS SEALED Rare", "VHS Terminator" and
+    "Terminator" all become "terminator". Punctuation, a leading article and
+    a year in parentheses or at the end are dropped, format and condition
+    words (and their plurals) wherever they appear, and edition and filler
+    words ("TAPES", "COMBO") everywhere except as the title's first word, so
+    "New Jack City" and "Tape Heads" keep theirs. A listing that leads with
+    its format ("DVD Combo Alien") has no such title word to protect. A
+    title that would normalize to nothing ("1917") keeps its unstripped key.
+    """
+    if not title:
+        return ''
+    
+    tokens = [token.replace("'", '') for token in _WORD_PATTERN.findall(title.upper())]
+    tokens = [token for token in tokens if token]
+    
+    words = _WORD_PATTERN.findall(_TITLE_YEAR_PATTERN.sub(' ', title.upper()))
+    words = [word.replace("'", '') for word in words]
+    words = [word for word in words if word]
+    leads_with_format = bool(words) and _format_words_at(words, 0) > 0
+    
+    kept, position = [], 0
+    while position < len(words):
+        skip = _format_words_at(words, position)
+        if not skip:
+            kept.append(words[position])
+        position += skip or 1
+    words = kept
+    
+    start = 1 if len(words) > 1 and words[0] in _ARTICLES else 0
+    protected = 0 if leads_with_format else 1
+    words = words[start:start + protected] + [
+        word for word in words[start + protected:] if word not in _TITLE_NOISE
+    ]
+    # Listing years usually trail the title once the format words are gone
+    if len(words) > 1 and _is_release_year(words[-1]):
+        words = words[:-1]
+    
+    return ' '.join(words or tokens).lower()
+
+def classify_titles(titles: Iterable[Optional[str]]) -> List[Dict[str, Any]]:
+    """Classify many titles (ingestion batches)"""
+    return [classify_title(title) for title in titles]
+
+def detect_format(title: Optional[str]) -> str:
+    """Get just the format of a listing title"""
+    return classify_title(title)['format']
@@ -0,0 +1,279 @@
+# backend/utils/token_bucket.py
+"""
+Token-bucket rate limiting for upstream API clients
+Buckets live in a SQLite file shared by every worker on the host, so N
+workers together stay within one upstream limit; falls back to in-process
+buckets when the shared store is unavailable
+
+Threads serving a request never sleep on a bucket: acquire_or_raise()
+raises RateLimitExceeded at once so the endpoint can answer 429, while
+background refresh and ingestion workers wait for their turn.
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+import logging
+
+from flask import has_request_context
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+class RateLimitExceeded(Exception):
+    """No request slot free for an upstream API"""
+    
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} rate limit: no request slot available (retry in {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+_thread_state = threading.local()
+
+@contextmanager
+def without_waiting(enabled: bool = True) -> Iterator[None]:
+    """
+    Make rate-limited calls in this thread fail fast instead of waiting
+    For pool threads doing work for a request (they have no request context)
+    """
+    previous = getattr(_thread_state, 'no_wait', False)
+    _thread_state.no_wait = enabled
+    try:
+        yield
+    finally:
+        _thread_state.no_wait = previous
+
+def waiting_allowed() -> bool:
+    """False on request threads and threads inside without_waiting()"""
+    return not has_request_context() and not getattr(_thread_state, 'no_wait', False)
+
+class MemoryBucketBackend:
+    """In-process bucket state (limits apply per worker)"""
+    
+    shared = False
+    
+    def __init__(self):
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+    
+    def take(self, name: str, rate: float, capacity: float, tokens: float) -> float:
+        """
+        Take tokens if available
+        
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        with self._lock:
+            now = time.time()
+            available, updated_at = self._buckets.get(name, (capacity, now))
+            available = min(capacity, available + (now - updated_at) * rate)
+            
+            wait = 0.0
+            if available >= tokens:
+                available -= tokens
+            else:
+                wait = (tokens - available) / rate
+            
+            self._buckets[name] = (available, now)
+            return wait
+    
+    def peek(self, name: str, rate: float, capacity: float) -> float:
+        """Get the tokens currently available without taking any"""
+        with self._lock:
+            now = time.time()
+            available, updated_at = self._buckets.get(name, (capacity, now))
+            return min(capacity, available + (now - updated_at) * rate)
+
+class SQLiteBucketBackend:
+    """Bucket state in a SQLite file; each take is one short write transaction"""
+    
+    shared = True
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(Config.SHARED_STATE_DIR, 'rate_limits.db')
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS token_buckets (
+                    name TEXT PRIMARY KEY,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+        finally:
+            conn.close()
+    
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10, isolation_level=None)
+    
+    def take(self, name: str, rate: float, capacity: float, tokens: float) -> float:
+        """
+        Take tokens if available
+        
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they will be available
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                now = time.time()
+                row = conn.execute(
+                    'SELECT tokens, updated_at FROM token_buckets WHERE name = ?', (name,)
+                ).fetchone()
+                available, updated_at = row if row else (capacity, now)
+                available = min(capacity, available + max(now - updated_at, 0) * rate)
+                
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / rate
+                
+                conn.execute(
+                    'INSERT OR REPLACE INTO token_buckets (name, tokens, updated_at) VALUES (?, ?, ?)',
+                    (name, available, now)
+                )
+                conn.execute('COMMIT')
+                return wait
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+    
+    def peek(self, name: str, rate: float, capacity: float) -> float:
+        """Get the tokens currently available without taking any"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated_at FROM token_buckets WHERE name = ?', (name,)
+            ).fetchone()
+        finally:
+            conn.close()
+        
+        if not row:
+            return capacity
+        return min(capacity, row[0] + max(time.time() - row[1], 0) * rate)
+
+class TokenBucket:
+    """
+    A named token bucket: refills at rate tokens/second up to capacity
+    
+    try_acquire() never blocks; acquire() and acquire_async() wait for a
+    token up to a timeout and return False if none became available.
+    acquire_or_raise() picks between them by caller (see waiting_allowed).
+    """
+    
+    def __init__(self, name: str, rate: float, capacity: float, backend=None):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.backend = backend or MemoryBucketBackend()
+    
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens without waiting"""
+        return self._take(tokens) == 0
+    
+    def acquire(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are taken, or until timeout seconds have passed"""
+        deadline = time.monotonic() + (Config.RATE_LIMIT_MAX_WAIT if timeout is None else timeout)
+        
+        while True:
+            wait = self._take(tokens)
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+    
+    def acquire_or_raise(self, tokens: float = 1) -> None:
+        """
+        Take tokens for an upstream call, raising RateLimitExceeded if none are free
+        Request threads do not wait; background workers wait up to RATE_LIMIT_MAX_WAIT
+        """
+        if waiting_allowed():
+            if not self.acquire(tokens):
+                raise RateLimitExceeded(self.name, tokens / self.rate)
+            return
+        
+        wait = self._take(tokens)
+        if wait:
+            raise RateLimitExceeded(self.name, wait)
+    
+    async def acquire_async(self, tokens: float = 1, timeout: Optional[float] = None) -> bool:
+        """Await until tokens are taken, or until timeout seconds have passed"""
+        deadline = time.monotonic() + (Config.RATE_LIMIT_MAX_WAIT if timeout is None else timeout)
+        
+        while True:
+            wait = self._take(tokens)
+            if wait == 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+    
+    def available(self) -> float:
+        """Get the tokens currently available (for usage reporting)"""
+        try:
+            return self.backend.peek(self.name, self.rate, self.capacity)
+        except Exception as e:
+            logger.warning(f"Could not read rate limit bucket '{self.name}': {str(e)}")
+            return 0.0
+    
+    def _take(self, tokens: float) -> float:
+        """Take tokens from the backend, dropping to per-process limits if it fails"""
+        try:
+            return self.backend.take(self.name, self.rate, self.capacity, tokens)
+        except Exception as e:
+            if not self.backend.shared:
+                raise
+            logger.warning(f"Shared rate limit store unavailable, using in-process bucket for '{self.name}': {str(e)}")
+            self.backend = MemoryBucketBackend()
+            return self.backend.take(self.name, self.rate, self.capacity, tokens)
+
+# Global bucket registry shared by every service in the process
+_buckets: Dict[str, TokenBucket] = {}
+_backend = None
+_registry_lock = threading.Lock()
+
+def _get_backend():
+    """Create the configured backend once, falling back to in-process buckets"""
+    global _backend
+    if _backend is None:
+        if Config.RATE_LIMIT_BACKEND == 'sqlite':
+            try:
+                _backend = SQLiteBucketBackend()
+            except Exception as e:
+                logger.warning(f"Could not open shared rate limit store, limits will be per process: {str(e)}")
+                _backend = MemoryBucketBackend()
+        else:
+            _backend = MemoryBucketBackend()
+    return _backend
+
+def get_rate_limiter(name: str, rate: float, capacity: float) -> TokenBucket:
+    """
+    Get the shared bucket for an upstream API
+    
+    Args:
+        name: Bucket name, one per upstream limit (e.g. 'ebay')
+        rate: Tokens added per second
+        capacity: Maximum burst size
+    """
+    with _registry_lock:
+        bucket = _buckets.get(name)
+        if not bucket:
+            bucket = TokenBucket(name, rate, capacity, backend=_get_backend())
+            _buckets[name] = bucket
+        return bucket
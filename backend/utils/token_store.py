@@ -0,0 +1,178 @@
+# backend/utils/token_store.py
+"""
+Cross-process OAuth token cache
+Stores access tokens in a SQLite file shared by every worker on the host so
+one refresh serves all processes, and refreshes them ahead of expiry
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+import logging
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Fetches a new token, returning (access_token, expires_in_seconds)
+TokenFetcher = Callable[[], Tuple[str, int]]
+
+class TokenStore:
+    """
+    SQLite-backed token cache with an in-process memo
+    
+    Refreshes take SQLite's write lock (BEGIN IMMEDIATE) and re-check the
+    stored token before calling the fetcher, so concurrent workers wait for
+    the first refresh instead of each minting their own token.
+    """
+    
+    # Foreground callers only refresh synchronously inside this window
+    EXPIRY_MARGIN = 60
+    
+    def __init__(self, path: Optional[str] = None, refresh_ahead: Optional[int] = None):
+        self.path = path or os.path.join(Config.SHARED_STATE_DIR, 'oauth_tokens.db')
+        self.refresh_ahead = Config.OAUTH_TOKEN_REFRESH_AHEAD if refresh_ahead is None else refresh_ahead
+        
+        self._memo: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self._refresh_threads: Dict[str, threading.Thread] = {}
+        
+        self._init_store()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; transactions are managed explicitly"""
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _init_store(self):
+        """Create the token table"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS oauth_tokens (
+                    name TEXT PRIMARY KEY,
+                    access_token TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    refreshed_at REAL NOT NULL,
+                    refreshed_by INTEGER
+                )
+            ''')
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _read(conn: sqlite3.Connection, name: str) -> Optional[Tuple[str, float]]:
+        row = conn.execute(
+            'SELECT access_token, expires_at FROM oauth_tokens WHERE name = ?', (name,)
+        ).fetchone()
+        return (row['access_token'], row['expires_at']) if row else None
+    
+    def get_token(self, name: str, fetcher: TokenFetcher) -> str:
+        """
+        Get a valid token, refreshing it (once across all workers) if it is about to expire
+        
+        Args:
+            name: Token key, e.g. 'ebay:production:<app id>'
+            fetcher: Called to mint a new token when none is valid
+        """
+        memo = self._memo.get(name)
+        if memo and time.time() < memo[1] - self.EXPIRY_MARGIN:
+            return memo[0]
+        
+        conn = self._connect()
+        try:
+            stored = self._read(conn, name)
+        finally:
+            conn.close()
+        
+        if stored and time.time() < stored[1] - self.EXPIRY_MARGIN:
+            self._memo[name] = stored
+            return stored[0]
+        
+        return self.refresh(name, fetcher, min_remaining=self.EXPIRY_MARGIN)
+    
+    def refresh(self, name: str, fetcher: TokenFetcher, min_remaining: float = 0) -> str:
+        """
+        Refresh a token under the cross-process lock
+        Skips the fetch if another worker already stored a token with at least
+        min_remaining seconds left
+        """
+        with self._lock:
+            conn = self._connect()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    stored = self._read(conn, name)
+                    if stored and time.time() < stored[1] - min_remaining:
+                        conn.execute('COMMIT')
+                        self._memo[name] = stored
+                        return stored[0]
+                    
+                    access_token, expires_in = fetcher()
+                    expires_at = time.time() + expires_in
+                    conn.execute('''
+                        INSERT OR REPLACE INTO oauth_tokens
+                        (name, access_token, expires_at, refreshed_at, refreshed_by)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', (name, access_token, expires_at, time.time(), os.getpid()))
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+            finally:
+                conn.close()
+            
+            self._memo[name] = (access_token, expires_at)
+            logger.info(f"Refreshed OAuth token '{name}' (expires in {int(expires_in)}s)")
+            return access_token
+    
+    def start_background_refresh(self, name: str, fetcher: TokenFetcher):
+        """
+        Keep a token refreshed ahead of expiry from a daemon thread
+        Safe to call repeatedly; one thread is started per token per process
+        """
+        with self._lock:
+            thread = self._refresh_threads.get(name)
+            if thread and thread.is_alive():
+                return
+            
+            thread = threading.Thread(
+                target=self._refresh_loop, args=(name, fetcher),
+                name=f"token-refresh-{name}", daemon=True
+            )
+            self._refresh_threads[name] = thread
+            thread.start()
+    
+    def _refresh_loop(self, name: str, fetcher: TokenFetcher):
+        """Sleep until the token enters the refresh-ahead window, then refresh it"""
+        while True:
+            try:
+                self.refresh(name, fetcher, min_remaining=self.refresh_ahead)
+                expires_at = self._memo[name][1]
+                delay = max(expires_at - self.refresh_ahead - time.time(), 5)
+            except Exception as e:
+                logger.error(f"Background refresh of OAuth token '{name}' failed: {str(e)}")
+                delay = 30
+            
+            time.sleep(delay)
+
+# Global token store shared by every service in the process
+token_store = None
+_token_store_lock = threading.Lock()
+
+def get_token_store() -> TokenStore:
+    """Get shared token store instance"""
+    global token_store
+    if not token_store:
+        with _token_store_lock:
+            if not token_store:
+                token_store = TokenStore()
+    return token_store
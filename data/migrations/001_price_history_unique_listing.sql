@@ -0,0 +1,22 @@
+-- ================================
+-- Migration 001: unique marketplace listing per price_history row
+-- ================================
+-- Existing installs were created without a natural key, so repeated eBay
+-- crawls stored the same sale many times. Collapse the duplicates (keeping
+-- the oldest row, which price_alerts may already reference) and add the key
+-- the ingestion upsert relies on.
+
+USE film_price_guide;
+
+-- Remove duplicate listings, keeping the first row stored for each one
+DELETE newer
+FROM price_history newer
+JOIN price_history older
+    ON older.platform = newer.platform
+    AND older.external_listing_id = newer.external_listing_id
+    AND older.id < newer.id
+WHERE newer.external_listing_id IS NOT NULL;
+
+-- Rows without a listing id (manual entries) are unaffected: NULLs never collide
+ALTER TABLE price_history
+    ADD UNIQUE KEY unique_platform_listing (platform, external_listing_id);
@@ -0,0 +1,14 @@
+-- ================================
+-- Migration 002: per-column FULLTEXT indexes on films
+-- ================================
+-- MATCH() can only use a FULLTEXT index whose column list is exactly the
+-- one given, so the existing FULLTEXT(title, subtitle, director) index does
+-- not serve title-only searches (Film.search_by_title) or the separate
+-- title and director filters of /api/search/advanced. Without these they
+-- fell back to '%term%' LIKE scans of the whole table.
+
+USE film_price_guide;
+
+-- Each ALTER rebuilds the FULLTEXT auxiliary tables; expect a few minutes on large catalogues
+ALTER TABLE films ADD FULLTEXT INDEX ft_films_title (title);
+ALTER TABLE films ADD FULLTEXT INDEX ft_films_director (director);
@@ -0,0 +1,96 @@
+-- ================================
+-- Migration 003: film_price_stats summary table
+-- ================================
+-- Search, film detail, trending and the current_market_prices view used to
+-- aggregate price_history (COUNT/MIN/MAX/AVG with a GROUP BY) on every
+-- request. The backend now keeps one row of statistics per film in
+-- film_price_stats and reads that instead.
+--
+-- Run this before deploying the backend that reads the table. The backfill
+-- below is a single statement; on a large price_history it is gentler to
+-- create the table here and then POST /api/admin/price-stats/rebuild, which
+-- fills it in film id chunks.
+
+USE film_price_guide;
+
+CREATE TABLE IF NOT EXISTS film_price_stats (
+    film_id INT PRIMARY KEY,
+    
+    -- All-time
+    sale_count INT NOT NULL DEFAULT 0,
+    price_sum DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    min_price DECIMAL(10,2) NULL,
+    max_price DECIMAL(10,2) NULL,
+    avg_price DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum / NULLIF(sale_count, 0), 2)) STORED,
+    first_sale_date DATETIME NULL,
+    last_sale_date DATETIME NULL,
+    last_price DECIMAL(10,2) NULL COMMENT 'Price of the most recent sale',
+    
+    -- Rolling windows (recomputed periodically as sales age out)
+    sales_30d INT NOT NULL DEFAULT 0,
+    price_sum_30d DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    avg_price_30d DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum_30d / NULLIF(sales_30d, 0), 2)) STORED,
+    sales_90d INT NOT NULL DEFAULT 0,
+    price_sum_90d DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    avg_price_90d DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum_90d / NULLIF(sales_90d, 0), 2)) STORED,
+    min_price_90d DECIMAL(10,2) NULL,
+    max_price_90d DECIMAL(10,2) NULL,
+    sales_365d INT NOT NULL DEFAULT 0,
+    price_sum_365d DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    avg_price_365d DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum_365d / NULLIF(sales_365d, 0), 2)) STORED,
+    
+    -- Metadata
+    windows_refreshed_at DATETIME NULL COMMENT 'Last exact recompute of the windows (UTC)',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    -- Foreign Keys
+    FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE,
+    
+    -- Indexes
+    INDEX idx_trending (sales_30d, avg_price_30d),
+    INDEX idx_last_sale_date (last_sale_date)
+) ENGINE=InnoDB;
+
+-- Backfill (windows are relative to the time this runs; sale dates are UTC)
+INSERT INTO film_price_stats (
+    film_id, sale_count, price_sum, min_price, max_price,
+    first_sale_date, last_sale_date, last_price,
+    sales_30d, price_sum_30d, sales_90d, price_sum_90d, min_price_90d, max_price_90d,
+    sales_365d, price_sum_365d, windows_refreshed_at
+)
+SELECT film_id,
+       COUNT(*),
+       SUM(price),
+       MIN(price),
+       MAX(price),
+       MIN(sale_date),
+       MAX(sale_date),
+       CAST(SUBSTRING_INDEX(GROUP_CONCAT(price ORDER BY sale_date DESC, id DESC), ',', 1) AS DECIMAL(10,2)),
+       SUM(sale_date >= UTC_TIMESTAMP() - INTERVAL 30 DAY),
+       COALESCE(SUM(IF(sale_date >= UTC_TIMESTAMP() - INTERVAL 30 DAY, price, 0)), 0),
+       SUM(sale_date >= UTC_TIMESTAMP() - INTERVAL 90 DAY),
+       COALESCE(SUM(IF(sale_date >= UTC_TIMESTAMP() - INTERVAL 90 DAY, price, 0)), 0),
+       MIN(IF(sale_date >= UTC_TIMESTAMP() - INTERVAL 90 DAY, price, NULL)),
+       MAX(IF(sale_date >= UTC_TIMESTAMP() - INTERVAL 90 DAY, price, NULL)),
+       SUM(sale_date >= UTC_TIMESTAMP() - INTERVAL 365 DAY),
+       COALESCE(SUM(IF(sale_date >= UTC_TIMESTAMP() - INTERVAL 365 DAY, price, 0)), 0),
+       UTC_TIMESTAMP()
+FROM price_history
+GROUP BY film_id
+ON DUPLICATE KEY UPDATE film_id = film_id;
+
+CREATE OR REPLACE VIEW current_market_prices AS
+SELECT 
+    f.id,
+    f.title,
+    f.format,
+    f.release_year,
+    f.studio,
+    s.sales_90d as total_sales,
+    s.avg_price_90d as avg_price,
+    s.min_price_90d as min_price,
+    s.max_price_90d as max_price,
+    s.last_sale_date
+FROM films f
+JOIN film_price_stats s ON s.film_id = f.id
+WHERE s.sales_90d > 0;
@@ -0,0 +1,43 @@
+-- ================================
+-- Migration 004: market insights rollup
+-- ================================
+-- market_insights is now filled by the backend rollup
+-- (services/market_insights_service.py). It needs:
+--
+-- * price_history.updated_at, so each run reads only rows changed since
+--   the last one (re-crawled listings are updated in place)
+-- * a unique key that works for NULL scopes. MySQL lets any number of rows
+--   share a unique key containing NULL, so market-wide and per-format rows
+--   (film_id and category_id NULL) were never upserted, only duplicated.
+--   The key now uses generated columns with 0 for NULL.
+-- * every film format in market_insights.format, since per-format and
+--   per-film rows carry the film's format (Digital, 4K UHD and Laserdisc
+--   were missing)
+-- * rollup_watermarks to remember how far the rollup has read
+--
+-- The first run after this migration has no watermark and rolls up all of
+-- price_history; POST /api/admin/market-insights/run starts it right away.
+
+USE film_price_guide;
+
+ALTER TABLE price_history
+    ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        COMMENT 'Change feed for the market insights rollup' AFTER created_at,
+    ADD INDEX idx_updated_at (updated_at);
+
+-- Nothing wrote to market_insights before this, so any rows are stale test data
+DELETE FROM market_insights;
+
+ALTER TABLE market_insights
+    MODIFY COLUMN format ENUM('VHS', 'DVD', 'Blu-ray', 'Digital', '4K UHD', 'Laserdisc', 'All') DEFAULT 'All',
+    ADD COLUMN film_scope INT GENERATED ALWAYS AS (COALESCE(film_id, 0)) STORED AFTER format,
+    ADD COLUMN category_scope INT GENERATED ALWAYS AS (COALESCE(category_id, 0)) STORED AFTER film_scope,
+    DROP INDEX unique_period_scope,
+    ADD UNIQUE KEY unique_period_scope (period_start, period_end, film_scope, category_scope, format),
+    ADD INDEX idx_type_scope (period_type, film_scope, category_scope, format, period_start);
+
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+    job_name VARCHAR(64) PRIMARY KEY,
+    high_water_mark DATETIME NULL COMMENT 'Latest source updated_at processed',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
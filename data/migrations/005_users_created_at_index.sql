@@ -0,0 +1,12 @@
+-- ================================
+-- Migration 005: index for keyset paging of users
+-- ================================
+-- /api/auth/users now pages by seeking on (created_at, id) instead of
+-- LIMIT/OFFSET. InnoDB secondary indexes carry the primary key, so an
+-- index on created_at serves the whole (created_at, id) order.
+-- films (title, id) and price_history (film_id, sale_date, id) are already
+-- covered by idx_title and idx_film_date.
+
+USE film_price_guide;
+
+ALTER TABLE users ADD INDEX idx_created_at (created_at);
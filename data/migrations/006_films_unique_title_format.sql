@@ -0,0 +1,54 @@
+-- ================================
+-- Migration 006: unique film per (title, format)
+-- ================================
+-- Ingestion creates films it has not seen yet, and nothing stopped two
+-- workers from both creating the same (title, format). Merge any duplicates
+-- into the oldest film (moving their sales, watchlists, category mappings
+-- and search clicks onto it) and add the key the ingestion INSERT IGNORE
+-- relies on.
+--
+-- The merged films' film_price_stats and market_insights rows are dropped
+-- with them. Afterwards POST /api/admin/price-stats/rebuild and
+-- POST /api/admin/market-insights/run with {"full": true} so the surviving
+-- films' statistics include the sales moved onto them.
+
+USE film_price_guide;
+
+-- Every newer film that has an older one with the same title and format
+CREATE TEMPORARY TABLE film_duplicates AS
+SELECT f.id AS duplicate_id, keep.keep_id
+FROM films f
+JOIN (
+    SELECT title, format, MIN(id) AS keep_id
+    FROM films
+    GROUP BY title, format
+    HAVING COUNT(*) > 1
+) keep ON keep.title = f.title AND keep.format = f.format
+WHERE f.id <> keep.keep_id;
+
+UPDATE price_history ph
+JOIN film_duplicates d ON ph.film_id = d.duplicate_id
+SET ph.film_id = d.keep_id;
+
+-- A user watching both copies keeps the older entry; the rest cascade below
+UPDATE IGNORE watchlist w
+JOIN film_duplicates d ON w.film_id = d.duplicate_id
+SET w.film_id = d.keep_id;
+
+UPDATE IGNORE film_category_mappings m
+JOIN film_duplicates d ON m.film_id = d.duplicate_id
+SET m.film_id = d.keep_id;
+
+UPDATE search_queries q
+JOIN film_duplicates d ON q.clicked_film_id = d.duplicate_id
+SET q.clicked_film_id = d.keep_id;
+
+-- Cascades to the duplicates' leftover watchlist, mapping, stats and insight rows
+DELETE f
+FROM films f
+JOIN film_duplicates d ON f.id = d.duplicate_id;
+
+DROP TEMPORARY TABLE film_duplicates;
+
+ALTER TABLE films
+    ADD UNIQUE KEY unique_title_format (title, format);
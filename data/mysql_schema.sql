@@ -55,6 +55,9 @@ CREATE TABLE films (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     last_price_update TIMESTAMP NULL,
     
+    -- Constraints (one film per title and format, so concurrent ingestion cannot create it twice)
+    UNIQUE KEY unique_title_format (title, format),
+    
     -- Indexes
     INDEX idx_title (title),
     INDEX idx_format (format),
@@ -63,8 +66,10 @@ CREATE TABLE films (
     INDEX idx_rarity_score (rarity_score),
     INDEX idx_updated_at (updated_at),
     
-    -- Full-text search
-    FULLTEXT(title, subtitle, director)
+    -- Full-text search (MATCH column lists must equal an index's columns)
+    FULLTEXT(title, subtitle, director),
+    FULLTEXT ft_films_title (title),
+    FULLTEXT ft_films_director (director)
 ) ENGINE=InnoDB;
 
 -- ================================
@@ -114,10 +119,14 @@ CREATE TABLE price_history (
     
     -- Tracking
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP COMMENT 'Change feed for the market insights rollup',
     
     -- Foreign Keys
     FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE,
     
+    -- Constraints (one row per marketplace listing, so re-crawls update instead of duplicating)
+    UNIQUE KEY unique_platform_listing (platform, external_listing_id),
+    
     -- Indexes
     INDEX idx_film_id (film_id),
     INDEX idx_sale_date (sale_date),
@@ -125,7 +134,8 @@ CREATE TABLE price_history (
     INDEX idx_price (price),
     INDEX idx_film_date (film_id, sale_date),
     INDEX idx_condition (condition_name),
-    INDEX idx_platform_date (platform, sale_date)
+    INDEX idx_platform_date (platform, sale_date),
+    INDEX idx_updated_at (updated_at)
 ) ENGINE=InnoDB;
 
 -- ================================
@@ -175,7 +185,8 @@ CREATE TABLE users (
     INDEX idx_email (email),
     INDEX idx_username (username),
     INDEX idx_active (is_active),
-    INDEX idx_last_login (last_login)
+    INDEX idx_last_login (last_login),
+    INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB;
 
 -- ================================
@@ -380,7 +391,11 @@ CREATE TABLE market_insights (
     -- Scope
     film_id INT NULL COMMENT 'NULL for overall market',
     category_id INT NULL COMMENT 'Category-specific insights',
-    format ENUM('VHS', 'DVD', 'Blu-ray', 'All') DEFAULT 'All',
+    format ENUM('VHS', 'DVD', 'Blu-ray', 'Digital', '4K UHD', 'Laserdisc', 'All') DEFAULT 'All',
+    
+    -- NULL never collides in a unique key, so the key uses these (0 = any)
+    film_scope INT GENERATED ALWAYS AS (COALESCE(film_id, 0)) STORED,
+    category_scope INT GENERATED ALWAYS AS (COALESCE(category_id, 0)) STORED,
     
     -- Metrics
     total_sales INT DEFAULT 0,
@@ -404,16 +419,70 @@ CREATE TABLE market_insights (
     FOREIGN KEY (category_id) REFERENCES film_categories(id) ON DELETE CASCADE,
     
     -- Constraints
-    UNIQUE KEY unique_period_scope (period_start, period_end, film_id, category_id, format),
+    UNIQUE KEY unique_period_scope (period_start, period_end, film_scope, category_scope, format),
     
     -- Indexes
     INDEX idx_period (period_start, period_end),
+    INDEX idx_type_scope (period_type, film_scope, category_scope, format, period_start),
     INDEX idx_film_id (film_id),
     INDEX idx_category_id (category_id),
     INDEX idx_format (format),
     INDEX idx_calculated_at (calculated_at)
 ) ENGINE=InnoDB;
 
+-- ================================
+-- 10. FILM_PRICE_STATS TABLE
+-- ================================
+-- One row of price statistics per film with sales, maintained by the
+-- backend as price_history changes (services/price_stats_service.py)
+CREATE TABLE film_price_stats (
+    film_id INT PRIMARY KEY,
+    
+    -- All-time
+    sale_count INT NOT NULL DEFAULT 0,
+    price_sum DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    min_price DECIMAL(10,2) NULL,
+    max_price DECIMAL(10,2) NULL,
+    avg_price DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum / NULLIF(sale_count, 0), 2)) STORED,
+    first_sale_date DATETIME NULL,
+    last_sale_date DATETIME NULL,
+    last_price DECIMAL(10,2) NULL COMMENT 'Price of the most recent sale',
+    
+    -- Rolling windows (recomputed periodically as sales age out)
+    sales_30d INT NOT NULL DEFAULT 0,
+    price_sum_30d DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    avg_price_30d DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum_30d / NULLIF(sales_30d, 0), 2)) STORED,
+    sales_90d INT NOT NULL DEFAULT 0,
+    price_sum_90d DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    avg_price_90d DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum_90d / NULLIF(sales_90d, 0), 2)) STORED,
+    min_price_90d DECIMAL(10,2) NULL,
+    max_price_90d DECIMAL(10,2) NULL,
+    sales_365d INT NOT NULL DEFAULT 0,
+    price_sum_365d DECIMAL(14,2) NOT NULL DEFAULT 0.00,
+    avg_price_365d DECIMAL(10,2) GENERATED ALWAYS AS (ROUND(price_sum_365d / NULLIF(sales_365d, 0), 2)) STORED,
+    
+    -- Metadata
+    windows_refreshed_at DATETIME NULL COMMENT 'Last exact recompute of the windows (UTC)',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    -- Foreign Keys
+    FOREIGN KEY (film_id) REFERENCES films(id) ON DELETE CASCADE,
+    
+    -- Indexes
+    INDEX idx_trending (sales_30d, avg_price_30d),
+    INDEX idx_last_sale_date (last_sale_date)
+) ENGINE=InnoDB;
+
+-- ================================
+-- 11. ROLLUP_WATERMARKS TABLE
+-- ================================
+-- How far each incremental rollup job has read its source table
+CREATE TABLE rollup_watermarks (
+    job_name VARCHAR(64) PRIMARY KEY,
+    high_water_mark DATETIME NULL COMMENT 'Latest source updated_at processed',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB;
+
 -- ================================
 -- SAMPLE DATA INSERTS
 -- ================================
@@ -448,15 +517,14 @@ SELECT
     f.format,
     f.release_year,
     f.studio,
-    COUNT(ph.id) as total_sales,
-    AVG(ph.price) as avg_price,
-    MIN(ph.price) as min_price,
-    MAX(ph.price) as max_price,
-    MAX(ph.sale_date) as last_sale_date
+    s.sales_90d as total_sales,
+    s.avg_price_90d as avg_price,
+    s.min_price_90d as min_price,
+    s.max_price_90d as max_price,
+    s.last_sale_date
 FROM films f
-LEFT JOIN price_history ph ON f.id = ph.film_id
-WHERE ph.sale_date >= DATE_SUB(NOW(), INTERVAL 90 DAY)
-GROUP BY f.id, f.title, f.format, f.release_year, f.studio;
+JOIN film_price_stats s ON s.film_id = f.id
+WHERE s.sales_90d > 0;
 
 -- User watchlist with current prices
 CREATE VIEW user_watchlist_with_prices AS
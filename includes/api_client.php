@@ -155,6 +155,14 @@ class FlaskApiClient {
         return $this->get("/api/search/films/{$movie_id}");
     }
     
+    public function getTrending($filters = []) {
+        return $this->get('/api/search/trending?' . http_build_query($filters));
+    }
+    
+    public function getMarketInsights($filters = []) {
+        return $this->get('/api/search/insights?' . http_build_query($filters));
+    }
+    
     public function getUserWatchlist($user_id) {
         return $this->get("/api/search/watchlist", ['Authorization: Bearer ' . $this->getUserToken()]);
     }